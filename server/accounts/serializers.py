@@ -69,11 +69,7 @@ class ProfileSerializer(serializers.ModelSerializer):
     def get_location_name(self, obj):
         if obj.location:
             # Return full path like "Ташкент > Мирзо-Улугбекский район"
-            parts = []
-            loc = obj.location
-            while loc:
-                parts.insert(0, loc.name)
-                loc = loc.parent if hasattr(loc, 'parent') else None
+            parts = [loc.name for loc in obj.location.ancestors()]
             return " > ".join(parts) if parts else obj.location.name
         return None
 
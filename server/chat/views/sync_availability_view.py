@@ -7,7 +7,7 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from listings.models import Listing
+from listings import availability
 from ..models import ChatThread
 
 
@@ -45,20 +45,19 @@ class SyncChatAvailabilityView(APIView):
         if not listing_ids:
             return Response({"synced": 0, "updated": 0})
 
-        # Fetch current listing statuses
-        listings = Listing.objects.filter(id__in=listing_ids).values('id', 'status')
-        listing_status_map = {l['id']: l['status'] for l in listings}
+        # Current listing availability from the shared cache
+        listing_states = availability.listing_states(listing_ids)
 
         updated_count = 0
         now = timezone.now()
 
         for thread in threads:
-            listing_status = listing_status_map.get(thread.listing_id)
+            listing_state = listing_states.get(thread.listing_id, availability.DELETED)
 
-            if listing_status is None:
+            if listing_state == availability.DELETED:
                 # Listing was deleted
                 new_availability = ChatThread.ListingAvailability.DELETED
-            elif listing_status == Listing.Status.ACTIVE:
+            elif listing_state == availability.ACTIVE:
                 new_availability = ChatThread.ListingAvailability.AVAILABLE
             else:
                 # Listing exists but is not active (paused, closed, expired, etc.)
@@ -126,18 +125,14 @@ class BulkListingStatusView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        listings = Listing.objects.filter(id__in=listing_ids).values('id', 'status')
-
-        statuses = {}
-        for listing in listings:
-            if listing['status'] == Listing.Status.ACTIVE:
-                statuses[listing['id']] = 'available'
-            else:
-                statuses[listing['id']] = 'unavailable'
-
-        # Mark missing listings as deleted
-        for lid in listing_ids:
-            if lid not in statuses:
-                statuses[lid] = 'deleted'
+        labels = {
+            availability.ACTIVE: 'available',
+            availability.INACTIVE: 'unavailable',
+            availability.DELETED: 'deleted',
+        }
+        statuses = {
+            lid: labels[state]
+            for lid, state in availability.listing_states(listing_ids).items()
+        }
 
         return Response({"statuses": statuses})
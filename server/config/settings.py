@@ -208,10 +208,57 @@ if not DEBUG:
         "anon": "100/hour",
     }
 
+# Cache: use Redis when configured so search caches and counters are shared by
+# web and worker processes; Django's per-process memory cache otherwise
+_cache_url = os.environ.get("CACHE_URL") or os.environ.get("REDIS_URL")
+if _cache_url:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": _cache_url,
+        }
+    }
+
+# Cached listing availability bitmaps (search stale-check, chat status) are
+# dropped on status changes; the TTL bounds drift from out-of-band updates
+LISTING_AVAILABILITY_CACHE_TTL = int(os.environ.get("LISTING_AVAILABILITY_CACHE_TTL", "900"))
+
 # OpenSearch
 OPENSEARCH_URL = os.environ.get("OPENSEARCH_URL", "http://localhost:9200")
 OPENSEARCH_INDEX_PREFIX = os.environ.get("OPENSEARCH_INDEX_PREFIX", "sail")
-OPENSEARCH_INDEX_VERSION = int(os.environ.get("OPENSEARCH_INDEX_VERSION", "2"))
+OPENSEARCH_INDEX_VERSION = int(os.environ.get("OPENSEARCH_INDEX_VERSION", "3"))
+# One pooled client is shared per process; these tune its connections
+OPENSEARCH_TIMEOUT = float(os.environ.get("OPENSEARCH_TIMEOUT", "10"))
+OPENSEARCH_MAX_RETRIES = int(os.environ.get("OPENSEARCH_MAX_RETRIES", "1"))
+OPENSEARCH_POOL_MAXSIZE = int(os.environ.get("OPENSEARCH_POOL_MAXSIZE", "10"))
+OPENSEARCH_HTTP_COMPRESS = os.environ.get("OPENSEARCH_HTTP_COMPRESS", "false").lower() in {"1", "true", "yes"}
+# Time budget for a single /search query; kept short so slow backends fail fast
+OPENSEARCH_SEARCH_TIMEOUT = float(os.environ.get("OPENSEARCH_SEARCH_TIMEOUT", "2"))
+# Circuit breaker: open after N consecutive backend failures, retry after the reset timeout
+SEARCH_BREAKER_FAILURE_THRESHOLD = int(os.environ.get("SEARCH_BREAKER_FAILURE_THRESHOLD", "5"))
+SEARCH_BREAKER_RESET_TIMEOUT = float(os.environ.get("SEARCH_BREAKER_RESET_TIMEOUT", "30"))
+# Seconds a /search response stays cached; index writes invalidate it sooner. 0 disables
+SEARCH_RESPONSE_CACHE_TTL = int(os.environ.get("SEARCH_RESPONSE_CACHE_TTL", "30"))
+# Seconds /search facets stay cached per filter context (shared by all pages and sorts)
+SEARCH_FACET_CACHE_TTL = int(os.environ.get("SEARCH_FACET_CACHE_TTL", "300"))
+# Seconds /search/suggest results stay cached per prefix (not invalidated by index writes)
+SEARCH_SUGGEST_CACHE_TTL = int(os.environ.get("SEARCH_SUGGEST_CACHE_TTL", "60"))
+# Seconds a listing's similar listings stay cached (per listing revision, so edits refresh them)
+SEARCH_SIMILAR_CACHE_TTL = int(os.environ.get("SEARCH_SIMILAR_CACHE_TTL", "3600"))
+# Seconds a saved search's new-item count stays cached (keyed by its last_viewed_at)
+SAVED_SEARCH_COUNT_CACHE_TTL = int(os.environ.get("SAVED_SEARCH_COUNT_CACHE_TTL", "300"))
+# Delay (seconds) before a listing reindex runs; further changes in the window share the same run
+SEARCH_INDEX_DEBOUNCE_SECONDS = int(os.environ.get("SEARCH_INDEX_DEBOUNCE_SECONDS", "2"))
+# Relevance ranking: the text score is multiplied by base + the weighted signals
+# (freshness decay over refreshed_at, quality_score, log favorites, log views); 0 drops a signal
+SEARCH_RANKING_BASE_WEIGHT = float(os.environ.get("SEARCH_RANKING_BASE_WEIGHT", "1.0"))
+SEARCH_RANKING_FRESHNESS_WEIGHT = float(os.environ.get("SEARCH_RANKING_FRESHNESS_WEIGHT", "1.0"))
+SEARCH_RANKING_FRESHNESS_SCALE = os.environ.get("SEARCH_RANKING_FRESHNESS_SCALE", "14d")
+SEARCH_RANKING_QUALITY_WEIGHT = float(os.environ.get("SEARCH_RANKING_QUALITY_WEIGHT", "1.0"))
+SEARCH_RANKING_FAVORITES_WEIGHT = float(os.environ.get("SEARCH_RANKING_FAVORITES_WEIGHT", "0.5"))
+SEARCH_RANKING_VIEWS_WEIGHT = float(os.environ.get("SEARCH_RANKING_VIEWS_WEIGHT", "0.1"))
+# Seconds between partial updates copying view and favorite counts into the index
+SEARCH_ENGAGEMENT_REFRESH_INTERVAL = float(os.environ.get("SEARCH_ENGAGEMENT_REFRESH_INTERVAL", "300"))
 
 # Celery (defaults are set in config/celery.py)
 CELERY_TASK_SOFT_TIME_LIMIT = int(os.environ.get("CELERY_TASK_SOFT_TIME_LIMIT", "30"))
@@ -225,6 +272,21 @@ CELERY_BEAT_SCHEDULE = {
         "schedule": crontab(hour=9, minute=0),  # Run daily at 9:00 AM
         "options": {"expires": 3600},  # Expire after 1 hour if not picked up
     },
+    "instant-saved-search-notifications": {
+        "task": "savedsearches.send_instant_notifications",
+        "schedule": 60.0,  # Backstop for alerts whose immediate dispatch failed
+        "options": {"expires": 60},
+    },
+    "search-drain-index-retries": {
+        "task": "search.drain_index_retries",
+        "schedule": 60.0,  # Replay listing syncs queued while search was down
+        "options": {"expires": 60},
+    },
+    "search-refresh-engagement": {
+        "task": "search.refresh_engagement",
+        "schedule": SEARCH_ENGAGEMENT_REFRESH_INTERVAL,  # Views/favorites into the ranking signals
+        "options": {"expires": SEARCH_ENGAGEMENT_REFRESH_INTERVAL},
+    },
 }
 
 # SimpleJWT defaults can be overridden via env later if needed
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import ExchangeRate
+from .services import CurrencyService
+
+logger = logging.getLogger(__name__)
+
+
+def schedule_repricing(currency: str) -> None:
+    from searchapp.tasks import task_reprice_currency
+
+    try:
+        task_reprice_currency.delay(currency)
+    except Exception:
+        logger.warning("Dispatching search repricing for %s failed.", currency, exc_info=True)
+
+
+@receiver(pre_save, sender=ExchangeRate)
+def remember_previous_rate(sender, instance: ExchangeRate, **kwargs):
+    previous = ExchangeRate.objects.filter(pk=instance.pk).values("rate", "is_active").first() if instance.pk else None
+    instance._previous_rate = previous
+
+
+def _rate_changed(instance: ExchangeRate) -> None:
+    # Cached rates would otherwise outlive the change by up to an hour
+    CurrencyService.clear_cache()
+    default = CurrencyService.get_default_currency()
+    if default is None or instance.to_currency_id != default.id:
+        return
+    # Only listings priced in this currency convert through the changed rate
+    currency = instance.from_currency.code
+    transaction.on_commit(lambda: schedule_repricing(currency))
+
+
+@receiver(post_save, sender=ExchangeRate)
+def on_exchange_rate_saved(sender, instance: ExchangeRate, **kwargs):
+    if getattr(instance, "_previous_rate", None) == {"rate": instance.rate, "is_active": instance.is_active}:
+        return
+    _rate_changed(instance)
+
+
+@receiver(post_delete, sender=ExchangeRate)
+def on_exchange_rate_deleted(sender, instance: ExchangeRate, **kwargs):
+    _rate_changed(instance)
@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from django.db.models.functions import Now
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from listings.models import Listing
+
+from .models import FavoriteListing
+
+
+def _engagement_changed(listing_id: int) -> None:
+    # Picked up by the periodic search.refresh_engagement task rather than
+    # reindexing the listing on every favorite
+    Listing.objects.filter(id=listing_id).update(engagement_changed_at=Now())
+
+
+@receiver(post_save, sender=FavoriteListing)
+def favorite_added(sender, instance: FavoriteListing, created: bool, **kwargs):
+    if created:
+        _engagement_changed(instance.listing_id)
+
+
+@receiver(post_delete, sender=FavoriteListing)
+def favorite_removed(sender, instance: FavoriteListing, **kwargs):
+    _engagement_changed(instance.listing_id)
@@ -218,7 +218,10 @@ class RecentlyViewedListingTrackView(APIView):
                 # Increment view count only for new views
                 if created:
                     from django.db.models import F
-                    Listing.objects.filter(id=listing_id).update(view_count=F('view_count') + 1)
+                    from django.db.models.functions import Now
+                    Listing.objects.filter(id=listing_id).update(
+                        view_count=F('view_count') + 1, engagement_changed_at=Now()
+                    )
 
                 return Response(
                     {"tracked": True},
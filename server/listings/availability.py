@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import operator
+from functools import reduce
+from typing import Dict, Iterable, Set, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max, Q
+
+from .models import Listing
+
+# Listing ids are grouped into fixed-size buckets; each bucket is cached as two
+# bitmaps (exists, active), i.e. 1 KiB per 4096 ids
+BUCKET_SIZE = 4096
+
+ACTIVE = "active"
+INACTIVE = "inactive"
+DELETED = "deleted"
+
+_Bitmaps = Tuple[bytes, bytes]
+
+
+def _bucket_key(bucket: int, generation: int = 0) -> str:
+    return f"listings:availability:{bucket}:{generation}"
+
+
+def _generation_key(bucket: int) -> str:
+    return f"listings:availability:gen:{bucket}"
+
+
+def _generations(buckets: Iterable[int]) -> Dict[int, int]:
+    keys = {_generation_key(b): b for b in buckets}
+    cached = cache.get_many(keys.keys())
+    return {b: int(cached.get(k, 0)) for k, b in keys.items()}
+
+
+def _timeout() -> int:
+    return int(getattr(settings, "LISTING_AVAILABILITY_CACHE_TTL", 900))
+
+
+def _last_bucket() -> int:
+    """Bucket of the highest listing id; later buckets hold no listings yet."""
+    max_id = Listing.objects.aggregate(hi=Max("id"))["hi"]
+    return -1 if max_id is None else max_id // BUCKET_SIZE
+
+
+def _load_buckets(buckets: Iterable[int]) -> Dict[int, _Bitmaps]:
+    """Rebuild bucket bitmaps from the DB with a single query."""
+    buckets = sorted(set(buckets))
+    if not buckets:
+        return {}
+    ranges = [Q(id__gte=b * BUCKET_SIZE, id__lt=(b + 1) * BUCKET_SIZE) for b in buckets]
+    exists = {b: bytearray(BUCKET_SIZE // 8) for b in buckets}
+    active = {b: bytearray(BUCKET_SIZE // 8) for b in buckets}
+    for listing_id, status in Listing.objects.filter(reduce(operator.or_, ranges)).values_list("id", "status"):
+        bucket, offset = divmod(listing_id, BUCKET_SIZE)
+        exists[bucket][offset // 8] |= 1 << (offset % 8)
+        if status == Listing.Status.ACTIVE:
+            active[bucket][offset // 8] |= 1 << (offset % 8)
+    return {b: (bytes(exists[b]), bytes(active[b])) for b in buckets}
+
+
+def refresh(listing_ids: Iterable[int]) -> None:
+    """Retire the cached buckets holding ``listing_ids``. Call after status changes.
+
+    Bumps each bucket's generation, which is part of its cache key, so the
+    next read reloads it. A reader that loaded the bucket before the change
+    stores its snapshot under the old generation, where nothing reads it.
+    """
+    for bucket in {int(i) // BUCKET_SIZE for i in listing_ids}:
+        key = _generation_key(bucket)
+        cache.add(key, 0, timeout=None)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Evicted between add and incr
+            cache.set(key, 1, timeout=None)
+
+
+def listing_states(listing_ids: Iterable[int]) -> Dict[int, str]:
+    """Map each id to ``active``, ``inactive`` or ``deleted`` from the shared cache.
+
+    Buckets missing from the cache are rebuilt with one DB query and stored
+    under the generation read before loading. Ids past the highest listing
+    id are ``deleted`` and their buckets are not cached.
+    """
+    ids = {int(i) for i in listing_ids}
+    buckets = {i // BUCKET_SIZE for i in ids}
+    generations = _generations(buckets)
+    keys = {_bucket_key(b, generations[b]): b for b in buckets}
+    cached = cache.get_many(keys.keys())
+    bitmaps: Dict[int, _Bitmaps] = {keys[k]: v for k, v in cached.items()}
+    missing = buckets - bitmaps.keys()
+    if missing:
+        last_bucket = _last_bucket()
+        beyond = {b for b in missing if b > last_bucket}
+        loaded = _load_buckets(missing - beyond)
+        cache.set_many({_bucket_key(b, generations[b]): v for b, v in loaded.items()}, timeout=_timeout())
+        bitmaps.update(loaded)
+        empty = bytes(BUCKET_SIZE // 8)
+        bitmaps.update({b: (empty, empty) for b in beyond})
+
+    states: Dict[int, str] = {}
+    for listing_id in ids:
+        bucket, offset = divmod(listing_id, BUCKET_SIZE)
+        exists, active = bitmaps[bucket]
+        mask = 1 << (offset % 8)
+        if active[offset // 8] & mask:
+            states[listing_id] = ACTIVE
+        elif exists[offset // 8] & mask:
+            states[listing_id] = INACTIVE
+        else:
+            states[listing_id] = DELETED
+    return states
+
+
+def active_ids(listing_ids: Iterable[int]) -> Set[int]:
+    return {i for i, state in listing_states(listing_ids).items() if state == ACTIVE}
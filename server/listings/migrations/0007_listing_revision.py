@@ -0,0 +1,18 @@
+# Generated by Django 4.2.28 on 2026-10-18 02:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0006_add_listing_statistics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='revision',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+    ]
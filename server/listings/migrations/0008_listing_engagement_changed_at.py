@@ -0,0 +1,18 @@
+# Generated by Django 4.2.28 on 2026-10-18 09:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('listings', '0007_listing_revision'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listing',
+            name='engagement_changed_at',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True),
+        ),
+    ]
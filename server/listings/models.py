@@ -47,6 +47,9 @@ class Listing(models.Model):
     refreshed_at = models.DateTimeField(default=timezone.now)
     expires_at = models.DateTimeField(null=True, blank=True)
     quality_score = models.FloatField(default=0.0)
+    # Bumped on every change that affects the search document; orders index
+    # writes so a slow worker can't overwrite a newer document with an older one
+    revision = models.PositiveBigIntegerField(default=0, editable=False)
     contact_phone_masked = models.CharField(max_length=32, blank=True, default="")
     lat = models.FloatField(null=True, blank=True)
     lon = models.FloatField(null=True, blank=True)
@@ -59,6 +62,9 @@ class Listing(models.Model):
     # Statistics
     view_count = models.PositiveIntegerField(default=0)
     interest_count = models.PositiveIntegerField(default=0)
+    # Set when views or favorites change; cleared once search.refresh_engagement
+    # has copied the counts into the index
+    engagement_changed_at = models.DateTimeField(null=True, blank=True, db_index=True, editable=False)
 
     class Meta:
         indexes = [
@@ -69,6 +75,20 @@ class Listing(models.Model):
     def __str__(self) -> str:  # pragma: no cover
         return self.title
 
+    def save(self, *args, update_fields=None, **kwargs):
+        # ``revision`` only moves through F() updates in the search sync; a
+        # full save from an instance loaded earlier must not write it back
+        if not self._state.adding and self.pk is not None:
+            if update_fields is None:
+                deferred = self.get_deferred_fields()
+                update_fields = [
+                    f.name
+                    for f in self._meta.concrete_fields
+                    if not f.primary_key and f.attname not in deferred
+                ]
+            update_fields = [name for name in update_fields if name != "revision"]
+        super().save(*args, update_fields=update_fields, **kwargs)
+
 
 class ListingAttributeValue(models.Model):
     listing = models.ForeignKey(Listing, on_delete=models.CASCADE, related_name="attributes")
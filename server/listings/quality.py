@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+# How complete a listing is, in [0, 1]. Each part is a step, so a batch of
+# listings shares a handful of distinct scores
+PHOTO_WEIGHT = 0.07  # per photo, up to MAX_PHOTOS
+MAX_PHOTOS = 5
+DESCRIPTION_STEPS = ((300, 0.25), (80, 0.15), (20, 0.05))
+ATTRIBUTES_WEIGHT = 0.15
+PRICE_WEIGHT = 0.15
+GEO_WEIGHT = 0.1
+
+
+def quality_score(
+    *,
+    description: str,
+    photo_count: int,
+    attribute_count: int,
+    has_price: bool,
+    has_geo: bool,
+) -> float:
+    """Completeness score used by search ranking: photos, description, attributes, price and map pin."""
+    score = PHOTO_WEIGHT * min(photo_count, MAX_PHOTOS)
+    length = len((description or "").strip())
+    score += next((weight for threshold, weight in DESCRIPTION_STEPS if length >= threshold), 0.0)
+    if attribute_count:
+        score += ATTRIBUTES_WEIGHT
+    if has_price:
+        score += PRICE_WEIGHT
+    if has_geo:
+        score += GEO_WEIGHT
+    return round(score, 2)
@@ -4,6 +4,7 @@ from decimal import Decimal
 from typing import Any, Dict, List
 
 from django.conf import settings
+from django.db import transaction
 from rest_framework import serializers
 
 from taxonomy.models import Attribute
@@ -341,6 +342,7 @@ class ListingCreateSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["id"]
 
+    @transaction.atomic
     def create(self, validated_data):
         user = self.context["request"].user
         attrs_payload = validated_data.pop("attributes", [])
@@ -366,11 +368,7 @@ class ListingCreateSerializer(serializers.ModelSerializer):
 
     def _save_attributes(self, listing: Listing, attrs_payload: List[Dict[str, Any]]):
         # Determine allowed attributes: listing.category and its ancestors
-        allowed_category_ids = set()
-        cat = listing.category
-        while cat:
-            allowed_category_ids.add(cat.id)
-            cat = cat.parent  # type: ignore[attr-defined]
+        allowed_category_ids = set(listing.category.ancestor_ids)
         # Fetch all attributes for allowed categories
         attrs = Attribute.objects.filter(category_id__in=allowed_category_ids)
         attrs_by_id = {a.id: a for a in attrs}
@@ -503,12 +501,9 @@ class ListingUpdateSerializer(serializers.ModelSerializer):
             return data
 
         # Get allowed attributes for this category and its ancestors
-        allowed_category_ids = set()
         from taxonomy.models import Category
         cat = Category.objects.filter(pk=category_id).first()
-        while cat:
-            allowed_category_ids.add(cat.id)
-            cat = cat.parent
+        allowed_category_ids = set(cat.ancestor_ids) if cat else set()
 
         # Fetch all attributes for allowed categories
         attrs = Attribute.objects.filter(category_id__in=allowed_category_ids)
@@ -531,6 +526,7 @@ class ListingUpdateSerializer(serializers.ModelSerializer):
         data["attributes"] = ser.validated_data
         return data
 
+    @transaction.atomic
     def update(self, instance: Listing, validated_data):
         attrs_payload = validated_data.pop("attributes", None)
         for field, value in validated_data.items():
@@ -544,11 +540,7 @@ class ListingUpdateSerializer(serializers.ModelSerializer):
 
     def _save_attributes(self, listing: Listing, attrs_payload: List[Dict[str, Any]]):
         # Same logic as in create serializer
-        allowed_category_ids = set()
-        cat = listing.category
-        while cat:
-            allowed_category_ids.add(cat.id)
-            cat = cat.parent  # type: ignore[attr-defined]
+        allowed_category_ids = set(listing.category.ancestor_ids)
         attrs = Attribute.objects.filter(category_id__in=allowed_category_ids)
         attrs_by_id = {a.id: a for a in attrs}
         attrs_by_key = {a.key: a for a in attrs}
@@ -1,63 +1,145 @@
 from __future__ import annotations
 
 import logging
-from typing import Callable
+from typing import Set
 
 from django.db import transaction
-from django.db.models.signals import post_delete, post_save
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 
-from searchapp.tasks import task_delete_listing, task_index_listing
-from searchapp.views.index import delete_listing, index_listing
+from accounts.models import Profile
+from searchapp.tasks import queue_index_retry, schedule_index_listings
+from searchapp.views.circuit_breaker import get_breaker
+from searchapp.views.index import bulk_index_listings
 
+from . import availability
 from .models import Listing, ListingAttributeValue, ListingMedia
 
 logger = logging.getLogger(__name__)
 
 
-def _dispatch_search_task(task, fallback: Callable[[int], None], listing_id: int) -> None:
-    def runner() -> None:
+class _SearchSyncBatch:
+    """Listing ids touched inside one transaction, synced together on commit."""
+
+    def __init__(self) -> None:
+        self.ids: Set[int] = set()
+        # Listings whose row (and so possibly status) changed
+        self.status_ids: Set[int] = set()
+        self.flushed = False
+
+    def __call__(self) -> None:
+        self.flushed = True
+        if self.status_ids:
+            try:
+                availability.refresh(self.status_ids)
+            except Exception:
+                logger.exception("Refreshing listing availability failed for %s.", sorted(self.status_ids))
+        listing_ids = sorted(self.ids)
         try:
-            task.delay(listing_id)
+            # Before any worker reads the rows, so every document built from
+            # this state carries a revision newer than the ones before it
+            Listing.objects.filter(id__in=listing_ids).update(revision=F("revision") + 1)
         except Exception:
+            logger.exception("Bumping listing revisions failed for %s.", listing_ids)
+        try:
+            schedule_index_listings(listing_ids)
+        except Exception:
+            if get_breaker().is_open():
+                # Don't block the request on a backend that is known to be down
+                logger.warning("Search task dispatch failed for listings %s; queued for retry.", listing_ids)
+                queue_index_retry(listing_ids)
+                return
             logger.warning(
-                "Search task dispatch failed for listing %s; falling back to inline sync.",
-                listing_id,
+                "Search task dispatch failed for listings %s; falling back to inline sync.",
+                listing_ids,
                 exc_info=True,
             )
             try:
-                fallback(listing_id)
+                bulk_index_listings(listing_ids)
             except Exception:
-                logger.exception("Inline search sync failed for listing %s.", listing_id)
-
-    transaction.on_commit(runner)
+                logger.exception("Inline search sync failed for listings %s; queued for retry.", listing_ids)
+                queue_index_retry(listing_ids)
+
+
+def _queue_search_sync(listing_id: int, status_changed: bool = False) -> None:
+    """Add ``listing_id`` to the current transaction's batch.
+
+    Only the first change in a transaction registers an ``on_commit`` hook, so
+    saving a listing together with all of its attribute rows sends one task.
+    A batch whose hook was discarded by a rollback is not reused.
+    """
+    connection = transaction.get_connection()
+    batch = getattr(connection, "search_sync_batch", None)
+    if batch is None or batch.flushed or not any(entry[1] is batch for entry in connection.run_on_commit):
+        batch = _SearchSyncBatch()
+        connection.search_sync_batch = batch
+        batch.ids.add(listing_id)
+        if status_changed:
+            batch.status_ids.add(listing_id)
+        # Outside an atomic block this runs the batch immediately
+        transaction.on_commit(batch)
+        return
+    batch.ids.add(listing_id)
+    if status_changed:
+        batch.status_ids.add(listing_id)
+
+
+@receiver(pre_save, sender=Listing)
+def remember_previous_status(sender, instance: Listing, update_fields=None, **kwargs):
+    if instance.pk is None or (update_fields is not None and "status" not in update_fields):
+        instance._previous_status = instance.status
+        return
+    instance._previous_status = Listing.objects.filter(pk=instance.pk).values_list("status", flat=True).first()
 
 
 @receiver(post_save, sender=Listing)
 def on_listing_saved(sender, instance: Listing, created, **kwargs):
-    _dispatch_search_task(task_index_listing, index_listing, instance.id)
+    # Availability buckets cover 4096 ids; only drop them when the status moved
+    status_changed = created or getattr(instance, "_previous_status", None) != instance.status
+    _queue_search_sync(instance.id, status_changed=status_changed)
 
 
 @receiver(post_delete, sender=Listing)
 def on_listing_deleted(sender, instance: Listing, **kwargs):
-    _dispatch_search_task(task_delete_listing, delete_listing, instance.id)
+    _queue_search_sync(instance.id, status_changed=True)
 
 
 @receiver(post_save, sender=ListingAttributeValue)
 def on_attr_saved(sender, instance: ListingAttributeValue, created, **kwargs):
-    _dispatch_search_task(task_index_listing, index_listing, instance.listing_id)
+    _queue_search_sync(instance.listing_id)
 
 
 @receiver(post_delete, sender=ListingAttributeValue)
 def on_attr_deleted(sender, instance: ListingAttributeValue, **kwargs):
-    _dispatch_search_task(task_index_listing, index_listing, instance.listing_id)
+    _queue_search_sync(instance.listing_id)
 
 
 @receiver(post_save, sender=ListingMedia)
 def on_media_saved(sender, instance: ListingMedia, created, **kwargs):
-    _dispatch_search_task(task_index_listing, index_listing, instance.listing_id)
+    _queue_search_sync(instance.listing_id)
 
 
 @receiver(post_delete, sender=ListingMedia)
 def on_media_deleted(sender, instance: ListingMedia, **kwargs):
-    _dispatch_search_task(task_index_listing, index_listing, instance.listing_id)
+    _queue_search_sync(instance.listing_id)
+
+
+def _seller_card_fields(display_name, avatar_url):
+    return display_name or "", avatar_url or ""
+
+
+@receiver(pre_save, sender=Profile)
+def remember_seller_card_fields(sender, instance: Profile, **kwargs):
+    previous = Profile.objects.filter(pk=instance.pk).values_list("display_name", "avatar_url").first() if instance.pk else None
+    instance._previous_card_fields = _seller_card_fields(*(previous or ("", "")))
+
+
+@receiver(post_save, sender=Profile)
+def on_profile_saved(sender, instance: Profile, **kwargs):
+    # Result cards embed the seller's name and avatar
+    if getattr(instance, "_previous_card_fields", None) == _seller_card_fields(instance.display_name, instance.avatar_url):
+        return
+    active = Listing.objects.filter(user_id=instance.user_id, status=Listing.Status.ACTIVE)
+    for listing_id in active.values_list("id", flat=True):
+        _queue_search_sync(listing_id)
@@ -32,12 +32,7 @@ class TelegramSharingService:
         price_text = f"{listing.price_amount:,.0f}".replace(",", " ") + f" {listing.price_currency}" if listing.price_amount else "Договорная"
         
         # Hashtags from category hierarchy
-        hashtags = []
-        cat = listing.category
-        while cat:
-            slug = cat.slug.replace("-", "_")
-            hashtags.append(f"#{slug}")
-            cat = cat.parent
+        hashtags = [f"#{slug.replace('-', '_')}" for slug in reversed(listing.category.ancestor_slugs)]
         hashtags_str = " ".join(hashtags)
 
         # Escape HTML content to prevent parse errors
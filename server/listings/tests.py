@@ -4,6 +4,7 @@ from decimal import Decimal
 from unittest.mock import patch
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.db import connection
 from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
@@ -14,18 +15,16 @@ from accounts.models import Profile
 from favorites.models import FavoriteListing
 from taxonomy.models import Attribute, Category, Location
 
+from . import availability
 from .models import Listing, ListingAttributeValue
 from .views.my_listings_view import MyListingsView
 
 
 class ListingApiTests(APITestCase):
     def setUp(self):
-        self.task_index_patcher = patch("listings.signals.task_index_listing.delay", return_value=None)
-        self.task_delete_patcher = patch("listings.signals.task_delete_listing.delay", return_value=None)
-        self.task_index_patcher.start()
-        self.task_delete_patcher.start()
-        self.addCleanup(self.task_index_patcher.stop)
-        self.addCleanup(self.task_delete_patcher.stop)
+        self.schedule_patcher = patch("listings.signals.schedule_index_listings", return_value=[])
+        self.schedule_mock = self.schedule_patcher.start()
+        self.addCleanup(self.schedule_patcher.stop)
 
         self.User = get_user_model()
         self.seller = self.User.objects.create_user(username="seller", password="pass123")
@@ -148,20 +147,120 @@ class ListingApiTests(APITestCase):
         self.assertEqual(listing.interest_count, 0)
 
     def test_signal_dispatch_falls_back_when_broker_is_unavailable(self):
-        with patch("listings.signals.task_index_listing.delay", side_effect=RuntimeError("broker down")), patch(
-            "listings.signals.index_listing"
+        with patch("listings.signals.schedule_index_listings", side_effect=RuntimeError("broker down")), patch(
+            "listings.signals.bulk_index_listings"
         ) as index_mock:
             with self.captureOnCommitCallbacks(execute=True):
                 listing = self._create_listing(title="Broker fallback create")
-            index_mock.assert_called_once_with(listing.id)
+            index_mock.assert_called_once_with([listing.id])
 
-        with patch("listings.signals.task_delete_listing.delay", side_effect=RuntimeError("broker down")), patch(
-            "listings.signals.delete_listing"
+        with patch("listings.signals.schedule_index_listings", side_effect=RuntimeError("broker down")), patch(
+            "listings.signals.bulk_index_listings"
         ) as delete_mock:
             listing_id = listing.id
             with self.captureOnCommitCallbacks(execute=True):
                 listing.delete()
-            delete_mock.assert_called_once_with(listing_id)
+            delete_mock.assert_called_once_with([listing_id])
+
+    def test_signal_dispatch_coalesces_changes_per_transaction(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            listing = self._create_listing()
+        self.schedule_mock.reset_mock()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            listing.title = "iPhone 15 Pro"
+            listing.save()
+            for idx in range(15):
+                ListingAttributeValue.objects.create(
+                    listing=listing, attribute=self.attribute, value_text=f"{idx}GB"
+                )
+            ListingAttributeValue.objects.filter(listing=listing).delete()
+
+        self.schedule_mock.assert_called_once_with([listing.id])
+
+    def test_seller_profile_changes_reindex_active_listings(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            active = self._create_listing()
+            self._create_listing(status=Listing.Status.PAUSED)
+        self.schedule_mock.reset_mock()
+        profile = Profile.objects.get(user=self.seller)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.about = "Phones and tablets"
+            profile.save()
+        self.schedule_mock.assert_not_called()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.display_name = "Phone Shop"
+            profile.save()
+        self.schedule_mock.assert_called_once_with([active.id])
+
+    def test_availability_cache_follows_status_changes(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        with self.captureOnCommitCallbacks(execute=True):
+            active = self._create_listing()
+            paused = self._create_listing(status=Listing.Status.PAUSED)
+        missing_id = paused.id + 1000
+
+        states = availability.listing_states([active.id, paused.id, missing_id])
+        self.assertEqual(
+            states,
+            {active.id: availability.ACTIVE, paused.id: availability.INACTIVE, missing_id: availability.DELETED},
+        )
+
+        with CaptureQueriesContext(connection) as ctx:
+            availability.listing_states([active.id, paused.id])
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            active.status = Listing.Status.CLOSED
+            active.save(update_fields=["status"])
+        self.assertEqual(availability.active_ids([active.id, paused.id]), set())
+
+    def test_edits_without_status_change_keep_availability_buckets(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            listing = self._create_listing()
+
+        with patch.object(availability, "refresh") as refresh_mock:
+            with self.captureOnCommitCallbacks(execute=True):
+                listing.title = "iPhone 15 Pro"
+                listing.save()
+            refresh_mock.assert_not_called()
+
+            with self.captureOnCommitCallbacks(execute=True):
+                listing.status = Listing.Status.PAUSED
+                listing.save()
+            refresh_mock.assert_called_once_with({listing.id})
+
+    def test_availability_cache_skips_buckets_past_the_last_listing(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        listing = self._create_listing()
+        far_id = listing.id + 10 * availability.BUCKET_SIZE
+
+        states = availability.listing_states([listing.id, far_id])
+
+        self.assertEqual(states, {listing.id: availability.ACTIVE, far_id: availability.DELETED})
+        self.assertIsNone(cache.get(availability._bucket_key(far_id // availability.BUCKET_SIZE)))
+
+    def test_availability_snapshot_loaded_before_a_refresh_is_not_served(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        listing = self._create_listing()
+        load_buckets = availability._load_buckets
+
+        def load_then_status_changes(buckets):
+            snapshot = load_buckets(buckets)
+            # The status change commits while this reader holds the old snapshot
+            Listing.objects.filter(pk=listing.pk).update(status=Listing.Status.PAUSED)
+            availability.refresh([listing.id])
+            return snapshot
+
+        with patch.object(availability, "_load_buckets", side_effect=load_then_status_changes):
+            self.assertEqual(availability.listing_states([listing.id]), {listing.id: availability.ACTIVE})
+
+        self.assertEqual(availability.listing_states([listing.id]), {listing.id: availability.INACTIVE})
 
     def test_my_listings_query_count_stays_bounded(self):
         listings = [
@@ -186,3 +285,42 @@ class ListingApiTests(APITestCase):
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertLessEqual(len(ctx.captured_queries), 12)
+
+    def test_category_paths_follow_moves_and_renames(self):
+        electronics = Category.objects.create(name="Electronics", slug="electronics", level=0)
+        gadgets = Category.objects.create(name="Gadgets", slug="gadgets", level=0)
+        self.category.parent = electronics
+        self.category.save()
+        child = Category.objects.create(name="Android", slug="android", parent=self.category, level=2)
+        self.assertEqual(child.ancestor_slugs, ["electronics", "smartphones", "android"])
+
+        self.category.parent = gadgets
+        self.category.slug = "phones"
+        self.category.save()
+        child.refresh_from_db()
+        self.assertEqual(child.ancestor_ids, [gadgets.id, self.category.id, child.id])
+        self.assertEqual(child.ancestor_slugs, ["gadgets", "phones", "android"])
+        self.assertEqual(list(child.ancestors(include_self=False)), [gadgets, self.category])
+
+        Category.objects.filter(pk=child.pk).update(path_ids="", path_slugs="")
+        self.assertEqual(Category.rebuild_paths(), 1)
+        child.refresh_from_db()
+        self.assertEqual(child.path_ids, f"/{gadgets.id}/{self.category.id}/{child.id}/")
+
+    def test_user_listings_category_filter_includes_subcategories(self):
+        electronics = Category.objects.create(name="Electronics", slug="electronics", level=0)
+        self.category.parent = electronics
+        self.category.save()
+        other = Category.objects.create(name="Cars", slug="cars", level=0)
+        phone = self._create_listing(title="Phone")
+        self._create_listing(title="Car", category=other)
+
+        url = reverse("user-listings", kwargs={"user_id": self.seller.id})
+        response = self.client.get(url, {"category": "electronics"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data.get("results", response.data)
+        self.assertEqual([item["id"] for item in results], [phone.id])
+
+        response = self.client.get(url, {"category": "missing"})
+        results = response.data.get("results", response.data)
+        self.assertEqual(list(results), [])
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from django.db import transaction
 from drf_spectacular.utils import extend_schema, OpenApiExample
 from rest_framework import permissions
 from rest_framework.response import Response
@@ -135,33 +136,35 @@ class ListingCreateRawView(APIView):
         if seller_type not in dict(Listing.SellerType.choices):
             return Response({"seller_type": f"Invalid. Allowed: {list(dict(Listing.SellerType.choices).keys())}"}, status=400)
 
-        # Create listing
-        listing = Listing.objects.create(
-            user=request.user,
-            title=title,
-            description=description,
-            price_amount=price_amount,
-            price_currency=price_currency,
-            is_price_negotiable=is_price_negotiable,
-            condition=condition,
-            deal_type=deal_type,
-            seller_type=seller_type,
-            category_id=category_id,
-            location_id=location_id,
-            lat=lat,
-            lon=lon,
-            contact_name=contact_name,
-            contact_email=contact_email,
-            contact_phone=contact_phone,
-        )
-
-        sync_listing_contact_phone_mask(listing)
-        listing.save(update_fields=["contact_phone_masked"])
-
-        # Save attributes using existing logic for consistency
-        if isinstance(attributes, list) and attributes:
-            helper = ListingCreateSerializer(context={"request": request})
-            helper._save_attributes(listing, attributes)
+        # Create listing and its attributes in one transaction so search sync
+        # is dispatched once on commit
+        with transaction.atomic():
+            listing = Listing.objects.create(
+                user=request.user,
+                title=title,
+                description=description,
+                price_amount=price_amount,
+                price_currency=price_currency,
+                is_price_negotiable=is_price_negotiable,
+                condition=condition,
+                deal_type=deal_type,
+                seller_type=seller_type,
+                category_id=category_id,
+                location_id=location_id,
+                lat=lat,
+                lon=lon,
+                contact_name=contact_name,
+                contact_email=contact_email,
+                contact_phone=contact_phone,
+            )
+
+            sync_listing_contact_phone_mask(listing)
+            listing.save(update_fields=["contact_phone_masked"])
+
+            # Save attributes using existing logic for consistency
+            if isinstance(attributes, list) and attributes:
+                helper = ListingCreateSerializer(context={"request": request})
+                helper._save_attributes(listing, attributes)
 
         # Respond with full listing payload
         output = ListingSerializer(listing, context={"request": request}).data
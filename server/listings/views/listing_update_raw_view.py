@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from django.db import transaction
 from drf_spectacular.utils import extend_schema, OpenApiExample
 from rest_framework import permissions
 from rest_framework.response import Response
@@ -145,14 +146,15 @@ class ListingUpdateRawView(APIView):
         listing.contact_name = contact_name if contact_name is not None else listing.contact_name
         listing.contact_phone = contact_phone if contact_phone is not None else listing.contact_phone
 
-        sync_listing_contact_phone_mask(listing)
-        listing.save()
+        with transaction.atomic():
+            sync_listing_contact_phone_mask(listing)
+            listing.save()
 
-        # Handle attributes if provided
-        attributes = data.get("attributes")
-        if isinstance(attributes, list):
-            helper = ListingCreateSerializer(context={"request": request})
-            helper._save_attributes(listing, attributes)
+            # Handle attributes if provided
+            attributes = data.get("attributes")
+            if isinstance(attributes, list):
+                helper = ListingCreateSerializer(context={"request": request})
+                helper._save_attributes(listing, attributes)
 
         # Respond with full listing payload
         output = ListingSerializer(listing, context={"request": request}).data
@@ -3,6 +3,8 @@ from __future__ import annotations
 from drf_spectacular.utils import extend_schema, OpenApiExample
 from rest_framework import generics, permissions
 
+from taxonomy.models import Category
+
 from ..models import Listing
 from ..querysets import listing_fetch_queryset
 from ..serializers import ListingSerializer
@@ -12,7 +14,7 @@ from ..serializers import ListingSerializer
     tags=["listings"],
     summary="List user's listings",
     description="Retrieve all active listings for a specific user. "
-    "Supports filtering by category slug and sorting by newest, oldest, or price.",
+    "Supports filtering by category slug (including subcategories) and sorting by newest, oldest, or price.",
     responses={200: ListingSerializer(many=True)},
     examples=[
         OpenApiExample(
@@ -42,7 +44,11 @@ class UserListingsView(generics.ListAPIView):
         # Apply filters
         category_slug = self.request.query_params.get("category")
         if category_slug:
-            queryset = queryset.filter(category__slug=category_slug)
+            # The category and everything below it
+            category = Category.objects.filter(slug=category_slug).only("path_ids").first()
+            if category is None:
+                return queryset.none()
+            queryset = queryset.filter(category__path_ids__startswith=category.path_ids)
 
         sort = self.request.query_params.get("sort", "newest")
         if sort == "newest":
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from savedsearches.models import SavedSearch
+from savedsearches.utils import compile_percolator_query
+from searchapp.views import percolator
+from searchapp.views.opensearch_client import get_client
+
+
+class Command(BaseCommand):
+    help = "Register every active instant saved search in the percolator index"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--recreate",
+            action="store_true",
+            help="Drop and recreate the percolator index first (needed when existing listing fields or analyzers change; new fields are added automatically)",
+        )
+
+    def handle(self, *args, **options):
+        client = get_client()
+        if not client:
+            self.stdout.write(self.style.ERROR("OpenSearch client not available"))
+            return
+
+        idx = percolator.percolator_index_name()
+        if options["recreate"]:
+            client.indices.delete(index=idx, ignore_unavailable=True)  # type: ignore[attr-defined]
+        percolator.ensure_percolator_index(force=True)
+
+        registered = 0
+        searches = SavedSearch.objects.filter(is_active=True, frequency=SavedSearch.Frequency.INSTANT)
+        for saved in searches.iterator():
+            percolator.register_query(saved.id, saved.user_id, compile_percolator_query(saved))
+            registered += 1
+        self.stdout.write(self.style.SUCCESS(f"Registered {registered} saved searches in '{idx}'"))
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.28 on 2026-10-18 02:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('savedsearches', '0003_savedsearch_last_viewed_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SavedSearchMatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('listing_id', models.BigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('notified_at', models.DateTimeField(blank=True, null=True)),
+                ('saved_search', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='matches', to='savedsearches.savedsearch')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['notified_at'], name='savedsearch_notifie_2fb64d_idx')],
+                'unique_together': {('saved_search', 'listing_id')},
+            },
+        ),
+    ]
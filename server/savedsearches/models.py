@@ -26,3 +26,25 @@ class SavedSearch(models.Model):
     def __str__(self) -> str:  # pragma: no cover
         return f"{self.user_id}:{self.title}"
 
+
+
+class SavedSearchMatch(models.Model):
+    """A new listing matched by an instant saved search, waiting to be notified.
+
+    Rows are created at index time from percolator matches; the unique pair
+    keeps a listing from alerting the same search twice when it is re-indexed.
+    """
+
+    saved_search = models.ForeignKey(SavedSearch, on_delete=models.CASCADE, related_name="matches")
+    listing_id = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    notified_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ("saved_search", "listing_id")
+        indexes = [
+            models.Index(fields=["notified_at"]),
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"{self.saved_search_id}:{self.listing_id}"
@@ -3,7 +3,15 @@ from __future__ import annotations
 from rest_framework import serializers
 
 from .models import SavedSearch
-from .utils import count_new_items_for_saved_search
+from .utils import count_new_items
+
+
+class SavedSearchListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        items = list(data.all() if hasattr(data, "all") else data)
+        # One batched count for the whole page instead of a request per item
+        self.context["new_items_counts"] = count_new_items(items)
+        return super().to_representation(items)
 
 
 class SavedSearchSerializer(serializers.ModelSerializer):
@@ -13,8 +21,11 @@ class SavedSearchSerializer(serializers.ModelSerializer):
         model = SavedSearch
         fields = ["id", "title", "query", "frequency", "is_active", "last_sent_at", "last_viewed_at", "created_at", "new_items_count"]
         read_only_fields = ["new_items_count"]
+        list_serializer_class = SavedSearchListSerializer
 
     def get_new_items_count(self, obj: SavedSearch) -> int:
         """Get count of new items since last viewed."""
-        return count_new_items_for_saved_search(obj)
-
+        counts = self.context.get("new_items_counts")
+        if counts is None or obj.id not in counts:
+            counts = count_new_items([obj])
+        return counts[obj.id]
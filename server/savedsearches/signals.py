@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import logging
+from typing import Any, Dict
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from searchapp.signals import listings_indexed
+from searchapp.views import percolator
+
+from .models import SavedSearch
+from .utils import compile_percolator_query
+
+logger = logging.getLogger(__name__)
+
+
+def sync_percolator(saved_search_id: int) -> None:
+    """Register an active instant saved search as a percolator query, or remove it."""
+    saved = SavedSearch.objects.filter(id=saved_search_id).first()
+    try:
+        if saved and saved.is_active and saved.frequency == SavedSearch.Frequency.INSTANT:
+            percolator.register_query(saved.id, saved.user_id, compile_percolator_query(saved))
+        else:
+            percolator.unregister_query(saved_search_id)
+    except Exception:
+        logger.exception("Syncing saved search %s to the percolator index failed.", saved_search_id)
+
+
+@receiver(post_save, sender=SavedSearch)
+def on_saved_search_saved(sender, instance: SavedSearch, update_fields=None, **kwargs):
+    # Timestamp bookkeeping (last_viewed_at, last_sent_at) doesn't change the query
+    if update_fields and set(update_fields) <= {"last_viewed_at", "last_sent_at"}:
+        return
+    transaction.on_commit(lambda: sync_percolator(instance.id))
+
+
+@receiver(post_delete, sender=SavedSearch)
+def on_saved_search_deleted(sender, instance: SavedSearch, **kwargs):
+    saved_search_id = instance.id
+    transaction.on_commit(lambda: sync_percolator(saved_search_id))
+
+
+@receiver(listings_indexed)
+def on_listings_indexed(sender, documents: Dict[int, Dict[str, Any]], **kwargs):
+    """Match the written listings against instant saved searches in a task.
+
+    Percolation can be slow with many saved searches; it must not hold up
+    the index write that sent this signal.
+    """
+    from .tasks import task_match_instant_searches
+
+    listing_ids = sorted(documents)
+    try:
+        task_match_instant_searches.delay(listing_ids)
+    except Exception:
+        logger.warning("Dispatching saved-search matching failed; matching inline.", exc_info=True)
+        task_match_instant_searches(listing_ids)
@@ -2,13 +2,16 @@ from __future__ import annotations
 
 import logging
 from datetime import datetime, timezone as dt_timezone
+from itertools import islice
+from typing import Dict, List
 
 import requests
 from celery import shared_task
 from django.conf import settings
+from django.db import transaction
 
-from .models import SavedSearch
-from .utils import count_new_items_for_saved_search
+from .models import SavedSearch, SavedSearchMatch
+from .utils import MSEARCH_BATCH_SIZE, count_new_items, saved_search_body
 
 logger = logging.getLogger(__name__)
 
@@ -40,6 +43,27 @@ def send_telegram_notification(telegram_id: int, message: str) -> bool:
         return False
 
 
+def build_notification_message(saved_search: SavedSearch, new_count: int) -> str:
+    """Telegram message announcing ``new_count`` new items for a saved search."""
+    frontend_url = getattr(settings, "WEB_BASE_URL", "https://sail.uz").rstrip("/")
+    search_url = f"{frontend_url}/favorites"
+
+    # Pluralize based on count
+    if new_count == 1:
+        items_text = "новое объявление"
+    elif 2 <= new_count <= 4:
+        items_text = "новых объявления"
+    else:
+        items_text = "новых объявлений"
+
+    return (
+        f"🔔 <b>Новые объявления по вашему запросу</b>\n\n"
+        f"📋 <b>{saved_search.title}</b>\n"
+        f"📊 Найдено: {new_count} {items_text}\n\n"
+        f"👉 <a href='{search_url}'>Посмотреть результаты</a>"
+    )
+
+
 @shared_task(name="savedsearches.run_daily_notifications")
 def task_run_daily_saved_search_notifications():
     """
@@ -58,45 +82,32 @@ def task_run_daily_saved_search_notifications():
         user__profile__telegram_id__isnull=False,
     ).select_related("user__profile")
 
-    for saved_search in saved_searches.iterator():
-        try:
-            # Count new items since last notification
-            new_count = count_new_items_for_saved_search(saved_search)
-
-            if new_count > 0:
-                profile = saved_search.user.profile
-                telegram_id = profile.telegram_id
-
-                if telegram_id:
-                    # Build notification message
-                    frontend_url = getattr(settings, "WEB_BASE_URL", "https://sail.uz").rstrip("/")
-                    search_url = f"{frontend_url}/favorites"
-
-                    # Pluralize based on count
-                    if new_count == 1:
-                        items_text = "новое объявление"
-                    elif 2 <= new_count <= 4:
-                        items_text = "новых объявления"
-                    else:
-                        items_text = "новых объявлений"
-
-                    message = (
-                        f"🔔 <b>Новые объявления по вашему запросу</b>\n\n"
-                        f"📋 <b>{saved_search.title}</b>\n"
-                        f"📊 Найдено: {new_count} {items_text}\n\n"
-                        f"👉 <a href='{search_url}'>Посмотреть результаты</a>"
-                    )
-
-                    if send_telegram_notification(telegram_id, message):
-                        notifications_sent += 1
-                        saved_search.last_sent_at = datetime.now(dt_timezone.utc)
-                        saved_search.save(update_fields=["last_sent_at"])
-
-            processed += 1
-
-        except Exception as e:
-            logger.error(f"Error processing saved search {saved_search.id}: {e}")
-            continue
+    rows = saved_searches.iterator(chunk_size=MSEARCH_BATCH_SIZE)
+    while batch := list(islice(rows, MSEARCH_BATCH_SIZE)):
+        # Count new items since last notification, one _msearch per batch
+        counts = count_new_items(batch)
+
+        for saved_search in batch:
+            try:
+                new_count = counts.get(saved_search.id, 0)
+
+                if new_count > 0:
+                    profile = saved_search.user.profile
+                    telegram_id = profile.telegram_id
+
+                    if telegram_id:
+                        message = build_notification_message(saved_search, new_count)
+
+                        if send_telegram_notification(telegram_id, message):
+                            notifications_sent += 1
+                            saved_search.last_sent_at = datetime.now(dt_timezone.utc)
+                            saved_search.save(update_fields=["last_sent_at"])
+
+                processed += 1
+
+            except Exception as e:
+                logger.error(f"Error processing saved search {saved_search.id}: {e}")
+                continue
 
     return {
         "status": "ok",
@@ -105,6 +116,93 @@ def task_run_daily_saved_search_notifications():
     }
 
 
+@shared_task(name="savedsearches.match_instant_searches")
+def task_match_instant_searches(listing_ids: List[int]) -> dict:
+    """Queue instant alerts for indexed listings that match saved searches.
+
+    Documents are rebuilt from the current rows and percolated. A listing
+    only alerts searches created before it, so editing an old listing
+    doesn't notify searches saved after it was posted.
+    """
+    from listings.models import Listing
+    from searchapp.views import percolator
+    from searchapp.views.index import build_document_many
+
+    matches = percolator.percolate(build_document_many(listing_ids))
+    if not matches:
+        return {"status": "ok", "queued": 0}
+    searches = dict(
+        SavedSearch.objects.filter(
+            id__in=matches.keys(), is_active=True, frequency=SavedSearch.Frequency.INSTANT
+        ).values_list("id", "created_at")
+    )
+    matched_ids = {i for ids in matches.values() for i in ids}
+    created = dict(Listing.objects.filter(id__in=matched_ids).values_list("id", "created_at"))
+    rows = [
+        SavedSearchMatch(saved_search_id=search_id, listing_id=listing_id)
+        for search_id, ids in matches.items()
+        if search_id in searches
+        for listing_id in ids
+        if listing_id in created and created[listing_id] >= searches[search_id]
+    ]
+    if not rows:
+        return {"status": "ok", "queued": 0}
+    SavedSearchMatch.objects.bulk_create(rows, ignore_conflicts=True)
+
+    try:
+        task_send_instant_notifications.delay()
+    except Exception:
+        # The periodic run picks the queued matches up
+        logger.warning("Dispatching instant saved-search notifications failed.", exc_info=True)
+    return {"status": "ok", "queued": len(rows)}
+
+
+@shared_task(name="savedsearches.send_instant_notifications")
+def task_send_instant_notifications():
+    """
+    Send Telegram alerts for percolator matches queued at index time.
+    One message per saved search covers all of its pending matches.
+
+    Matches are claimed (``notified_at`` set) in one transaction before any
+    message goes out, so overlapping runs never alert the same match twice;
+    a failed send puts its matches back in the queue.
+    """
+    now = datetime.now(dt_timezone.utc)
+    pending: Dict[int, List[int]] = {}
+    with transaction.atomic():
+        claimed = (
+            SavedSearchMatch.objects.select_for_update(skip_locked=True)
+            .filter(notified_at__isnull=True)
+            .values_list("id", "saved_search_id")
+        )
+        for match_id, saved_search_id in claimed:
+            pending.setdefault(saved_search_id, []).append(match_id)
+        SavedSearchMatch.objects.filter(id__in=[i for ids in pending.values() for i in ids]).update(notified_at=now)
+    if not pending:
+        return {"status": "ok", "processed": 0, "notifications_sent": 0}
+
+    notifications_sent = 0
+    searches = SavedSearch.objects.filter(id__in=pending.keys()).select_related("user__profile")
+    for saved_search in searches:
+        profile = getattr(saved_search.user, "profile", None)
+        telegram_id = getattr(profile, "telegram_id", None)
+        if (
+            saved_search.is_active
+            and saved_search.frequency == SavedSearch.Frequency.INSTANT
+            and telegram_id
+        ):
+            message = build_notification_message(saved_search, len(pending[saved_search.id]))
+            if not send_telegram_notification(telegram_id, message):
+                # Release the matches for the next run
+                SavedSearchMatch.objects.filter(id__in=pending[saved_search.id]).update(notified_at=None)
+                continue
+            notifications_sent += 1
+            saved_search.last_sent_at = now
+            saved_search.save(update_fields=["last_sent_at"])
+
+    return {"status": "ok", "processed": len(pending), "notifications_sent": notifications_sent}
+
+
 @shared_task(name="savedsearches.run")
 def task_run_saved_searches():
     """Legacy task - runs all saved searches (without notifications)."""
@@ -116,9 +214,7 @@ def task_run_saved_searches():
         return {"status": "skipped", "reason": "no-opensearch"}
     processed = 0
     for s in SavedSearch.objects.filter(is_active=True).iterator():
-        q = s.query or {}
-        body = q.get("body") or {"query": {"bool": {}}}
-        client.search(index=index_name(), body=body)
+        client.search(index=index_name(), body=saved_search_body(s))
         s.last_sent_at = datetime.now(dt_timezone.utc)
         s.save(update_fields=["last_sent_at"])
         processed += 1
@@ -1,10 +1,108 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List
+import logging
+from typing import Any, Dict, Iterable, List
 
+from django.conf import settings
+from django.core.cache import cache
+
+from searchapp.views import query_compiler
 from searchapp.views.opensearch_client import get_client
 from searchapp.views.index import index_name
 
+logger = logging.getLogger(__name__)
+
+# Saved searches evaluated per _msearch request
+MSEARCH_BATCH_SIZE = 50
+
+
+def compile_percolator_query(saved_search) -> Dict[str, Any]:
+    """Compile a saved search into the query /search would run for it.
+
+    Stored as a percolator query; price bounds are converted to the base
+    currency with the exchange rates current at registration time.
+    """
+    return query_compiler.compile_query(query_compiler.from_saved_search(saved_search.query))
+
+
+def saved_search_body(saved_search, size: int = 20) -> Dict[str, Any]:
+    """Search body for a saved search; a raw ``body`` stored in the query wins."""
+    query = saved_search.query or {}
+    if query.get("body"):
+        return query["body"]
+    return query_compiler.compile_body(query_compiler.from_saved_search(query), size=size)
+
+
+def _new_items_body(saved_search) -> Dict[str, Any]:
+    """Count-only search body for items matching ``saved_search`` since last_viewed_at."""
+    bag = query_compiler.from_saved_search(saved_search.query)
+    bag["created_after"] = saved_search.last_viewed_at.isoformat()
+    bag["status"] = "active"
+    return query_compiler.compile_body(bag, size=0, track_total_hits=True)
+
+
+def _count_cache_key(saved_search) -> str:
+    return f"savedsearch:new_items:{saved_search.id}:{saved_search.last_viewed_at.timestamp()}"
+
+
+def _total(response: Dict[str, Any]) -> int:
+    total = response.get("hits", {}).get("total", {})
+    # Handle both dict format and int format
+    if isinstance(total, dict):
+        return total.get("value", 0)
+    return int(total) if total else 0
+
+
+def count_new_items(saved_searches: Iterable) -> Dict[int, int]:
+    """
+    Count new items for many saved searches, keyed by saved search id.
+
+    Counts are cached per (saved search, last_viewed_at); the misses are sent
+    as ``_msearch`` batches instead of one request per saved search. Searches
+    that were never viewed count 0 (no counts for brand new searches).
+    """
+    searches = list(saved_searches)
+    counts: Dict[int, int] = {s.id: 0 for s in searches}
+    viewed = [s for s in searches if s.last_viewed_at]
+    if not viewed:
+        return counts
+
+    keys = {s.id: _count_cache_key(s) for s in viewed}
+    cached = cache.get_many(keys.values())
+    misses = []
+    for s in viewed:
+        if keys[s.id] in cached:
+            counts[s.id] = cached[keys[s.id]]
+        else:
+            misses.append(s)
+
+    client = get_client()
+    if not client or not misses:
+        return counts
+
+    fresh: Dict[str, int] = {}
+    for start in range(0, len(misses), MSEARCH_BATCH_SIZE):
+        batch = misses[start:start + MSEARCH_BATCH_SIZE]
+        lines: List[Dict[str, Any]] = []
+        for s in batch:
+            lines.extend([{}, _new_items_body(s)])
+        try:
+            responses = client.msearch(index=index_name(), body=lines).get("responses", [])
+        except Exception as e:
+            # Log error but don't fail
+            logger.warning("Counting new items for %s saved searches failed: %s", len(batch), e)
+            continue
+        for s, response in zip(batch, responses):
+            if "error" in response:
+                logger.warning("Counting new items for saved search %s failed: %s", s.id, response["error"])
+                continue
+            counts[s.id] = _total(response)
+            fresh[keys[s.id]] = counts[s.id]
+
+    if fresh:
+        cache.set_many(fresh, timeout=int(getattr(settings, "SAVED_SEARCH_COUNT_CACHE_TTL", 300)))
+    return counts
+
 
 def count_new_items_for_saved_search(saved_search) -> int:
     """
@@ -16,131 +114,4 @@ def count_new_items_for_saved_search(saved_search) -> int:
     Returns:
         Number of new items matching the search criteria
     """
-    client = get_client()
-    if not client:
-        return 0
-
-    # If never viewed, return 0 (avoid showing counts for brand new searches)
-    if not saved_search.last_viewed_at:
-        return 0
-
-    query = saved_search.query or {}
-
-    # Build the OpenSearch query from saved search parameters
-    must: List[Dict[str, Any]] = []
-    filter_clauses: List[Dict[str, Any]] = []
-
-    # Extract search parameters
-    params = query.get("params", query)
-
-    # Text search
-    if q := params.get("q"):
-        must.append({
-            "multi_match": {
-                "query": q,
-                "fields": ["title^2", "description"],
-                "type": "best_fields",
-            }
-        })
-
-    # Category filter
-    if category_slug := params.get("category_slug"):
-        filter_clauses.append({"terms": {"category_path": [category_slug]}})
-
-    # Location filter
-    if location_slug := params.get("location_slug"):
-        filter_clauses.append({"term": {"location_slug": location_slug}})
-
-    # Condition filter
-    if condition := params.get("condition"):
-        filter_clauses.append({"term": {"condition": condition}})
-
-    # User filter
-    if user_id := params.get("user_id"):
-        filter_clauses.append({"term": {"user_id": user_id}})
-
-    # Price range filter with currency support
-    currency = params.get("currency", "UZS")
-    price_min = params.get("price_min") or params.get("min_price")
-    price_max = params.get("price_max") or params.get("max_price")
-
-    if price_min is not None or price_max is not None:
-        price_range: Dict[str, Any] = {}
-        if price_min is not None:
-            try:
-                price_range["gte"] = float(price_min)
-            except (ValueError, TypeError):
-                pass
-        if price_max is not None:
-            try:
-                price_range["lte"] = float(price_max)
-            except (ValueError, TypeError):
-                pass
-
-        if price_range:
-            # Filter by price in the specified currency or normalized price in UZS
-            if currency == "UZS":
-                filter_clauses.append({"range": {"price_normalized_uzs": price_range}})
-            else:
-                # For other currencies, filter by both currency and price
-                filter_clauses.append({"term": {"price_currency": currency}})
-                filter_clauses.append({"range": {"price_amount": price_range}})
-
-    # Handle custom attributes
-    if "attrs" in params:
-        attrs = params["attrs"]
-        if isinstance(attrs, dict):
-            for attr_key, attr_values in attrs.items():
-                if not isinstance(attr_values, list):
-                    attr_values = [attr_values]
-                filter_clauses.append({
-                    "nested": {
-                        "path": "attributes",
-                        "query": {
-                            "bool": {
-                                "must": [
-                                    {"term": {"attributes.key": attr_key}},
-                                    {"terms": {"attributes.value": attr_values}},
-                                ]
-                            }
-                        }
-                    }
-                })
-
-    # Add date filter for items created after last_viewed_at
-    filter_clauses.append({
-        "range": {
-            "created_at": {
-                "gt": saved_search.last_viewed_at.isoformat()
-            }
-        }
-    })
-
-    # Add status filter (only active listings)
-    filter_clauses.append({"term": {"status": "active"}})
-
-    # Build the complete query
-    bool_query: Dict[str, Any] = {}
-    if must:
-        bool_query["must"] = must
-    if filter_clauses:
-        bool_query["filter"] = filter_clauses
-
-    body = {
-        "query": {"bool": bool_query} if bool_query else {"match_all": {}},
-        "size": 0,  # We only need the count
-        "track_total_hits": True,
-    }
-
-    try:
-        response = client.search(index=index_name(), body=body)
-        total = response.get("hits", {}).get("total", {})
-
-        # Handle both dict format and int format
-        if isinstance(total, dict):
-            return total.get("value", 0)
-        return int(total) if total else 0
-    except Exception as e:
-        # Log error but don't fail
-        print(f"Error counting new items for saved search {saved_search.id}: {e}")
-        return 0
+    return count_new_items([saved_search])[saved_search.id]
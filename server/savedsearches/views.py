@@ -1,7 +1,5 @@
 from __future__ import annotations
 
-from typing import Any, Dict
-
 from drf_spectacular.utils import OpenApiExample, extend_schema
 from rest_framework import generics, permissions
 from rest_framework.response import Response
@@ -9,6 +7,7 @@ from rest_framework.views import APIView
 
 from .models import SavedSearch
 from .serializers import SavedSearchSerializer
+from .utils import saved_search_body
 from searchapp.views.opensearch_client import get_client
 from searchapp.views.index import index_name
 
@@ -111,16 +110,7 @@ class SavedSearchRunNowView(APIView):
         if not client:
             return Response({"results": [], "total": 0, "note": "OpenSearch not configured"})
 
-        q: Dict[str, Any] = saved.query or {}
-        body = q.get("body")
-        if not body:
-            # If user stored a param bag, translate to a simple bool
-            params = q.get("params", {})
-            must = []
-            if kw := params.get("q"):
-                must.append({"multi_match": {"query": kw, "fields": ["title^2", "description"]}})
-            body = {"query": {"bool": {"must": must}}}
-        resp = client.search(index=index_name(), body=body)
+        resp = client.search(index=index_name(), body=saved_search_body(saved, size=5))
         hits = resp.get("hits", {}).get("hits", [])
         total = resp.get("hits", {}).get("total", {}).get("value", 0)
         return Response({"total": total, "sample": [h.get("_source", {}).get("title") for h in hits[:5]]})
@@ -1,8 +1,12 @@
 from django.urls import path
 
-from .views import ListingSearchView
+from .views import AsyncListingSearchView, ListingSearchView, MapClustersView, SimilarListingsView, SuggestView
 
 urlpatterns = [
     path("search/listings", ListingSearchView.as_view(), name="search-listings"),
+    path("search/listings/async", AsyncListingSearchView.as_view(), name="search-listings-async"),
+    path("search/clusters", MapClustersView.as_view(), name="search-clusters"),
+    path("search/suggest", SuggestView.as_view(), name="search-suggest"),
+    path("listings/<int:pk>/similar", SimilarListingsView.as_view(), name="listing-similar"),
 ]
 
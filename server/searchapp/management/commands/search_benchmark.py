@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import copy
+import statistics
+import time
+from typing import Any, Dict, List
+
+from django.core.management.base import BaseCommand
+
+from searchapp.views.index import index_name
+from searchapp.views.query_compiler import build_text_query
+from searchapp.views.opensearch_client import get_client
+
+DEFAULT_TERMS = "iphone,samsung,phon,kvartira,toyota,noutbuk,divan,velosiped"
+
+
+def _wildcard_query(q: str) -> Dict[str, Any]:
+    """The pre-trigram query shape: ``*token*`` wildcards on the main fields."""
+    body = copy.deepcopy(build_text_query(q))
+    for clause in body.get("bool", {}).get("must", []):
+        shoulds = clause["bool"]["should"]
+        for i, should in enumerate(shoulds):
+            for field, opts in should.get("match", {}).items():
+                if field.endswith(".ngram"):
+                    shoulds[i] = {
+                        "wildcard": {
+                            field[: -len(".ngram")]: {"value": f"*{opts['query']}*", "boost": opts["boost"]}
+                        }
+                    }
+    return body
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare search latency of trigram substring matching against the old "
+        "leading-wildcard queries. Seed and reindex first, e.g. "
+        "`seed_mock_listings` then `search_reindex --rebuild`."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--terms", default=DEFAULT_TERMS, help="Comma-separated query terms")
+        parser.add_argument("--runs", type=int, default=20, help="Runs per term and query shape")
+
+    def handle(self, *args, **options):
+        client = get_client()
+        if not client:
+            self.stdout.write(self.style.ERROR("OpenSearch client not available"))
+            return
+
+        idx = index_name()
+        terms = [t.strip() for t in options["terms"].split(",") if t.strip()]
+        runs = max(1, options["runs"])
+        shapes = {"wildcard": _wildcard_query, "ngram": build_text_query}
+
+        count = client.count(index=idx).get("count", 0)
+        self.stdout.write(f"Index '{idx}': {count} documents; {len(terms)} terms x {runs} runs")
+
+        results: Dict[str, Dict[str, List[float]]] = {}
+        for name, build in shapes.items():
+            took: List[float] = []
+            wall: List[float] = []
+            for term in terms:
+                body = {"size": 20, "query": build(term)}
+                for _ in range(runs):
+                    started = time.perf_counter()
+                    resp = client.search(index=idx, body=body, request_cache=False)
+                    wall.append((time.perf_counter() - started) * 1000)
+                    took.append(float(resp.get("took", 0)))
+            results[name] = {"took": took, "wall": wall}
+
+        for name, series in results.items():
+            took = sorted(series["took"])
+            wall = sorted(series["wall"])
+            self.stdout.write(
+                f"{name:>8}: took p50={statistics.median(took):.1f}ms "
+                f"p95={took[int(len(took) * 0.95) - 1]:.1f}ms "
+                f"mean={statistics.fmean(took):.1f}ms | wall p50={statistics.median(wall):.1f}ms"
+            )
+        before = statistics.median(results["wildcard"]["took"])
+        after = statistics.median(results["ngram"]["took"])
+        if after > 0:
+            self.stdout.write(self.style.SUCCESS(f"Median speed-up: {before / after:.1f}x"))
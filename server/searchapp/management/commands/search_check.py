@@ -8,6 +8,7 @@ from typing import Any, Dict
 from django.core.management.base import BaseCommand
 from django.conf import settings
 
+from searchapp.views.circuit_breaker import get_breaker
 from searchapp.views.opensearch_client import get_client
 from searchapp.views.index import index_name
 
@@ -92,6 +93,12 @@ class Command(BaseCommand):
             self.stderr.write(self.style.ERROR(f"Index check error: {type(e).__name__}: {e}"))
             ok = False
 
+        stats = get_breaker().stats()
+        self.stdout.write(
+            "Circuit breaker (this process): "
+            + ", ".join(f"{key}={value}" for key, value in stats.items())
+        )
+
         if ok:
             self.stdout.write(self.style.SUCCESS("OpenSearch connectivity looks OK."))
             sys.exit(0)
@@ -7,6 +7,6 @@ class Command(BaseCommand):
     help = "Create the OpenSearch index with mappings if it does not exist"
 
     def handle(self, *args, **options):
-        ensure_index()
+        ensure_index(force=True)
         self.stdout.write(self.style.SUCCESS("Index ensured."))
 
@@ -1,8 +1,26 @@
+import time
+from contextlib import nullcontext
+
 from django.core.management.base import BaseCommand
 
 from listings.models import Listing
-from searchapp.views.index import index_listing, index_name
+from searchapp.views import sliced_reindex
+from searchapp.views.index import (
+    DEFAULT_BULK_CHUNK_SIZE,
+    abort_rebuild,
+    alias_name,
+    building_indices,
+    bulk_index_listings,
+    ensure_index,
+    index_listing,
+    index_name,
+    iter_listing_id_chunks,
+    finish_rebuild,
+    refresh_disabled,
+    start_rebuild,
+)
 from searchapp.views.opensearch_client import get_client
+from searchapp.views.reconcile import reconcile
 
 
 class Command(BaseCommand):
@@ -12,12 +30,57 @@ class Command(BaseCommand):
         parser.add_argument(
             '--clear',
             action='store_true',
-            help='Clear all documents from the index before reindexing'
+            help='Start from an empty index. Same as --rebuild: the live index is never emptied in place'
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Build a fresh index from the current mapping while the live alias keeps serving, then swap atomically'
+        )
+        parser.add_argument(
+            '--delete-old',
+            action='store_true',
+            help='With --rebuild, delete the indexes the live alias pointed at before the swap'
+        )
+        parser.add_argument(
+            '--allow-failures',
+            action='store_true',
+            help='With --rebuild, swap the alias even if some documents failed to load'
         )
         parser.add_argument(
             '--delete-stale',
             action='store_true',
-            help='Delete documents from index that no longer exist in database'
+            help='Delete documents whose listing is gone or no longer active (streaming pass), then reindex'
+        )
+        parser.add_argument(
+            '--reconcile',
+            action='store_true',
+            help='Stream index and database ids side by side: delete stale documents and reindex missing or '
+                 'outdated (refreshed_at differs) ones, in _bulk batches of --chunk-size'
+        )
+        parser.add_argument(
+            '--bulk',
+            action='store_true',
+            help='Stream listings in chunks and load them into the live index through the _bulk API'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_BULK_CHUNK_SIZE,
+            help=f'Listings per _bulk request in --bulk, --rebuild and --reconcile modes (default: {DEFAULT_BULK_CHUNK_SIZE})'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='With --bulk or --rebuild, load id ranges in this many processes and checkpoint each '
+                 'finished range, so an interrupted run resumes where it stopped (default: 1, no slicing)'
+        )
+        parser.add_argument(
+            '--range-size',
+            type=int,
+            default=sliced_reindex.DEFAULT_RANGE_SIZE,
+            help=f'Listing ids per checkpointed range with --workers (default: {sliced_reindex.DEFAULT_RANGE_SIZE})'
         )
 
     def handle(self, *args, **options):
@@ -26,51 +89,32 @@ class Command(BaseCommand):
             self.stdout.write(self.style.ERROR("OpenSearch client not available"))
             return
 
-        idx = index_name()
-
-        # Clear index if requested
-        if options.get('clear'):
-            self.stdout.write("Clearing index...")
-            try:
-                client.delete_by_query(
-                    index=idx,
-                    body={"query": {"match_all": {}}}
+        chunk_size = max(1, options['chunk_size'])
+        workers = max(1, options['workers'])
+        range_size = max(1, options['range_size'])
+        if options.get('rebuild') or options.get('clear'):
+            if workers > 1:
+                self._sliced_rebuild(
+                    chunk_size, workers, range_size, options.get('delete_old', False),
+                    options.get('allow_failures', False),
                 )
-                self.stdout.write(self.style.SUCCESS("Index cleared"))
-            except Exception as e:
-                self.stdout.write(self.style.WARNING(f"Failed to clear index: {e}"))
+            else:
+                self._rebuild(chunk_size, options.get('delete_old', False), options.get('allow_failures', False))
+            return
+
+        if options.get('reconcile'):
+            self._reconcile(chunk_size, delete_only=False)
+            return
 
-        # Delete stale documents
         if options.get('delete_stale'):
-            self.stdout.write("Checking for stale documents...")
-            try:
-                # Get all document IDs from OpenSearch
-                response = client.search(
-                    index=idx,
-                    body={
-                        "query": {"match_all": {}},
-                        "size": 10000,
-                        "_source": False
-                    }
-                )
+            self._reconcile(chunk_size, delete_only=True)
 
-                index_ids = {hit['_id'] for hit in response['hits']['hits']}
-                db_ids = set(Listing.objects.values_list('id', flat=True))
-
-                stale_ids = index_ids - {str(id) for id in db_ids}
-
-                if stale_ids:
-                    self.stdout.write(f"Found {len(stale_ids)} stale documents")
-                    for stale_id in stale_ids:
-                        try:
-                            client.delete(index=idx, id=stale_id)
-                            self.stdout.write(f"Deleted stale document: {stale_id}")
-                        except Exception as e:
-                            self.stdout.write(self.style.WARNING(f"Failed to delete {stale_id}: {e}"))
-                else:
-                    self.stdout.write("No stale documents found")
-            except Exception as e:
-                self.stdout.write(self.style.WARNING(f"Failed to check stale documents: {e}"))
+        if options.get('bulk'):
+            if workers > 1:
+                self._sliced_bulk_reindex(chunk_size, workers, range_size)
+            else:
+                self._bulk_reindex(chunk_size)
+            return
 
         # Reindex all listings
         qs = Listing.objects.filter(status=Listing.Status.ACTIVE).only("id")
@@ -93,3 +137,158 @@ class Command(BaseCommand):
             f"Reindex complete. Success: {success}, Failed: {failed}"
         ))
 
+    def _reconcile(self, chunk_size, delete_only):
+        self.stdout.write("Reconciling index with the database...")
+        started = time.monotonic()
+
+        def progress(stats):
+            self.stdout.write(
+                f"Deleted {stats['deleted']}, reindexed {stats['reindexed']}, failed {stats['failed']} "
+                f"({time.monotonic() - started:.1f}s)"
+            )
+
+        try:
+            stats = reconcile(chunk_size, delete_only=delete_only, progress=progress)
+        except Exception as e:
+            self.stdout.write(self.style.WARNING(f"Reconciliation failed: {e}"))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Reconciliation complete. Deleted: {stats['deleted']}, Reindexed: {stats['reindexed']}, "
+            f"Failed: {stats['failed']}"
+        ))
+
+    def _rebuild(self, chunk_size, delete_old, allow_failures=False):
+        ensure_index()
+        new_idx = start_rebuild()
+        self.stdout.write(f"Building {new_idx} while '{index_name()}' keeps serving searches...")
+        try:
+            success, failed = self._bulk_load([new_idx], chunk_size, refresh_target=new_idx)
+        except BaseException:
+            self.stdout.write(self.style.ERROR(f"Rebuild interrupted; dropping {new_idx}"))
+            abort_rebuild(new_idx)
+            raise
+
+        if failed and not allow_failures:
+            # Swapping would serve an index missing these documents
+            self.stdout.write(self.style.ERROR(
+                f"{failed} documents failed to load; dropping {new_idx} and keeping '{index_name()}' as is. "
+                f"Run again, or pass --allow-failures to swap anyway."
+            ))
+            abort_rebuild(new_idx)
+            return
+
+        old = finish_rebuild(new_idx, delete_old=delete_old)
+        self.stdout.write(self.style.SUCCESS(
+            f"Alias '{index_name()}' now points at {new_idx}. Success: {success}, Failed: {failed}"
+        ))
+        if old:
+            verb = "Deleted" if delete_old else "Kept for rollback"
+            self.stdout.write(f"{verb}: {', '.join(old)}")
+
+    def _sliced_rebuild(self, chunk_size, workers, range_size, delete_old, allow_failures=False):
+        ensure_index()
+        resumable = [i for i in building_indices() if sliced_reindex.has_pending_ranges(i)]
+        if resumable:
+            new_idx = resumable[0]
+            self.stdout.write(f"Resuming the interrupted build of {new_idx}...")
+        else:
+            new_idx = start_rebuild()
+            self.stdout.write(f"Building {new_idx} while '{index_name()}' keeps serving searches...")
+
+        # An interrupted run keeps the index and its checkpoints for the next run
+        success, failed = self._sliced_load(
+            new_idx, [new_idx], chunk_size, workers, range_size, refresh_target=new_idx
+        )
+        if failed and not allow_failures:
+            # Ranges with failures stay pending: the next run retries only those
+            self.stdout.write(self.style.ERROR(
+                f"{failed} documents failed to load; keeping {new_idx} unswapped. "
+                f"Run the same command again to retry the failed ranges, or pass --allow-failures to swap anyway."
+            ))
+            return
+        sliced_reindex.clear_ranges(new_idx)
+
+        old = finish_rebuild(new_idx, delete_old=delete_old)
+        self.stdout.write(self.style.SUCCESS(
+            f"Alias '{index_name()}' now points at {new_idx}. Success: {success}, Failed: {failed}"
+        ))
+        if old:
+            verb = "Deleted" if delete_old else "Kept for rollback"
+            self.stdout.write(f"{verb}: {', '.join(old)}")
+
+    def _sliced_bulk_reindex(self, chunk_size, workers, range_size):
+        ensure_index()
+        target = alias_name()
+        if sliced_reindex.has_pending_ranges(target):
+            self.stdout.write("Resuming the interrupted bulk reindex...")
+        success, failed = self._sliced_load(target, None, chunk_size, workers, range_size)
+        if failed:
+            self.stdout.write(self.style.WARNING(
+                f"Bulk reindex finished with {failed} failed documents ({success} ok). "
+                f"Run the same command again to retry the failed ranges."
+            ))
+            return
+        sliced_reindex.clear_ranges(target)
+        self.stdout.write(self.style.SUCCESS(f"Bulk reindex complete. Success: {success}, Failed: {failed}"))
+
+    def _sliced_load(self, target, indices, chunk_size, workers, range_size, refresh_target=None):
+        ranges = sliced_reindex.plan_ranges(target, range_size)
+        self.stdout.write(f"Loading {len(ranges)} id ranges with {workers} workers...")
+        started = time.monotonic()
+        done = [0]
+
+        def progress(checkpoint):
+            done[0] += 1
+            elapsed = max(time.monotonic() - started, 1e-6)
+            self.stdout.write(
+                f"Range {checkpoint.start_id}..{checkpoint.end_id - 1}: {checkpoint.succeeded} ok, "
+                f"{checkpoint.failed} failed — {done[0]}/{len(ranges)} ranges in {elapsed:.1f}s"
+            )
+
+        try:
+            with self._refresh_paused(refresh_target):
+                sliced_reindex.run_ranges(indices, ranges, workers, chunk_size, progress=progress)
+        except BaseException:
+            self.stdout.write(self.style.WARNING(
+                f"Interrupted after {done[0]}/{len(ranges)} ranges; run the same command again to resume."
+            ))
+            raise
+        return sliced_reindex.range_totals(target)
+
+    def _bulk_reindex(self, chunk_size):
+        ensure_index()
+        success, failed = self._bulk_load(None, chunk_size)
+        self.stdout.write(self.style.SUCCESS(f"Bulk reindex complete. Success: {success}, Failed: {failed}"))
+
+    def _bulk_load(self, indices, chunk_size, refresh_target=None):
+        count = Listing.objects.filter(status=Listing.Status.ACTIVE).count()
+        self.stdout.write(f"Bulk indexing {count} active listings in chunks of {chunk_size}...")
+
+        success = 0
+        failed = 0
+        started = time.monotonic()
+        with self._refresh_paused(refresh_target):
+            for n, ids in enumerate(iter_listing_id_chunks(chunk_size), start=1):
+                chunk_started = time.monotonic()
+                try:
+                    ok, errors = bulk_index_listings(ids, indices=indices, notify=False)
+                except Exception as e:
+                    ok, errors = 0, len(ids)
+                    self.stdout.write(self.style.WARNING(f"Chunk {n} failed ({ids[0]}..{ids[-1]}): {e}"))
+                success += ok
+                failed += errors
+                elapsed = max(time.monotonic() - chunk_started, 1e-6)
+                self.stdout.write(
+                    f"Chunk {n}: {ok} ok, {errors} failed in {elapsed:.2f}s "
+                    f"({len(ids) / elapsed * 60:.0f} docs/min) — {success + failed}/{count}"
+                )
+
+        total_elapsed = max(time.monotonic() - started, 1e-6)
+        self.stdout.write(f"Loaded in {total_elapsed:.1f}s ({(success + failed) / total_elapsed * 60:.0f} docs/min)")
+        return success, failed
+
+    @staticmethod
+    def _refresh_paused(refresh_target):
+        # Only an index nobody searches yet may go without refresh; in-place
+        # loads keep the live index's refresh so edits stay visible
+        return refresh_disabled(refresh_target) if refresh_target else nullcontext()
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from currency.models import Currency
+from currency.services import CurrencyService
+from searchapp.views.opensearch_client import get_client
+from searchapp.views.repricing import reprice_currency
+
+
+class Command(BaseCommand):
+    help = "Recompute price_normalized in the search index from the current exchange rates"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'currencies',
+            nargs='*',
+            help='Currency codes to reprice (default: every active non-base currency)'
+        )
+
+    def handle(self, *args, **options):
+        if not get_client():
+            self.stdout.write(self.style.ERROR("OpenSearch client not available"))
+            return
+
+        CurrencyService.clear_cache()
+        currencies = [c.upper() for c in options['currencies']]
+        if not currencies:
+            default = CurrencyService.get_default_currency()
+            qs = Currency.objects.filter(is_active=True)
+            if default:
+                qs = qs.exclude(pk=default.pk)
+            currencies = list(qs.values_list('code', flat=True))
+
+        for code in currencies:
+            def progress(idx, status, code=code):
+                self.stdout.write(
+                    f"{code} in {idx}: {status.get('updated', 0)}/{status.get('total', 0)} updated"
+                )
+
+            totals = reprice_currency(code, progress=progress)
+            self.stdout.write(self.style.SUCCESS(
+                f"Repriced {code}. Total: {totals['total']}, Updated: {totals['updated']}, Failed: {totals['failed']}"
+            ))
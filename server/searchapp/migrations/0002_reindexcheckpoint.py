@@ -0,0 +1,30 @@
+# Generated by Django 4.2.28 on 2026-10-18 02:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('searchapp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReindexCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('target', models.CharField(max_length=255)),
+                ('start_id', models.BigIntegerField()),
+                ('end_id', models.BigIntegerField()),
+                ('succeeded', models.PositiveIntegerField(default=0)),
+                ('failed', models.PositiveIntegerField(default=0)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['target', 'start_id'],
+                'unique_together': {('target', 'start_id')},
+            },
+        ),
+    ]
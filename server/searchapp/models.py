@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+from django.db import models
+
+
+class IndexRetry(models.Model):
+    """A listing whose search sync could not run and must be retried.
+
+    Rows are written while the search backend is unavailable (circuit open or
+    broker down) and drained by ``search.drain_index_retries`` once it
+    recovers. One row per listing; the sync always reads current DB state.
+    """
+
+    listing_id = models.BigIntegerField(unique=True)
+    attempts = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["id"]
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"IndexRetry(listing={self.listing_id}, attempts={self.attempts})"
+
+
+class ReindexCheckpoint(models.Model):
+    """One id range of a sliced reindex and whether it has been loaded.
+
+    ``search_reindex --workers`` plans every range of a run up front and
+    marks each one complete as its worker finishes, so an interrupted run
+    resumes with the ranges still pending. ``target`` is the index being
+    built, or the live alias for ``--bulk``.
+    """
+
+    target = models.CharField(max_length=255)
+    start_id = models.BigIntegerField()
+    # Exclusive
+    end_id = models.BigIntegerField()
+    succeeded = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["target", "start_id"]
+        unique_together = [["target", "start_id"]]
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"ReindexCheckpoint({self.target}, {self.start_id}-{self.end_id})"
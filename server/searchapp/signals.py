@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+# Sent after live index writes of edited listings (not rebuilds, bulk loads
+# or reconciliation) with ``documents``: {listing_id: search document} for
+# the listings written
+listings_indexed = Signal()
@@ -1,8 +1,28 @@
 from __future__ import annotations
 
+import logging
+from typing import Dict, Iterable, List
+
 from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+
+from .models import IndexRetry
+from .views.circuit_breaker import get_breaker
+from .views.engagement import refresh_engagement
+from .views.index import bulk_index_listings, delete_listing, index_listing
+from .views.repricing import repricing_status, start_repricing
+
+logger = logging.getLogger(__name__)
 
-from .views.index import delete_listing, index_listing
+RETRY_DRAIN_BATCH_SIZE = 500
+# Seconds between repricing status checks
+REPRICE_POLL_INTERVAL = 10
+
+
+def _pending_key(listing_id: int) -> str:
+    return f"search:index:pending:{listing_id}"
 
 
 @shared_task(name="search.index_listing")
@@ -10,7 +30,126 @@ def task_index_listing(listing_id: int):
     index_listing(listing_id)
 
 
+@shared_task(name="search.index_listings")
+def task_index_listings(listing_ids: List[int]):
+    """Reindex a batch of listings (e.g. after a bulk status change) in one _bulk call.
+
+    Missing or inactive listings are removed from the index, so the same task
+    serves saves and deletes.
+    """
+    # Release the debounce markers before reading the DB so that changes
+    # committed from here on schedule a fresh run instead of being dropped
+    cache.delete_many([_pending_key(i) for i in listing_ids])
+    if get_breaker().is_open():
+        queue_index_retry(listing_ids)
+        return
+    try:
+        bulk_index_listings(listing_ids)
+    except Exception:
+        logger.warning("Search sync failed for listings %s; queued for retry.", listing_ids, exc_info=True)
+        queue_index_retry(listing_ids)
+
+
 @shared_task(name="search.delete_listing")
 def task_delete_listing(listing_id: int):
     delete_listing(listing_id)
 
+
+@shared_task(name="search.drain_index_retries")
+def task_drain_index_retries(batch_size: int = RETRY_DRAIN_BATCH_SIZE) -> int:
+    """Replay queued listing syncs while the search backend is reachable.
+
+    Returns the number of listings synced.
+    """
+    synced = 0
+    while not get_breaker().is_open():
+        rows = list(IndexRetry.objects.order_by("id").values_list("id", "listing_id")[:batch_size])
+        if not rows:
+            break
+        row_ids = [row_id for row_id, _ in rows]
+        listing_ids = [listing_id for _, listing_id in rows]
+        try:
+            bulk_index_listings(listing_ids)
+        except Exception:
+            IndexRetry.objects.filter(id__in=row_ids).update(attempts=F("attempts") + 1)
+            logger.warning("Retrying search sync for %s listings failed.", len(listing_ids), exc_info=True)
+            break
+        IndexRetry.objects.filter(id__in=row_ids).delete()
+        synced += len(listing_ids)
+    return synced
+
+
+@shared_task(name="search.reprice_currency")
+def task_reprice_currency(currency: str) -> dict:
+    """Start recomputing ``price_normalized`` in the index for listings priced in ``currency``.
+
+    Only starts the ``update_by_query`` tasks; ``search.reprice_currency_status``
+    follows them up, so a long repricing never runs into the task time limit.
+    """
+    if get_breaker().is_open():
+        logger.warning("Search backend unavailable; repricing %s skipped.", currency)
+        return {}
+    tasks = start_repricing(currency)
+    if tasks:
+        task_repricing_status.apply_async((currency, tasks), countdown=REPRICE_POLL_INTERVAL)
+    return tasks
+
+
+@shared_task(name="search.reprice_currency_status")
+def task_repricing_status(currency: str, tasks: Dict[str, str]) -> dict:
+    """Log the progress of a repricing and check again until it has completed."""
+
+    def progress(idx, status):
+        logger.info(
+            "Repricing %s in %s: %s/%s updated.",
+            currency, idx, status.get("updated", 0), status.get("total", 0),
+        )
+
+    completed, totals = repricing_status(tasks, progress=progress)
+    if not completed:
+        task_repricing_status.apply_async((currency, tasks), countdown=REPRICE_POLL_INTERVAL)
+        return {}
+    logger.info("Repriced %s: %s", currency, totals)
+    return totals
+
+
+@shared_task(name="search.refresh_engagement")
+def task_refresh_engagement() -> dict:
+    """Copy changed view and favorite counts into the index as partial updates."""
+    if get_breaker().is_open():
+        logger.warning("Search backend unavailable; engagement refresh skipped.")
+        return {}
+    totals = refresh_engagement()
+    if totals["updated"] or totals["failed"]:
+        logger.info("Refreshed engagement signals: %s", totals)
+    return totals
+
+
+def queue_index_retry(listing_ids: Iterable[int]) -> None:
+    """Persist listing ids whose sync must be replayed once the backend recovers."""
+    IndexRetry.objects.bulk_create(
+        [IndexRetry(listing_id=i) for i in set(listing_ids)],
+        ignore_conflicts=True,
+    )
+
+
+def schedule_index_listings(listing_ids: Iterable[int]) -> List[int]:
+    """Enqueue one deduplicated ``task_index_listings`` run for ``listing_ids``.
+
+    With ``SEARCH_INDEX_DEBOUNCE_SECONDS`` > 0 the task is delayed by that
+    window and listings that already have a run pending are skipped, so
+    repeated updates to the same listing collapse into a single reindex.
+    Returns the ids that were actually enqueued.
+    """
+    window = int(getattr(settings, "SEARCH_INDEX_DEBOUNCE_SECONDS", 0))
+    ids = sorted(set(listing_ids))
+    if window > 0:
+        ids = [i for i in ids if cache.add(_pending_key(i), 1, timeout=window * 10)]
+    if not ids:
+        return []
+    try:
+        task_index_listings.apply_async(args=[ids], countdown=window or None)
+    except Exception:
+        cache.delete_many([_pending_key(i) for i in ids])
+        raise
+    return ids
@@ -0,0 +1,1512 @@
+from __future__ import annotations
+
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from listings.models import Listing
+from taxonomy.models import Category, Location
+
+from . import tasks
+from .models import IndexRetry
+from .views.circuit_breaker import CircuitBreaker, CircuitBreakerTransport, SearchUnavailable, get_breaker
+from .views import index, opensearch_client
+
+
+class BulkIndexTests(TestCase):
+    def setUp(self):
+        self.schedule_patcher = patch("listings.signals.schedule_index_listings", return_value=[])
+        self.schedule_patcher.start()
+        self.addCleanup(self.schedule_patcher.stop)
+
+        self.seller = get_user_model().objects.create_user(username="seller", password="pass123")
+        self.location = Location.objects.create(name="Tashkent", slug="tashkent", kind=Location.Kind.CITY)
+        self.category = Category.objects.create(name="Phones", slug="phones", level=0, is_leaf=True)
+
+    def _create_listing(self, **kwargs) -> Listing:
+        defaults = {
+            "user": self.seller,
+            "category": self.category,
+            "location": self.location,
+            "title": "iPhone 15",
+            "price_amount": Decimal("1000000"),
+            "price_currency": "UZS",
+            "status": Listing.Status.ACTIVE,
+        }
+        defaults.update(kwargs)
+        return Listing.objects.create(**defaults)
+
+    def test_iter_listing_id_chunks_pages_active_listings(self):
+        listings = [self._create_listing(title=f"Phone {i}") for i in range(5)]
+        self._create_listing(status=Listing.Status.DRAFT)
+
+        chunks = list(index.iter_listing_id_chunks(chunk_size=2))
+
+        self.assertEqual(chunks, [[l.id for l in listings[:2]], [l.id for l in listings[2:4]], [listings[4].id]])
+
+    def test_bulk_index_listings_sends_one_bulk_request(self):
+        active = self._create_listing()
+        paused = self._create_listing(status=Listing.Status.PAUSED)
+        missing_id = paused.id + 100
+
+        with patch.object(index, "get_client", return_value=MagicMock()), patch.object(
+            index.helpers, "bulk", return_value=(3, [])
+        ) as bulk_mock:
+            result = index.bulk_index_listings([active.id, paused.id, missing_id])
+
+        self.assertEqual(result, (3, 0))
+        bulk_mock.assert_called_once()
+        actions = bulk_mock.call_args.args[1]
+        ops = {(a["_op_type"], a["_id"]) for a in actions}
+        self.assertEqual(
+            ops,
+            {("index", str(active.id)), ("delete", str(paused.id)), ("delete", str(missing_id))},
+        )
+        by_id = {a["_id"]: a for a in actions}
+        paused.refresh_from_db()
+        self.assertEqual(by_id[str(paused.id)]["version"], index.document_version(paused.revision))
+        self.assertEqual(by_id[str(active.id)]["version_type"], "external_gte")
+        self.assertNotIn("version", by_id[str(missing_id)])
+
+    def test_stale_writes_are_superseded_not_failed(self):
+        first = self._create_listing()
+        second = self._create_listing()
+        errors = [
+            {"index": {"_id": str(first.id), "status": 409}},
+            {"delete": {"_id": "999999", "status": 404}},
+        ]
+
+        client = MagicMock()
+        client.mget.return_value = {
+            "docs": [{"_id": str(first.id), "found": True, "_version": index.document_version(first.revision + 1)}]
+        }
+
+        with patch.object(index, "get_client", return_value=client), patch.object(
+            index.helpers, "bulk", return_value=(1, errors)
+        ) as bulk_mock, patch.object(index, "_notify_indexed") as notify_mock:
+            result = index.bulk_index_listings([first.id, second.id, 999999])
+
+        self.assertEqual(result, (2, 0))
+        bulk_mock.assert_called_once()
+        self.assertEqual(list(notify_mock.call_args.args[0]), [second.id])
+
+    def test_same_revision_write_after_partial_update_is_resent(self):
+        listing = self._create_listing()
+        # The document was indexed, then a partial update bumped its version
+        stored_version = index.document_version(listing.revision) + 1
+        client = MagicMock()
+        client.mget.return_value = {"docs": [{"_id": str(listing.id), "found": True, "_version": stored_version}]}
+        conflict = [{"index": {"_id": str(listing.id), "status": 409}}]
+
+        with patch.object(index, "get_client", return_value=client), patch.object(
+            index.helpers, "bulk", side_effect=[(0, conflict), (1, [])]
+        ) as bulk_mock, patch.object(index, "_notify_indexed") as notify_mock:
+            result = index.bulk_index_listings([listing.id])
+
+        self.assertEqual(result, (1, 0))
+        self.assertEqual(bulk_mock.call_count, 2)
+        (resent,) = bulk_mock.call_args.args[1]
+        self.assertEqual(resent["version"], stored_version)
+        self.assertEqual(list(notify_mock.call_args.args[0]), [listing.id])
+
+    def test_same_revision_write_that_keeps_conflicting_fails(self):
+        listing = self._create_listing()
+        client = MagicMock()
+        client.mget.return_value = {
+            "docs": [{"_id": str(listing.id), "found": True, "_version": index.document_version(listing.revision) + 1}]
+        }
+        conflict = [{"index": {"_id": str(listing.id), "status": 409}}]
+
+        with patch.object(index, "get_client", return_value=client), patch.object(
+            index.helpers, "bulk", return_value=(0, conflict)
+        ), patch.object(index, "_notify_indexed"):
+            result = index.bulk_index_listings([listing.id])
+
+        self.assertEqual(result, (0, 1))
+
+    def test_index_listing_resends_same_revision_after_partial_update(self):
+        listing = self._create_listing()
+        stored_version = index.document_version(listing.revision) + 1
+        client = MagicMock()
+        client.index.side_effect = [index.ConflictError(409, "version_conflict_engine_exception", {}), {}]
+        client.mget.return_value = {"docs": [{"_id": str(listing.id), "found": True, "_version": stored_version}]}
+
+        with patch.object(index, "get_client", return_value=client), patch.object(
+            index, "ensure_index"
+        ), patch.object(index, "_notify_indexed") as notify_mock:
+            index.index_listing(listing.id)
+
+        self.assertEqual(client.index.call_args.kwargs["version"], stored_version)
+        notify_mock.assert_called_once()
+
+    def test_search_sync_bumps_revision_before_scheduling(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            listing = self._create_listing()
+        listing.refresh_from_db()
+        self.assertEqual(listing.revision, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            listing.title = "iPhone 15 Pro"
+            listing.save()
+        listing.refresh_from_db()
+        self.assertEqual(listing.revision, 2)
+        self.assertLess(index.document_version(1) + 1000, index.document_version(2))
+
+    def test_full_save_of_a_stale_instance_keeps_the_revision(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            listing = self._create_listing()
+        first = Listing.objects.get(pk=listing.pk)
+        second = Listing.objects.get(pk=listing.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.title = "iPhone 15 Pro"
+            first.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            second.status = Listing.Status.PAUSED
+            second.save()
+
+        listing.refresh_from_db()
+        # Each state got its own revision; the stale instance didn't write its copy back
+        self.assertEqual(listing.revision, 3)
+        self.assertEqual(listing.status, Listing.Status.PAUSED)
+
+    def test_build_document_many_query_count_is_independent_of_batch_size(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        from accounts.models import Profile
+        from listings.models import ListingAttributeValue
+        from taxonomy.models import Attribute
+
+        Profile.objects.create(user=self.seller, phone_e164="+998901112233", display_name="Seller")
+        region = Location.objects.create(name="Region", slug="region", kind=Location.Kind.REGION)
+        self.location.parent = region
+        self.location.save()
+        child = Category.objects.create(name="Smartphones", slug="smartphones", parent=self.category, level=1)
+        attribute = Attribute.objects.create(category=child, key="storage", label="Storage", type=Attribute.Type.TEXT)
+
+        listings = [self._create_listing(category=child, title=f"Phone {i}") for i in range(6)]
+        for listing in listings:
+            ListingAttributeValue.objects.create(listing=listing, attribute=attribute, value_text="128GB")
+
+        with CaptureQueriesContext(connection) as single:
+            index.build_document_many([listings[0].id])
+        with CaptureQueriesContext(connection) as batch:
+            docs = index.build_document_many([l.id for l in listings])
+
+        self.assertEqual(len(batch.captured_queries), len(single.captured_queries))
+        doc = docs[listings[3].id]
+        self.assertEqual(doc["category_path"], ["phones", "smartphones"])
+        self.assertEqual(doc["location_path"], ["region", "tashkent"])
+        self.assertEqual(doc["seller_name"], "Seller")
+        self.assertEqual(doc["attrs"][0]["value_text"], "128GB")
+
+
+    def test_build_documents_stores_card_payload(self):
+        from accounts.models import Profile
+        from listings.models import ListingMedia
+
+        Profile.objects.create(
+            user=self.seller, phone_e164="+998901112233", display_name="Seller", avatar_url="https://cdn.example/a.png"
+        )
+        listing = self._create_listing(is_price_negotiable=True, deal_type=Listing.DealType.EXCHANGE)
+        ListingMedia.objects.create(listing=listing, image="listings/cover.jpg", width=1200, height=900, order=0)
+        ListingMedia.objects.create(listing=listing, image="listings/second.jpg", order=1)
+
+        card = index.build_document_many([listing.id])[listing.id]["card"]
+
+        self.assertEqual(card["v"], index.CARD_VERSION)
+        self.assertTrue(card["is_price_negotiable"])
+        self.assertEqual(card["deal_type"], "exchange")
+        self.assertEqual(card["image"]["width"], 1200)
+        self.assertTrue(card["image"]["url"].endswith("listings/cover.jpg"))
+        self.assertEqual(card["media_count"], 2)
+        self.assertEqual(card["seller"], {"id": self.seller.id, "name": "Seller", "avatar_url": "https://cdn.example/a.png"})
+        self.assertFalse(index.mapping_body()["mappings"]["properties"]["card"]["enabled"])
+
+class AliasRebuildTests(TestCase):
+    def setUp(self):
+        index._reset_write_targets()
+        self.addCleanup(index._reset_write_targets)
+        self.client_mock = MagicMock()
+        patcher = patch.object(index, "get_client", return_value=self.client_mock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_write_targets_include_index_being_built(self):
+        self.client_mock.indices.get_alias.return_value = {
+            "sail_listings_v2": {"aliases": {"sail_listings": {}}},
+            "sail_listings_v2_20260101000000": {"aliases": {"sail_listings_building": {}}},
+            "sail_listings_v1": {"aliases": {}},
+        }
+
+        self.assertEqual(index.write_targets(), ["sail_listings_v2", "sail_listings_v2_20260101000000"])
+
+    def test_finish_rebuild_swaps_alias_in_one_request(self):
+        self.client_mock.indices.get_alias.return_value = {
+            "sail_listings_v2": {"aliases": {"sail_listings": {}}},
+            "sail_listings_v2_new": {"aliases": {"sail_listings_building": {}}},
+        }
+
+        old = index.finish_rebuild("sail_listings_v2_new")
+
+        self.assertEqual(old, ["sail_listings_v2"])
+        self.client_mock.indices.update_aliases.assert_called_once_with(
+            body={
+                "actions": [
+                    {"remove": {"index": "sail_listings_v2", "alias": "sail_listings"}},
+                    {"add": {"index": "sail_listings_v2_new", "alias": "sail_listings"}},
+                    {"remove": {"index": "sail_listings_v2_new", "alias": "sail_listings_building"}},
+                ]
+            }
+        )
+        self.client_mock.indices.delete.assert_not_called()
+
+    def test_rebuild_waits_out_cached_write_targets(self):
+        self.client_mock.indices.get_alias.return_value = {
+            "sail_listings_v2": {"aliases": {"sail_listings": {}}},
+            "sail_listings_v2_new": {"aliases": {"sail_listings_building": {}}},
+        }
+
+        with patch.object(index.time, "sleep") as sleep_mock:
+            index.start_rebuild()
+            sleep_mock.assert_called_once_with(index.WRITE_TARGETS_TTL)
+            sleep_mock.reset_mock()
+
+            index.finish_rebuild("sail_listings_v2_new", delete_old=True)
+
+        sleep_mock.assert_called_once_with(index.WRITE_TARGETS_TTL)
+        self.client_mock.indices.delete.assert_called_once_with(index="sail_listings_v2")
+
+    def test_rebuild_with_failed_documents_keeps_the_live_index(self):
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        from .management.commands import search_reindex
+
+        with patch.object(search_reindex, "get_client", return_value=self.client_mock), patch.object(
+            search_reindex, "ensure_index"
+        ), patch.object(search_reindex, "start_rebuild", return_value="sail_listings_v2_new"), patch.object(
+            search_reindex.Command, "_bulk_load", return_value=(9, 1)
+        ), patch.object(search_reindex, "finish_rebuild", return_value=[]) as finish_mock, patch.object(
+            search_reindex, "abort_rebuild"
+        ) as abort_mock:
+            call_command("search_reindex", "--rebuild", stdout=StringIO())
+            finish_mock.assert_not_called()
+            abort_mock.assert_called_once_with("sail_listings_v2_new")
+
+            call_command("search_reindex", "--rebuild", "--allow-failures", stdout=StringIO())
+            finish_mock.assert_called_once_with("sail_listings_v2_new", delete_old=False)
+
+    def test_in_place_bulk_reindex_keeps_live_refresh(self):
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        from .management.commands import search_reindex
+
+        with patch.object(search_reindex, "get_client", return_value=self.client_mock), patch.object(
+            search_reindex, "ensure_index"
+        ), patch.object(search_reindex, "iter_listing_id_chunks", return_value=iter([[1, 2]])), patch.object(
+            search_reindex, "bulk_index_listings", return_value=(2, 0)
+        ), patch.object(search_reindex, "refresh_disabled") as refresh_mock:
+            call_command("search_reindex", "--bulk", stdout=StringIO())
+
+        refresh_mock.assert_not_called()
+
+
+class ScheduleIndexTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    @override_settings(SEARCH_INDEX_DEBOUNCE_SECONDS=5)
+    def test_repeated_updates_within_window_collapse(self):
+        with patch.object(tasks.task_index_listings, "apply_async") as apply_mock:
+            self.assertEqual(tasks.schedule_index_listings([3, 1, 3]), [1, 3])
+            self.assertEqual(tasks.schedule_index_listings([1, 2]), [2])
+
+        self.assertEqual(apply_mock.call_count, 2)
+        self.assertEqual(apply_mock.call_args_list[0].kwargs, {"args": [[1, 3]], "countdown": 5})
+
+        with patch.object(tasks, "bulk_index_listings") as bulk_mock:
+            tasks.task_index_listings([1, 3])
+        bulk_mock.assert_called_once_with([1, 3])
+
+        with patch.object(tasks.task_index_listings, "apply_async"):
+            self.assertEqual(tasks.schedule_index_listings([1]), [1])
+
+    @override_settings(SEARCH_INDEX_DEBOUNCE_SECONDS=5)
+    def test_failed_dispatch_releases_pending_markers(self):
+        with patch.object(tasks.task_index_listings, "apply_async", side_effect=RuntimeError("broker down")):
+            with self.assertRaises(RuntimeError):
+                tasks.schedule_index_listings([7])
+        with patch.object(tasks.task_index_listings, "apply_async"):
+            self.assertEqual(tasks.schedule_index_listings([7]), [7])
+
+
+class ClientBootstrapTests(TestCase):
+    def setUp(self):
+        opensearch_client.reset_client()
+        self.addCleanup(opensearch_client.reset_client)
+        index._index_ready = False
+        self.addCleanup(setattr, index, "_index_ready", False)
+
+    def test_get_client_is_shared_per_process(self):
+        with patch.object(opensearch_client, "OpenSearch") as os_cls:
+            first = opensearch_client.get_client()
+            second = opensearch_client.get_client()
+
+        self.assertIs(first, second)
+        os_cls.assert_called_once()
+        self.assertIn("pool_maxsize", os_cls.call_args.kwargs)
+
+    def test_ensure_index_checks_the_cluster_once(self):
+        client_mock = MagicMock()
+        client_mock.indices.exists_alias.return_value = True
+        with patch.object(index, "get_client", return_value=client_mock):
+            index.ensure_index()
+            index.ensure_index()
+            index.ensure_index(force=True)
+
+        self.assertEqual(client_mock.indices.exists_alias.call_count, 2)
+
+
+class CircuitBreakerTests(TestCase):
+    def setUp(self):
+        get_breaker().reset()
+        self.addCleanup(get_breaker().reset)
+
+    def test_opens_after_threshold_and_half_opens_after_timeout(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+        with patch("searchapp.views.circuit_breaker.time.monotonic", return_value=100.0):
+            breaker.record_failure()
+            self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+            breaker.record_failure()
+            self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+            self.assertFalse(breaker.allow_request())
+
+        with patch("searchapp.views.circuit_breaker.time.monotonic", return_value=131.0):
+            self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+            self.assertTrue(breaker.allow_request())
+            # Only one trial request at a time
+            self.assertFalse(breaker.allow_request())
+            breaker.record_success()
+            self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+        self.assertEqual(breaker.stats()["rejected"], 2)
+        self.assertEqual(breaker.stats()["opened"], 1)
+
+    def test_transport_rejects_calls_while_open(self):
+        from opensearchpy.exceptions import ConnectionError as OpenSearchConnectionError
+
+        transport = CircuitBreakerTransport.__new__(CircuitBreakerTransport)
+        breaker = get_breaker()
+        with patch("opensearchpy.Transport.perform_request", side_effect=OpenSearchConnectionError("N/A", "down", None)):
+            for _ in range(breaker.failure_threshold):
+                with self.assertRaises(OpenSearchConnectionError):
+                    transport.perform_request("GET", "/")
+        with patch("opensearchpy.Transport.perform_request") as perform_mock:
+            with self.assertRaises(SearchUnavailable):
+                transport.perform_request("GET", "/")
+        perform_mock.assert_not_called()
+
+    def test_index_task_queues_retry_while_open(self):
+        breaker = get_breaker()
+        for _ in range(breaker.failure_threshold):
+            breaker.record_failure()
+
+        with patch.object(tasks, "bulk_index_listings") as bulk_mock:
+            tasks.task_index_listings([5, 6])
+            tasks.task_index_listings([6])
+        bulk_mock.assert_not_called()
+        self.assertEqual(sorted(IndexRetry.objects.values_list("listing_id", flat=True)), [5, 6])
+
+        breaker.reset()
+        with patch.object(tasks, "bulk_index_listings") as bulk_mock:
+            self.assertEqual(tasks.task_drain_index_retries(), 2)
+        bulk_mock.assert_called_once_with([5, 6])
+        self.assertFalse(IndexRetry.objects.exists())
+
+
+class TextQueryTests(TestCase):
+    def test_substring_matching_uses_ngram_subfields(self):
+        from .views.query_compiler import build_text_query
+
+        query = build_text_query("iPhone 15")
+        shoulds = query["bool"]["must"][0]["bool"]["should"]
+
+        self.assertNotIn("wildcard", str(query))
+        self.assertIn({"match": {"title.ngram": {"query": "iphone", "operator": "and", "boost": 2.5}}}, shoulds)
+        mapping = index.mapping_body()["mappings"]["properties"]
+        self.assertEqual(mapping["title"]["fields"]["ngram"]["analyzer"], "folding_ngram")
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_equivalent_queries_share_a_key(self):
+        from django.http import QueryDict
+
+        from .views import response_cache
+
+        a = QueryDict("q=iPhone%20%2015&attrs.color=red,blue&page=1&_=123")
+        b = QueryDict("attrs.color=blue&attrs.color=red&q=iphone 15&sort=relevance&currency=uzs")
+        c = QueryDict("q=iphone 15&page=2")
+
+        self.assertEqual(response_cache.cache_key(a), response_cache.cache_key(b))
+        self.assertNotEqual(response_cache.cache_key(a), response_cache.cache_key(c))
+
+        before = response_cache.cache_key(a)
+        response_cache.bump_generation()
+        self.assertNotEqual(response_cache.cache_key(a), before)
+
+    def test_search_view_serves_repeated_queries_from_cache(self):
+        from rest_framework.test import APIRequestFactory
+
+        from .views import listing_search_view
+
+        client_mock = MagicMock()
+        client_mock.search.return_value = {"hits": {"hits": [], "total": {"value": 0}}, "aggregations": {}}
+        view = listing_search_view.ListingSearchView.as_view()
+        factory = APIRequestFactory()
+
+        with patch.object(listing_search_view, "get_client", return_value=client_mock), patch.object(
+            listing_search_view, "ensure_index"
+        ):
+            view(factory.get("/search/listings", {"category_slug": "phones"}))
+            view(factory.get("/search/listings", {"category_slug": "phones", "page": "1"}))
+            self.assertEqual(client_mock.search.call_count, 1)
+
+            index.bump_generation()
+            view(factory.get("/search/listings", {"category_slug": "phones"}))
+            self.assertEqual(client_mock.search.call_count, 2)
+
+    def test_concurrent_misses_collapse_into_one_backend_call(self):
+        import threading
+
+        from .views import response_cache
+
+        calls = []
+        release = threading.Event()
+
+        def compute():
+            calls.append(1)
+            release.wait(1)
+            return {"total": 1}, True
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(response_cache.get_or_compute("k", compute)))
+            for _ in range(5)
+        ]
+        for t in threads:
+            t.start()
+        release.set()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{"total": 1}] * 5)
+
+    def test_failed_compute_releases_the_lock(self):
+        from .views import response_cache
+
+        def compute():
+            raise RuntimeError("backend down")
+
+        with self.assertRaises(RuntimeError):
+            response_cache.get_or_compute("k", compute)
+
+        self.assertIsNone(cache.get("k:lock"))
+
+
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_cursor_walk_uses_search_after_and_pit(self):
+        from rest_framework.test import APIRequestFactory
+
+        from .views import listing_search_view
+
+        client_mock = MagicMock()
+        client_mock.create_pit.return_value = {"pit_id": "pit-1"}
+        page_hits = [{"_id": "7", "_source": {"id": 7}, "sort": [1700000000, 7]}]
+        client_mock.search.side_effect = [
+            {"pit_id": "pit-1", "hits": {"hits": page_hits, "total": {"value": 2}}, "aggregations": {}},
+            {"pit_id": "pit-1", "hits": {"hits": [], "total": {"value": 2}}},
+        ]
+        view = listing_search_view.ListingSearchView.as_view()
+        factory = APIRequestFactory()
+
+        with patch.object(listing_search_view, "get_client", return_value=client_mock), patch.object(
+            listing_search_view, "ensure_index"
+        ), patch("listings.availability.active_ids", return_value={7}):
+            first = view(factory.get("/search/listings", {"cursor": "", "pit": "1", "sort": "newest", "per_page": 1}))
+            cursor = first.data["next_cursor"]
+            self.assertTrue(cursor)
+            body = client_mock.search.call_args.kwargs["body"]
+            self.assertNotIn("from", body)
+            self.assertEqual(body["sort"][-1], {"id": "asc"})
+            self.assertEqual(body["pit"]["id"], "pit-1")
+
+            second = view(factory.get("/search/listings", {"cursor": cursor, "per_page": 1}))
+            body = client_mock.search.call_args.kwargs["body"]
+            self.assertEqual(body["search_after"], [1700000000, 7])
+            self.assertNotIn("aggs", body)
+            self.assertIsNone(second.data["next_cursor"])
+            client_mock.delete_pit.assert_called_once_with(body={"pit_id": ["pit-1"]})
+
+            bad = view(factory.get("/search/listings", {"cursor": "not-a-cursor"}))
+            self.assertEqual(bad.status_code, 400)
+
+    def test_card_view_fetches_only_the_card(self):
+        from rest_framework.test import APIRequestFactory
+
+        from .views import listing_search_view
+
+        client_mock = MagicMock()
+        client_mock.search.return_value = {
+            "hits": {"hits": [{"_id": "7", "_score": 1.0, "_source": {"card": {"v": 1, "id": 7}}}], "total": {"value": 1}},
+        }
+        view = listing_search_view.ListingSearchView.as_view()
+        factory = APIRequestFactory()
+
+        with patch.object(listing_search_view, "get_client", return_value=client_mock), patch.object(
+            listing_search_view, "ensure_index"
+        ), patch("listings.availability.active_ids", return_value={7}):
+            response = view(factory.get("/search/listings", {"view": "card", "facets": "none"}))
+            self.assertEqual(view(factory.get("/search/listings", {"view": "tile"})).status_code, 400)
+
+        self.assertEqual(client_mock.search.call_args.kwargs["body"]["_source"], ["card"])
+        self.assertEqual(response.data["results"], [{"id": "7", "score": 1.0, "card": {"v": 1, "id": 7}}])
+
+
+class AsyncSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    async def test_async_view_awaits_the_backend_and_caches(self):
+        import asyncio
+        import json
+        from unittest.mock import AsyncMock
+
+        from django.test import AsyncRequestFactory
+
+        from .views import async_listing_search_view
+
+        client_mock = MagicMock()
+        client_mock.search = AsyncMock(
+            return_value={
+                "hits": {"hits": [{"_id": "7", "_source": {"id": 7}}, {"_id": "8", "_source": {"id": 8}}], "total": {"value": 2}},
+                "aggregations": {},
+            }
+        )
+        view = async_listing_search_view.AsyncListingSearchView.as_view()
+        factory = AsyncRequestFactory()
+
+        with patch.object(async_listing_search_view, "get_async_client", return_value=client_mock), patch.object(
+            async_listing_search_view, "ensure_index"
+        ), patch("listings.availability.active_ids", return_value={7}):
+            responses = await asyncio.gather(
+                *(view(factory.get("/search/listings/async", {"q": "phone"})) for _ in range(3))
+            )
+            bad = await view(factory.get("/search/listings/async", {"view": "tile"}))
+
+        client_mock.search.assert_awaited_once()
+        payloads = [json.loads(r.content) for r in responses]
+        self.assertTrue(all(p["success"] for p in payloads))
+        self.assertEqual([r["id"] for r in payloads[0]["data"]["results"]], [7])
+        self.assertEqual(payloads[0]["data"]["total"], 1)
+        self.assertEqual(bad.status_code, 400)
+        self.assertFalse(json.loads(bad.content)["success"])
+
+    async def test_async_view_applies_the_search_throttles(self):
+        from django.test import AsyncRequestFactory
+        from rest_framework.throttling import AnonRateThrottle
+
+        from .views import async_listing_search_view
+        from .views.listing_search_view import ListingSearchView
+
+        class OnePerHour(AnonRateThrottle):
+            rate = "1/hour"
+
+        view = async_listing_search_view.AsyncListingSearchView.as_view()
+        factory = AsyncRequestFactory()
+
+        with patch.object(ListingSearchView, "throttle_classes", [OnePerHour]), patch.object(
+            async_listing_search_view, "get_async_client", return_value=None
+        ):
+            first = await view(factory.get("/search/listings/async"))
+            second = await view(factory.get("/search/listings/async"))
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 429)
+        self.assertIn("Retry-After", second)
+
+    async def test_async_view_closes_its_client_outside_asgi(self):
+        from unittest.mock import AsyncMock
+
+        from django.test import RequestFactory
+
+        from .views import async_listing_search_view
+
+        client_mock = MagicMock()
+        client_mock.close = AsyncMock()
+        view = async_listing_search_view.AsyncListingSearchView.as_view()
+
+        with patch.object(
+            async_listing_search_view, "get_async_client", return_value=client_mock
+        ) as get_mock, patch.object(async_listing_search_view.get_breaker(), "is_open", return_value=True):
+            await view(RequestFactory().get("/search/listings/async"))
+
+        get_mock.assert_called_once_with(shared=False)
+        client_mock.close.assert_awaited_once()
+
+
+class FacetLevelTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        from taxonomy.models import Attribute
+
+        parent = Category.objects.create(name="Electronics", slug="electronics", level=0)
+        phones = Category.objects.create(name="Phones", slug="phones", parent=parent, is_leaf=True)
+        Attribute.objects.create(category=parent, key="brand", label="Brand", type=Attribute.Type.SELECT)
+        Attribute.objects.create(category=phones, key="storage", label="Storage", type=Attribute.Type.SELECT)
+        Attribute.objects.create(
+            category=phones, key="serial", label="Serial", type=Attribute.Type.TEXT, is_indexed=False
+        )
+
+    def _view(self):
+        from rest_framework.test import APIRequestFactory
+
+        from .views import listing_search_view
+
+        client_mock = MagicMock()
+        client_mock.search.return_value = {
+            "hits": {"hits": [], "total": {"value": 0}},
+            "aggregations": {"conditions": {"buckets": [{"key": "new", "doc_count": 3}]}},
+        }
+        patches = [
+            patch.object(listing_search_view, "get_client", return_value=client_mock),
+            patch.object(listing_search_view, "ensure_index"),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        return listing_search_view.ListingSearchView.as_view(), APIRequestFactory(), client_mock
+
+    def test_facet_levels_select_aggregations(self):
+        view, factory, client_mock = self._view()
+
+        view(factory.get("/search/listings", {"facets": "none"}))
+        self.assertNotIn("aggs", client_mock.search.call_args.kwargs["body"])
+
+        view(factory.get("/search/listings", {"facets": "basic"}))
+        self.assertNotIn("attrs", client_mock.search.call_args.kwargs["body"]["aggs"])
+
+        view(factory.get("/search/listings", {"category_slug": "phones"}))
+        attr_terms = client_mock.search.call_args.kwargs["body"]["aggs"]["attrs"]["aggs"]["attr_keys"]["terms"]
+        self.assertEqual(sorted(attr_terms["include"]), ["brand", "storage"])
+
+        response = view(factory.get("/search/listings", {"facets": "everything"}))
+        self.assertEqual(response.status_code, 400)
+
+    def test_facets_are_cached_across_pages_and_sorts(self):
+        view, factory, client_mock = self._view()
+
+        view(factory.get("/search/listings", {"q": "iphone", "facets": "basic"}))
+        response = view(factory.get("/search/listings", {"q": "iphone", "facets": "basic", "page": 2, "sort": "newest"}))
+
+        self.assertEqual(client_mock.search.call_count, 2)
+        self.assertNotIn("aggs", client_mock.search.call_args.kwargs["body"])
+        self.assertEqual(response.data["facets"]["conditions"], [{"key": "new", "count": 3}])
+
+
+class SuggestTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        patcher = patch("listings.signals.schedule_index_listings", return_value=[])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_documents_carry_completion_inputs(self):
+        seller = get_user_model().objects.create_user(username="seller", password="pass123")
+        location = Location.objects.create(
+            name="Tashkent", name_ru="Ташкент", name_uz="Toshkent", slug="tashkent", kind=Location.Kind.CITY
+        )
+        category = Category.objects.create(name="Phones", name_ru="Телефоны", slug="phones", is_leaf=True)
+        listing = Listing.objects.create(
+            user=seller,
+            category=category,
+            location=location,
+            title="Apple iPhone 15 Pro",
+            price_amount=Decimal("1000"),
+            price_currency="UZS",
+            status=Listing.Status.ACTIVE,
+        )
+
+        doc = index.build_document(listing)
+
+        self.assertEqual(doc["suggest"], ["Apple iPhone 15 Pro", "iPhone 15 Pro", "15 Pro", "Pro"])
+        self.assertEqual(doc["suggest_category"], ["Phones", "Телефоны"])
+        self.assertEqual(doc["suggest_location"], ["Tashkent", "Ташкент", "Toshkent"])
+
+    def test_suggestions_are_cached_per_prefix(self):
+        from rest_framework.test import APIRequestFactory
+
+        from .views import suggest_view
+
+        client_mock = MagicMock()
+        client_mock.search.return_value = {
+            "suggest": {
+                "titles": [{"options": [{"text": "iPhone 15", "_source": {"title": "Apple iPhone 15"}}]}],
+                "categories": [{"options": []}],
+                "locations": [{"options": [{"text": "Ташкент", "_source": {"location_path": ["uz", "tashkent"]}}]}],
+            }
+        }
+        view = suggest_view.SuggestView.as_view()
+        factory = APIRequestFactory()
+
+        with patch.object(suggest_view, "get_client", return_value=client_mock):
+            first = view(factory.get("/search/suggest", {"q": "iPh"}))
+            view(factory.get("/search/suggest", {"q": "  iph "}))
+            short = view(factory.get("/search/suggest", {"q": "i"}))
+
+        self.assertEqual(client_mock.search.call_count, 1)
+        body = client_mock.search.call_args.kwargs["body"]
+        self.assertNotIn("query", body)
+        self.assertEqual(body["size"], 0)
+        self.assertEqual(body["suggest"]["titles"]["prefix"], "iph")
+        self.assertEqual(first.data["titles"], ["Apple iPhone 15"])
+        self.assertEqual(first.data["locations"], [{"name": "Ташкент", "slug": "tashkent"}])
+        self.assertEqual(short.data["titles"], [])
+
+
+class GeoSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client_mock = MagicMock()
+        from .views import listing_search_view, map_clusters_view
+
+        for module in (listing_search_view, map_clusters_view):
+            patcher = patch.object(module, "get_client", return_value=self.client_mock)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = patch.object(listing_search_view, "ensure_index")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_radius_filter_and_distance_sort(self):
+        from rest_framework.test import APIRequestFactory
+
+        from .views.listing_search_view import ListingSearchView
+
+        self.client_mock.search.return_value = {
+            "hits": {"hits": [{"_id": "5", "_source": {"id": "5"}, "sort": [1.25]}], "total": {"value": 1}},
+            "aggregations": {},
+        }
+        view = ListingSearchView.as_view()
+        factory = APIRequestFactory()
+
+        with patch("listings.availability.active_ids", return_value={5}):
+            response = view(
+                factory.get("/search/listings", {"lat": "41.3", "lon": "69.2", "radius": "5", "sort": "distance", "facets": "none"})
+            )
+
+        body = self.client_mock.search.call_args.kwargs["body"]
+        self.assertIn(
+            {"geo_distance": {"distance": "5.0km", "geo": {"lat": 41.3, "lon": 69.2}}},
+            body["query"]["bool"]["filter"],
+        )
+        self.assertEqual(body["sort"][0]["_geo_distance"]["geo"], {"lat": 41.3, "lon": 69.2})
+        self.assertEqual(response.data["results"][0]["distance_km"], 1.25)
+
+        self.assertEqual(view(factory.get("/search/listings", {"sort": "distance"})).status_code, 400)
+        self.assertEqual(view(factory.get("/search/listings", {"lat": "95", "lon": "69"})).status_code, 400)
+
+    def test_clusters_return_geotile_buckets(self):
+        from rest_framework.test import APIRequestFactory
+
+        from .views.map_clusters_view import MapClustersView
+
+        self.client_mock.search.return_value = {
+            "hits": {"total": {"value": 3}},
+            "aggregations": {
+                "cells": {
+                    "buckets": [
+                        {"key": "14/11000/6000", "doc_count": 3, "centroid": {"location": {"lat": 41.3, "lon": 69.2}}}
+                    ]
+                }
+            },
+        }
+        view = MapClustersView.as_view()
+        factory = APIRequestFactory()
+
+        response = view(
+            factory.get("/search/clusters", {"bbox": "69.1,41.2,69.4,41.4", "zoom": "12", "category_slug": "phones"})
+        )
+
+        body = self.client_mock.search.call_args.kwargs["body"]
+        self.assertEqual(body["size"], 0)
+        self.assertEqual(body["aggs"]["cells"]["geotile_grid"]["precision"], 14)
+        self.assertIn({"terms": {"category_path": ["phones"]}}, body["query"]["bool"]["filter"])
+        self.assertEqual(response.data, {"total": 3, "clusters": [{"key": "14/11000/6000", "count": 3, "lat": 41.3, "lon": 69.2}]})
+        self.assertEqual(view(factory.get("/search/clusters", {"bbox": "1,2,3", "zoom": "3"})).status_code, 400)
+
+
+class PercolatorAlertTests(TestCase):
+    def setUp(self):
+        self.schedule_patcher = patch("listings.signals.schedule_index_listings", return_value=[])
+        self.schedule_patcher.start()
+        self.addCleanup(self.schedule_patcher.stop)
+
+        user_model = get_user_model()
+        self.owner = user_model.objects.create_user(username="watcher", password="pass123")
+        self.seller = user_model.objects.create_user(username="seller", password="pass123")
+        self.location = Location.objects.create(name="Tashkent", slug="tashkent", kind=Location.Kind.CITY)
+        self.category = Category.objects.create(name="Phones", slug="phones", level=0, is_leaf=True)
+
+    def _create_listing(self, user) -> Listing:
+        return Listing.objects.create(
+            user=user,
+            category=self.category,
+            location=self.location,
+            title="iPhone 15",
+            price_amount=Decimal("1000"),
+            price_currency="UZS",
+            status=Listing.Status.ACTIVE,
+        )
+
+    def test_percolate_maps_document_slots_and_skips_owner_listings(self):
+        from .views import percolator
+
+        client_mock = MagicMock()
+        client_mock.search.return_value = {
+            "hits": {
+                "hits": [
+                    {"_source": {"saved_search_id": "7", "owner_id": "1"}, "fields": {"_percolator_document_slot": [0, 1]}},
+                    {"_source": {"saved_search_id": "8", "owner_id": "2"}, "fields": {"_percolator_document_slot": [1]}},
+                ]
+            }
+        }
+        docs = {10: {"user_id": "2"}, 11: {"user_id": "2"}}
+
+        with patch.object(percolator, "get_client", return_value=client_mock), patch.object(
+            percolator, "ensure_percolator_index"
+        ):
+            matches = percolator.percolate(docs)
+
+        self.assertEqual(matches, {7: [10, 11]})
+        self.assertEqual(client_mock.search.call_count, 1)
+        self.assertEqual(len(client_mock.search.call_args.kwargs["body"]["query"]["percolate"]["documents"]), 2)
+
+    def test_percolate_pages_through_all_matching_searches(self):
+        from .views import percolator
+
+        client_mock = MagicMock()
+        client_mock.search.side_effect = [
+            {"hits": {"hits": [{"_source": {"saved_search_id": "7", "owner_id": "1"}, "sort": ["7"]}]}},
+            {"hits": {"hits": [{"_source": {"saved_search_id": "8", "owner_id": "1"}, "sort": ["8"]}]}},
+            {"hits": {"hits": []}},
+        ]
+
+        with patch.object(percolator, "get_client", return_value=client_mock), patch.object(
+            percolator, "ensure_percolator_index"
+        ), patch.object(percolator, "PERCOLATE_PAGE_SIZE", 1):
+            matches = percolator.percolate({10: {"user_id": "2"}})
+
+        self.assertEqual(matches, {7: [10], 8: [10]})
+        self.assertEqual(client_mock.search.call_args.kwargs["body"]["search_after"], ["8"])
+
+    def test_existing_percolator_index_gets_new_listing_fields(self):
+        from .views import percolator
+
+        self.addCleanup(setattr, percolator, "_percolator_ready", False)
+        client_mock = MagicMock()
+        client_mock.indices.exists.return_value = True
+
+        with patch.object(percolator, "get_client", return_value=client_mock):
+            percolator.ensure_percolator_index(force=True)
+
+        client_mock.indices.create.assert_not_called()
+        properties = client_mock.indices.put_mapping.call_args.kwargs["body"]["properties"]
+        self.assertEqual(properties["query"], {"type": "percolator"})
+        self.assertIn("favorite_count", properties)
+
+    def test_saved_search_changes_sync_the_percolator(self):
+        from savedsearches.models import SavedSearch
+
+        with patch("searchapp.views.percolator.register_query") as register_mock, patch(
+            "searchapp.views.percolator.unregister_query"
+        ) as unregister_mock:
+            with self.captureOnCommitCallbacks(execute=True):
+                saved = SavedSearch.objects.create(
+                    user=self.owner,
+                    title="Phones",
+                    query={"params": {"q": "iphone", "category_slug": "phones"}},
+                    frequency=SavedSearch.Frequency.INSTANT,
+                )
+            query = register_mock.call_args.args[2]
+            self.assertIn({"terms": {"category_path": ["phones"]}}, query["bool"]["filter"])
+
+            with self.captureOnCommitCallbacks(execute=True):
+                saved.frequency = SavedSearch.Frequency.DAILY
+                saved.save()
+            unregister_mock.assert_called_once_with(saved.id)
+
+    def test_live_index_writes_queue_matches_once(self):
+        from savedsearches.models import SavedSearch, SavedSearchMatch
+        from savedsearches import tasks as saved_tasks
+
+        saved = SavedSearch.objects.create(
+            user=self.owner, title="Phones", query={"q": "iphone"}, frequency=SavedSearch.Frequency.INSTANT
+        )
+        listing = self._create_listing(self.seller)
+
+        with patch.object(index, "get_client", return_value=MagicMock()), patch.object(
+            index.helpers, "bulk", return_value=(1, [])
+        ), patch("searchapp.views.percolator.percolate", return_value={saved.id: [listing.id]}) as percolate_mock, patch.object(
+            saved_tasks.task_match_instant_searches, "delay", side_effect=saved_tasks.task_match_instant_searches
+        ) as match_mock, patch.object(
+            saved_tasks.task_send_instant_notifications, "delay"
+        ) as delay_mock:
+            index.bulk_index_listings([listing.id])
+            index.bulk_index_listings([listing.id])
+            # Rebuild and bulk-load writes name their indices and don't alert
+            index.bulk_index_listings([listing.id], indices=["sail_listings_v2_new"])
+            # In-place bulk loads and reconciliation opt out
+            index.bulk_index_listings([listing.id], notify=False)
+
+        # Percolation runs in its own task, with the written ids
+        match_mock.assert_called_with([listing.id])
+        self.assertEqual(percolate_mock.call_count, 2)
+        self.assertEqual(SavedSearchMatch.objects.filter(saved_search=saved, listing_id=listing.id).count(), 1)
+        self.assertEqual(delay_mock.call_count, 2)
+
+    def test_instant_matches_are_claimed_before_sending(self):
+        from accounts.models import Profile
+        from savedsearches.models import SavedSearch, SavedSearchMatch
+        from savedsearches import tasks as saved_tasks
+
+        Profile.objects.create(user=self.owner, telegram_id=42)
+        saved = SavedSearch.objects.create(
+            user=self.owner, title="Phones", query={"q": "iphone"}, frequency=SavedSearch.Frequency.INSTANT
+        )
+        SavedSearchMatch.objects.create(saved_search=saved, listing_id=1)
+
+        with patch.object(saved_tasks, "send_telegram_notification", return_value=False) as send_mock:
+            saved_tasks.task_send_instant_notifications()
+        send_mock.assert_called_once()
+        # The failed send released the match again
+        self.assertTrue(SavedSearchMatch.objects.filter(notified_at__isnull=True).exists())
+
+        sent_during_run = []
+
+        def send(telegram_id, message):
+            # An overlapping run finds nothing left to claim
+            sent_during_run.append(saved_tasks.task_send_instant_notifications()["processed"])
+            return True
+
+        with patch.object(saved_tasks, "send_telegram_notification", side_effect=send) as send_mock:
+            result = saved_tasks.task_send_instant_notifications()
+
+        self.assertEqual(result["notifications_sent"], 1)
+        self.assertEqual(send_mock.call_count, 1)
+        self.assertEqual(sent_during_run, [0])
+        self.assertFalse(SavedSearchMatch.objects.filter(notified_at__isnull=True).exists())
+
+
+class SavedSearchCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = get_user_model().objects.create_user(username="watcher", password="pass123")
+
+    def test_list_counts_use_one_msearch_and_cache_per_last_viewed_at(self):
+        from django.utils import timezone
+        from rest_framework.test import APIClient
+
+        from savedsearches import utils as saved_utils
+        from savedsearches.models import SavedSearch
+
+        viewed = timezone.now()
+        searches = [
+            SavedSearch.objects.create(user=self.user, title=f"S{i}", query={"q": f"q{i}"}, last_viewed_at=viewed)
+            for i in range(3)
+        ]
+        SavedSearch.objects.create(user=self.user, title="Never viewed", query={"q": "x"})
+
+        client_mock = MagicMock()
+        client_mock.msearch.return_value = {
+            "responses": [{"hits": {"total": {"value": n}}} for n in (4, 0, 2)]
+        }
+        api = APIClient()
+        api.force_authenticate(self.user)
+
+        with patch.object(saved_utils, "get_client", return_value=client_mock):
+            response = api.get("/api/v1/saved-searches")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(client_mock.msearch.call_count, 1)
+            self.assertEqual(len(client_mock.msearch.call_args.kwargs["body"]), 6)
+
+            api.get("/api/v1/saved-searches")
+            self.assertEqual(client_mock.msearch.call_count, 1)
+
+            searches[0].last_viewed_at = timezone.now()
+            searches[0].save(update_fields=["last_viewed_at"])
+            client_mock.msearch.return_value = {"responses": [{"hits": {"total": {"value": 1}}}]}
+            counts = saved_utils.count_new_items(SavedSearch.objects.filter(user=self.user))
+
+        self.assertEqual(client_mock.msearch.call_count, 2)
+        self.assertEqual(counts[searches[0].id], 1)
+        # Listed newest first, so the last search got the first response
+        self.assertEqual(counts[searches[2].id], 4)
+
+
+class QueryCompilerTests(TestCase):
+    def test_request_and_saved_search_bags_compile_to_the_same_query(self):
+        from django.http import QueryDict
+
+        from .views import query_compiler
+
+        request_bag = query_compiler.from_query_params(
+            QueryDict("q=iphone&location_slug=tashkent&attrs.storage=256gb,128gb&attrs.year_min=2020")
+        )
+        saved_bag = query_compiler.from_saved_search(
+            {"params": {"q": "iphone", "location_slug": "tashkent", "attrs": {"storage": ["128gb", "256gb"], "year_min": 2020}}}
+        )
+
+        self.assertEqual(query_compiler.fingerprint(request_bag), query_compiler.fingerprint(saved_bag))
+        query = query_compiler.compile_query(saved_bag)
+        self.assertIn({"terms": {"location_path": ["tashkent"]}}, query["bool"]["filter"])
+
+    def test_saved_search_count_body_uses_indexed_fields(self):
+        from django.utils import timezone
+
+        from savedsearches.models import SavedSearch
+        from savedsearches.utils import _new_items_body
+
+        saved = SavedSearch(id=1, query={"params": {"location_slug": "tashkent", "price_max": "5000"}})
+        saved.last_viewed_at = timezone.now()
+
+        fields = set()
+        for clause in _new_items_body(saved)["query"]["bool"]["filter"]:
+            for spec in clause.values():
+                fields.update(spec)
+
+        self.assertEqual(fields, {"location_path", "price_normalized", "created_at", "status"})
+        self.assertTrue(fields <= set(index.mapping_body()["mappings"]["properties"]))
+
+    def test_compiled_queries_are_memoized_and_copied(self):
+        from .views import query_compiler
+
+        bag = query_compiler.from_saved_search({"q": "divan", "category_slug": "furniture"})
+        query_compiler._compile_fingerprint.cache_clear()
+
+        first = query_compiler.compile_query(bag)
+        first["bool"]["filter"].append({"term": {"condition": "new"}})
+        second = query_compiler.compile_query(dict(bag))
+
+        self.assertEqual(query_compiler._compile_fingerprint.cache_info().hits, 1)
+        self.assertNotIn({"term": {"condition": "new"}}, second["bool"]["filter"])
+
+
+class ListingFixtureMixin:
+    """A seller, location and leaf category, with search sync dispatch patched out."""
+
+    def setUp(self):
+        super().setUp()
+        patcher = patch("listings.signals.schedule_index_listings", return_value=[])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.seller = get_user_model().objects.create_user(username="seller", password="pass123")
+        self.location = Location.objects.create(name="Tashkent", slug="tashkent", kind=Location.Kind.CITY)
+        self.category = Category.objects.create(name="Phones", slug="phones", level=0, is_leaf=True)
+
+    def _create_listing(self, **kwargs) -> Listing:
+        defaults = {
+            "user": self.seller,
+            "category": self.category,
+            "location": self.location,
+            "title": "iPhone 15",
+            "price_amount": Decimal("1000000"),
+            "price_currency": "UZS",
+            "status": Listing.Status.ACTIVE,
+        }
+        defaults.update(kwargs)
+        return Listing.objects.create(**defaults)
+
+
+class ReconcileTests(ListingFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.listings = [self._create_listing(title=f"Phone {i}") for i in range(3)]
+
+    def test_diff_versions_merges_sorted_streams(self):
+        from .views.reconcile import DELETE, INDEX, diff_versions
+
+        indexed = [(1, 10), (2, 20), (4, 40), (7, 70)]
+        expected = [(2, 20), (3, 30), (4, 41), (8, 80)]
+
+        self.assertEqual(
+            list(diff_versions(indexed, expected)),
+            [(DELETE, 1), (INDEX, 3), (INDEX, 4), (DELETE, 7), (INDEX, 8)],
+        )
+
+    def test_reconcile_streams_pit_pages_and_batches_bulk_writes(self):
+        from .views import reconcile
+
+        first, second, third = self.listings
+        millis = reconcile.epoch_millis
+        pages = [
+            [
+                {"_id": str(first.id), "fields": {"refreshed_at": [str(millis(first.refreshed_at))]}, "sort": [first.id]},
+                {"_id": str(second.id), "fields": {"refreshed_at": ["0"]}, "sort": [second.id]},
+            ],
+            [{"_id": str(third.id + 50), "fields": {"refreshed_at": ["0"]}, "sort": [third.id + 50]}],
+            [],
+        ]
+        client = MagicMock()
+        client.create_pit.return_value = {"pit_id": "p1"}
+        client.search.side_effect = [{"pit_id": "p1", "hits": {"hits": hits}} for hits in pages]
+
+        with patch.object(reconcile, "get_client", return_value=client), patch.object(
+            reconcile, "bulk_delete_listings", return_value=(1, 0)
+        ) as delete_mock, patch.object(reconcile, "bulk_index_listings", return_value=(2, 0)) as index_mock:
+            stats = reconcile.reconcile(batch_size=2)
+
+        self.assertEqual(client.search.call_args_list[1].kwargs["body"]["search_after"], [second.id])
+        client.delete_pit.assert_called_once_with(body={"pit_id": ["p1"]})
+        delete_mock.assert_called_once_with([third.id + 50])
+        index_mock.assert_called_once_with([second.id, third.id], notify=False)
+        self.assertEqual(stats, {"deleted": 1, "reindexed": 2, "failed": 0})
+
+
+class RepricingTests(TestCase):
+    def setUp(self):
+        from currency.models import Currency, ExchangeRate
+
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.uzs = Currency.objects.create(code="UZS", name="Sum", symbol="so'm", is_default=True)
+        self.usd = Currency.objects.create(code="USD", name="Dollar", symbol="$")
+        self.rate = ExchangeRate.objects.create(from_currency=self.usd, to_currency=self.uzs, rate=Decimal("12000"))
+
+    def test_rate_change_reprices_only_that_currency(self):
+        with patch("searchapp.tasks.task_reprice_currency.delay") as delay_mock:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.rate.save()
+            delay_mock.assert_not_called()
+
+            with self.captureOnCommitCallbacks(execute=True):
+                self.rate.rate = Decimal("12500")
+                self.rate.save()
+            delay_mock.assert_called_once_with("USD")
+
+    def test_reprice_currency_runs_update_by_query_and_reports_progress(self):
+        from .views import repricing
+
+        client = MagicMock()
+        client.update_by_query.return_value = {"task": "node:1"}
+        client.tasks.get.side_effect = [
+            {"completed": False, "task": {"status": {"total": 10, "updated": 4}}},
+            {"completed": True, "task": {"status": {"total": 10, "updated": 10}}, "response": {"total": 10, "updated": 10, "failures": []}},
+        ]
+        self.rate.rate = Decimal("12500")
+        self.rate.save()
+        seen = []
+
+        with patch.object(repricing, "get_client", return_value=client), patch.object(
+            repricing, "write_targets", return_value=["sail_listings_v1"]
+        ), patch.object(repricing.time, "sleep"):
+            totals = repricing.reprice_currency("usd", progress=lambda idx, status: seen.append(status["updated"]))
+
+        body = client.update_by_query.call_args.kwargs["body"]
+        self.assertEqual(body["query"], {"term": {"currency": "USD"}})
+        self.assertEqual(body["script"]["params"]["rate"], 12500.0)
+        self.assertEqual(seen, [4, 10])
+        self.assertEqual(totals, {"total": 10, "updated": 10, "failed": 0})
+
+    def test_reprice_task_follows_up_without_blocking(self):
+        from .views import repricing
+
+        client = MagicMock()
+        client.update_by_query.side_effect = [{"task": "node:1"}, {"task": "node:2"}]
+        client.tasks.get.side_effect = [
+            {"completed": True, "response": {"total": 3, "updated": 3, "failures": []}},
+            {"completed": False, "task": {"status": {"total": 10, "updated": 4}}},
+            {"completed": True, "response": {"total": 3, "updated": 3, "failures": []}},
+            {"completed": True, "response": {"total": 10, "updated": 10, "failures": []}},
+        ]
+        targets = ["sail_listings_v1", "sail_listings_v1_new"]
+
+        with patch.object(repricing, "get_client", return_value=client), patch.object(
+            repricing, "write_targets", return_value=targets
+        ), patch.object(tasks.task_repricing_status, "apply_async") as follow_up, patch.object(
+            repricing, "bump_generation"
+        ) as bump_mock:
+            started = tasks.task_reprice_currency("usd")
+            # Every target starts at once; nothing waits on completion
+            self.assertEqual(started, {"sail_listings_v1": "node:1", "sail_listings_v1_new": "node:2"})
+            client.tasks.get.assert_not_called()
+            follow_up.assert_called_once_with(("usd", started), countdown=tasks.REPRICE_POLL_INTERVAL)
+
+            self.assertEqual(tasks.task_repricing_status("usd", started), {})
+            self.assertEqual(follow_up.call_count, 2)
+            bump_mock.assert_not_called()
+
+            totals = tasks.task_repricing_status("usd", started)
+
+        self.assertEqual(totals, {"total": 13, "updated": 13, "failed": 0})
+        self.assertEqual(follow_up.call_count, 2)
+        bump_mock.assert_called_once()
+
+
+class SlicedReindexTests(TestCase):
+    def setUp(self):
+        patcher = patch("listings.signals.schedule_index_listings", return_value=[])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        seller = get_user_model().objects.create_user(username="seller", password="pass123")
+        location = Location.objects.create(name="Tashkent", slug="tashkent", kind=Location.Kind.CITY)
+        category = Category.objects.create(name="Phones", slug="phones", level=0, is_leaf=True)
+        self.ids = [
+            Listing.objects.create(
+                user=seller, category=category, location=location, title=f"Phone {i}",
+                price_amount=Decimal("1000"), price_currency="UZS", status=Listing.Status.ACTIVE,
+            ).id
+            for i in range(5)
+        ]
+
+    def test_interrupted_run_resumes_with_pending_ranges(self):
+        from .views import sliced_reindex
+
+        ranges = sliced_reindex.plan_ranges("sail_listings_v2", range_size=2)
+        self.assertEqual([(r.start_id, r.end_id) for r in ranges], [(self.ids[0] + i, self.ids[0] + i + 2) for i in (0, 2, 4)])
+
+        loaded = []
+
+        def fake_bulk(ids, indices=None, notify=True):
+            loaded.append(list(ids))
+            return len(ids), 0
+
+        with patch.object(sliced_reindex, "bulk_index_listings", side_effect=fake_bulk):
+            sliced_reindex.run_ranges(["sail_listings_v2"], ranges[:1], workers=1, chunk_size=10)
+            # The second run re-plans nothing and only sees what is left
+            remaining = sliced_reindex.plan_ranges("sail_listings_v2", range_size=2)
+            self.assertEqual([r.start_id for r in remaining], [r.start_id for r in ranges[1:]])
+            sliced_reindex.run_ranges(["sail_listings_v2"], remaining, workers=1, chunk_size=10)
+
+        self.assertEqual(loaded, [self.ids[0:2], self.ids[2:4], self.ids[4:5]])
+        self.assertFalse(sliced_reindex.has_pending_ranges("sail_listings_v2"))
+        self.assertEqual(sliced_reindex.range_totals("sail_listings_v2"), (5, 0))
+
+    def test_ranges_with_failures_stay_pending(self):
+        from .views import sliced_reindex
+
+        ranges = sliced_reindex.plan_ranges("sail_listings_v2", range_size=2)
+        results = iter([(1, 1), (2, 0), (1, 0), (2, 0)])
+
+        with patch.object(sliced_reindex, "bulk_index_listings", side_effect=lambda ids, indices=None, notify=True: next(results)):
+            sliced_reindex.run_ranges(["sail_listings_v2"], ranges, workers=1, chunk_size=10)
+            self.assertEqual(sliced_reindex.range_totals("sail_listings_v2"), (4, 1))
+            retry = sliced_reindex.plan_ranges("sail_listings_v2", range_size=2)
+            self.assertEqual([r.start_id for r in retry], [ranges[0].start_id])
+
+            sliced_reindex.run_ranges(["sail_listings_v2"], retry, workers=1, chunk_size=10)
+
+        self.assertFalse(sliced_reindex.has_pending_ranges("sail_listings_v2"))
+        self.assertEqual(sliced_reindex.range_totals("sail_listings_v2"), (5, 0))
+
+
+class RankingTests(TestCase):
+    def setUp(self):
+        patcher = patch("listings.signals.schedule_index_listings", return_value=[])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.seller = get_user_model().objects.create_user(username="seller", password="pass123")
+        location = Location.objects.create(name="Tashkent", slug="tashkent", kind=Location.Kind.CITY)
+        category = Category.objects.create(name="Phones", slug="phones", level=0, is_leaf=True)
+        self.listing = Listing.objects.create(
+            user=self.seller, category=category, location=location, title="iPhone 15",
+            description="x" * 100, price_amount=Decimal("1000"), price_currency="UZS",
+            status=Listing.Status.ACTIVE, view_count=12,
+        )
+
+    def test_relevance_is_wrapped_in_function_score(self):
+        from .views import query_compiler
+
+        bag = query_compiler.empty_params()
+        bag["q"] = "iphone"
+        ranked = query_compiler.compile_body(bag, size=20)["query"]["function_score"]
+        self.assertIn("bool", ranked["query"])
+        self.assertEqual(ranked["boost_mode"], "multiply")
+        fields = [f.get("field_value_factor", {}).get("field") for f in ranked["functions"]]
+        self.assertIn("favorite_count", fields)
+        self.assertIn("gauss", ranked["functions"][1])
+
+        self.assertIn("bool", query_compiler.compile_body(bag, size=20, sort="newest")["query"])
+        self.assertIn("bool", query_compiler.compile_body(bag, size=0)["query"])
+        with override_settings(SEARCH_RANKING_VIEWS_WEIGHT=0, SEARCH_RANKING_FAVORITES_WEIGHT=2.0):
+            functions = query_compiler.ranking_functions()
+        fields = {f.get("field_value_factor", {}).get("field"): f["weight"] for f in functions}
+        self.assertNotIn("view_count", fields)
+        self.assertEqual(fields["favorite_count"], 2.0)
+
+    def test_empty_q_ranks_filtered_results_by_signals(self):
+        import math
+
+        from .views import query_compiler
+
+        def score(ranked, doc, query_score):
+            # function_score as OpenSearch evaluates it for weighted field_value_factor functions
+            total = 0.0
+            for function in ranked["functions"]:
+                factor = function.get("field_value_factor")
+                value = 1.0
+                if factor:
+                    value = float(doc.get(factor["field"], factor["missing"]))
+                    if factor.get("modifier") == "log1p":
+                        value = math.log10(1 + value)
+                total += function["weight"] * value
+            return total if ranked["boost_mode"] == "replace" else query_score * total
+
+        bag = query_compiler.empty_params()
+        bag["category_slug"] = "phones"
+        with override_settings(SEARCH_RANKING_FRESHNESS_WEIGHT=0):
+            ranked = query_compiler.compile_body(bag, size=20)["query"]["function_score"]
+        self.assertEqual(ranked["query"]["bool"]["must"], [])
+
+        docs = [
+            {"id": "plain", "quality_score": 0.1},
+            {"id": "complete", "quality_score": 0.9},
+            {"id": "popular", "quality_score": 0.9, "favorite_count": 40, "view_count": 900},
+        ]
+        # A filter-only query scores 0 for every hit
+        order = sorted(docs, key=lambda d: score(ranked, d, 0.0), reverse=True)
+        self.assertEqual([d["id"] for d in order], ["popular", "complete", "plain"])
+
+    def test_documents_carry_quality_and_engagement(self):
+        from favorites.models import FavoriteListing
+
+        FavoriteListing.objects.create(user=self.seller, listing=self.listing)
+        doc = index.build_document_many([self.listing.id])[self.listing.id]
+
+        # Description and price, no photos, attributes or map pin
+        self.assertEqual(doc["quality_score"], 0.3)
+        self.assertEqual(doc["view_count"], 12)
+        self.assertEqual(doc["favorite_count"], 1)
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.quality_score, 0.3)
+
+    def test_engagement_refresh_sends_partial_updates_and_clears_flags(self):
+        from favorites.models import FavoriteListing
+
+        from .views import engagement
+
+        FavoriteListing.objects.create(user=self.seller, listing=self.listing)
+        self.listing.refresh_from_db()
+        self.assertIsNotNone(self.listing.engagement_changed_at)
+
+        with patch.object(index, "get_client", return_value=MagicMock()), patch.object(
+            engagement, "get_client", return_value=MagicMock()
+        ), patch.object(index, "write_targets", return_value=["sail_listings_v2"]), patch.object(
+            index.helpers, "bulk", return_value=(1, [])
+        ) as bulk_mock:
+            totals = engagement.refresh_engagement()
+
+        actions = list(bulk_mock.call_args.args[1])
+        self.assertEqual(
+            actions,
+            [{"_op_type": "update", "_index": "sail_listings_v2", "_id": str(self.listing.id),
+              "doc": {"view_count": 12, "favorite_count": 1}}],
+        )
+        self.assertEqual(totals, {"updated": 1, "failed": 0})
+        self.listing.refresh_from_db()
+        self.assertIsNone(self.listing.engagement_changed_at)
+
+
+class SimilarListingsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        patcher = patch("listings.signals.schedule_index_listings", return_value=[])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.seller = get_user_model().objects.create_user(username="seller", password="pass123")
+        location = Location.objects.create(name="Tashkent", slug="tashkent", kind=Location.Kind.CITY)
+        category = Category.objects.create(name="Phones", slug="phones", level=0, is_leaf=True)
+        self.listing = Listing.objects.create(
+            user=self.seller, category=category, location=location, title="iPhone 15",
+            description="128 GB, blue", price_amount=Decimal("1000"), price_currency="UZS",
+            status=Listing.Status.ACTIVE,
+        )
+
+    def test_similar_is_constrained_and_cached_per_revision(self):
+        from rest_framework.test import APIRequestFactory
+
+        from .views import similar_listings_view
+
+        client_mock = MagicMock()
+        client_mock.search.return_value = {
+            "hits": {"hits": [{"_id": "8", "_score": 7.2, "_source": {"card": {"v": 1, "id": 8}}}, {"_id": "9", "_source": {}}]},
+        }
+        view = similar_listings_view.SimilarListingsView.as_view()
+        factory = APIRequestFactory()
+
+        with patch.object(similar_listings_view, "get_client", return_value=client_mock), patch(
+            "listings.availability.active_ids", return_value={8}
+        ):
+            response = view(factory.get(f"/listings/{self.listing.id}/similar"), pk=self.listing.id)
+            view(factory.get(f"/listings/{self.listing.id}/similar"), pk=self.listing.id)
+            self.assertEqual(client_mock.search.call_count, 1)
+
+            Listing.objects.filter(pk=self.listing.pk).update(revision=5)
+            view(factory.get(f"/listings/{self.listing.id}/similar"), pk=self.listing.id)
+            self.assertEqual(client_mock.search.call_count, 2)
+
+            missing = view(factory.get("/listings/999/similar"), pk=999)
+
+        self.assertEqual(response.data["results"], [{"id": "8", "score": 7.2, "card": {"v": 1, "id": 8}}])
+        query = client_mock.search.call_args.kwargs["body"]["query"]["bool"]
+        self.assertEqual(query["must"][0]["more_like_this"]["like"], ["iPhone 15", "128 GB, blue"])
+        self.assertIn({"term": {"category_path": "phones"}}, query["filter"])
+        self.assertEqual(query["filter"][1]["range"]["price_normalized"], {"gte": 500.0, "lte": 1500.0})
+        self.assertIn({"term": {"user_id": str(self.seller.id)}}, query["must_not"])
+        self.assertEqual(missing.status_code, 404)
+
+    def test_cached_similar_results_drop_listings_gone_inactive(self):
+        from rest_framework.test import APIRequestFactory
+
+        from .views import similar_listings_view
+
+        client_mock = MagicMock()
+        client_mock.search.return_value = {
+            "hits": {"hits": [{"_id": "8", "_source": {"card": {"id": 8}}}, {"_id": "9", "_source": {"card": {"id": 9}}}]},
+        }
+        view = similar_listings_view.SimilarListingsView.as_view()
+        factory = APIRequestFactory()
+
+        with patch.object(similar_listings_view, "get_client", return_value=client_mock):
+            with patch("listings.availability.active_ids", return_value={8, 9}):
+                first = view(factory.get(f"/listings/{self.listing.id}/similar"), pk=self.listing.id)
+            with patch("listings.availability.active_ids", return_value={9}):
+                second = view(factory.get(f"/listings/{self.listing.id}/similar"), pk=self.listing.id)
+
+        self.assertEqual(client_mock.search.call_count, 1)
+        self.assertEqual([r["id"] for r in first.data["results"]], ["8", "9"])
+        self.assertEqual([r["id"] for r in second.data["results"]], ["9"])
@@ -1,3 +1,7 @@
+from .async_listing_search_view import AsyncListingSearchView
 from .listing_search_view import ListingSearchView
+from .map_clusters_view import MapClustersView
+from .similar_listings_view import SimilarListingsView
+from .suggest_view import SuggestView
 
-__all__ = ["ListingSearchView"]
+__all__ = ["AsyncListingSearchView", "ListingSearchView", "MapClustersView", "SimilarListingsView", "SuggestView"]
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse
+from django.views import View
+from rest_framework.exceptions import APIException, Throttled, ValidationError
+from rest_framework.request import Request
+
+from . import response_cache
+from .circuit_breaker import get_breaker
+from .index import ensure_index, index_name
+from .listing_search_view import (
+    PIT_KEEP_ALIVE,
+    ListingSearchView,
+    finish_search,
+    hit_listing_ids,
+    plan_search,
+    search_request,
+    unavailable_payload,
+)
+from .opensearch_client import get_async_client
+
+
+def _envelope(data: Any, error: str | None = None, code: int = 200) -> JsonResponse:
+    """The ``ApiRenderer`` envelope, built by hand since this isn't a DRF view."""
+    # Imported here: config.api_response pulls in rest_framework.views, whose
+    # settings import config.api_response again while it is half-initialized
+    from config.api_response import _extract_error_message, api_envelope
+
+    if code >= 400 and error is None:
+        error = _extract_error_message(data)
+    return JsonResponse(api_envelope(data=data, error=error, code=code), status=code)
+
+
+def _check_throttles(request) -> Optional[Throttled]:
+    """Run ``ListingSearchView``'s authentication and throttles on ``request``.
+
+    Returns the ``Throttled`` error DRF would raise, or ``None`` when the
+    request may proceed.
+    """
+    view = ListingSearchView()
+    drf_request = Request(request, authenticators=[auth() for auth in view.authentication_classes])
+    durations = []
+    for throttle in (throttle_class() for throttle_class in view.throttle_classes):
+        if not throttle.allow_request(drf_request, view):
+            durations.append(throttle.wait())
+    if not durations:
+        return None
+    return Throttled(max((d for d in durations if d is not None), default=None))
+
+
+class AsyncListingSearchView(View):
+    """
+    Async variant of ``/search/listings`` for ASGI workers.
+
+    Takes the same parameters and returns the same envelope. OpenSearch is
+    awaited on ``AsyncOpenSearch``; query compilation (currency conversion),
+    the facet cache and the stale-hit check run in ``sync_to_async``, so the
+    event loop keeps serving other searches while one waits on the backend.
+    Plain Django view: DRF's ``APIView`` has no async handlers, so the sync
+    view's authentication and throttles are applied by hand.
+    """
+
+    async def get(self, request):
+        try:
+            throttled = await sync_to_async(_check_throttles)(request)
+        except APIException as exc:
+            return _envelope(exc.detail, code=exc.status_code)
+        if throttled is not None:
+            response = _envelope(throttled.detail, code=throttled.status_code)
+            if throttled.wait:
+                response["Retry-After"] = str(int(throttled.wait))
+            return response
+
+        params = request.GET
+        # Only an ASGI worker keeps its loop; under WSGI the client lives for this request
+        asgi = isinstance(request, ASGIRequest)
+        client = get_async_client(shared=asgi)
+        if not client:
+            return _envelope({"results": [], "total": 0, "note": "Search backend not configured"})
+        try:
+            return await self._respond(client, params)
+        finally:
+            if not asgi:
+                await client.close()
+
+    async def _respond(self, client, params) -> JsonResponse:
+        if get_breaker().is_open():
+            return _envelope({"results": [], "total": 0, "note": "Search backend unavailable"})
+
+        try:  # pragma: no cover
+            await sync_to_async(ensure_index)()
+        except Exception:  # pragma: no cover
+            pass
+
+        try:
+            key = await sync_to_async(response_cache.cache_key)(params)
+            payload = await response_cache.aget_or_compute(key, lambda: self._search(client, params))
+        except ValidationError as exc:
+            return _envelope(exc.detail, code=400)
+        return _envelope(payload)
+
+    async def _search(self, client, params) -> Tuple[Dict[str, Any], bool]:
+        """Run the query and return ``(payload, cacheable)``."""
+        plan = await sync_to_async(plan_search)(params)
+        pit_id = plan["pit_id"]
+        if plan["wants_pit"]:
+            try:
+                pit_id = (
+                    await client.create_pit(index=index_name(), params={"keep_alive": PIT_KEEP_ALIVE})
+                ).get("pit_id")
+            except Exception:
+                pit_id = None
+        try:
+            resp = await client.search(
+                request_timeout=getattr(settings, "OPENSEARCH_SEARCH_TIMEOUT", 2),
+                **search_request(plan, pit_id),
+            )
+            from listings import availability
+            active = await sync_to_async(availability.active_ids)(hit_listing_ids(resp))
+            payload, cacheable, release_pit = await sync_to_async(finish_search)(plan, resp, active, pit_id)
+            if release_pit:
+                try:
+                    await client.delete_pit(body={"pit_id": [release_pit]})
+                except Exception:
+                    pass
+            return payload, cacheable
+        except Exception as e:
+            return unavailable_payload(e), False
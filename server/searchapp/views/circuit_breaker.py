@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+
+try:
+    from opensearchpy import Transport
+    from opensearchpy.exceptions import ConnectionError as OpenSearchConnectionError
+    from opensearchpy.exceptions import TransportError
+except Exception:  # pragma: no cover - library may be missing in some envs
+    Transport = object  # type: ignore
+    OpenSearchConnectionError = TransportError = None  # type: ignore
+
+try:
+    from opensearchpy import AsyncTransport
+except Exception:  # pragma: no cover - needs aiohttp
+    AsyncTransport = object  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+
+class SearchUnavailable(Exception):
+    """Raised instead of calling OpenSearch while the circuit is open."""
+
+
+class CircuitBreaker:
+    """Per-process circuit breaker for calls to the search backend.
+
+    ``closed``: calls pass through; consecutive failures are counted.
+    ``open``: calls fail immediately until ``reset_timeout`` has elapsed.
+    ``half_open``: a single trial call is let through; success closes the
+    circuit, failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._metrics: Dict[str, int] = {
+            "calls": 0,
+            "successes": 0,
+            "failures": 0,
+            "rejected": 0,
+            "opened": 0,
+        }
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = False
+            logger.info("Search circuit half-open; allowing a trial request.")
+        return self._state
+
+    def allow_request(self) -> bool:
+        """Return True if a call may go to the backend now (and count it)."""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                self._metrics["calls"] += 1
+                return True
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                self._metrics["calls"] += 1
+                return True
+            self._metrics["rejected"] += 1
+            return False
+
+    def is_open(self) -> bool:
+        """True while calls would be rejected. Does not consume the half-open trial."""
+        with self._lock:
+            state = self._current_state()
+            return state == self.OPEN or (state == self.HALF_OPEN and self._trial_in_flight)
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._metrics["successes"] += 1
+            if self._state != self.CLOSED:
+                logger.info("Search circuit closed.")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._metrics["failures"] += 1
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self._metrics["opened"] += 1
+                    logger.warning(
+                        "Search circuit opened after %s consecutive failures; failing fast for %ss.",
+                        self._failures,
+                        self.reset_timeout,
+                    )
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def reset(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+            for key in self._metrics:
+                self._metrics[key] = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self._current_state(),
+                "consecutive_failures": self._failures,
+                **self._metrics,
+            }
+
+
+_breaker: Optional[CircuitBreaker] = None
+_breaker_lock = threading.Lock()
+
+
+def get_breaker() -> CircuitBreaker:
+    global _breaker
+    if _breaker is None:
+        with _breaker_lock:
+            if _breaker is None:
+                _breaker = CircuitBreaker(
+                    failure_threshold=int(getattr(settings, "SEARCH_BREAKER_FAILURE_THRESHOLD", 5)),
+                    reset_timeout=float(getattr(settings, "SEARCH_BREAKER_RESET_TIMEOUT", 30)),
+                )
+    return _breaker
+
+
+def is_backend_failure(exc: BaseException) -> bool:
+    """Connection problems, timeouts and 5xx responses trip the breaker; 4xx do not."""
+    if OpenSearchConnectionError is not None and isinstance(exc, OpenSearchConnectionError):
+        return True
+    if TransportError is not None and isinstance(exc, TransportError):
+        return isinstance(exc.status_code, int) and exc.status_code >= 500
+    return False
+
+
+class CircuitBreakerTransport(Transport):  # type: ignore[misc,valid-type]
+    """Transport that routes every client request through the shared breaker.
+
+    Plugging it in at the transport level covers searches, index writes,
+    ``_bulk`` helpers and index management alike.
+    """
+
+    def perform_request(self, *args: Any, **kwargs: Any) -> Any:
+        breaker = get_breaker()
+        if not breaker.allow_request():
+            raise SearchUnavailable("Search backend circuit is open")
+        try:
+            result = super().perform_request(*args, **kwargs)
+        except Exception as exc:
+            if is_backend_failure(exc):
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            raise
+        breaker.record_success()
+        return result
+
+
+class AsyncCircuitBreakerTransport(AsyncTransport):  # type: ignore[misc,valid-type]
+    """``CircuitBreakerTransport`` for ``AsyncOpenSearch``, sharing the same breaker."""
+
+    async def perform_request(self, *args: Any, **kwargs: Any) -> Any:
+        breaker = get_breaker()
+        if not breaker.allow_request():
+            raise SearchUnavailable("Search backend circuit is open")
+        try:
+            result = await super().perform_request(*args, **kwargs)
+        except Exception as exc:
+            if is_backend_failure(exc):
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            raise
+        breaker.record_success()
+        return result
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from typing import Dict, Sequence
+
+from django.utils import timezone
+
+from listings.models import Listing
+
+from .index import DEFAULT_BULK_CHUNK_SIZE, bulk_update_listings, favorite_counts
+from .opensearch_client import get_client
+
+
+def engagement_docs(listing_ids: Sequence[int]) -> Dict[int, Dict[str, int]]:
+    """Current ``view_count`` and ``favorite_count`` of active listings, as partial documents."""
+    views = dict(
+        Listing.objects.filter(id__in=listing_ids, status=Listing.Status.ACTIVE).values_list("id", "view_count")
+    )
+    favorites = favorite_counts(views)
+    return {
+        listing_id: {"view_count": count, "favorite_count": favorites.get(listing_id, 0)}
+        for listing_id, count in views.items()
+    }
+
+
+def refresh_engagement(batch_size: int = DEFAULT_BULK_CHUNK_SIZE) -> Dict[str, int]:
+    """Copy view and favorite counts of listings flagged since the last run into the index.
+
+    Flags (``Listing.engagement_changed_at``) are cleared batch by batch once
+    the ``_bulk`` partial update went through; listings that changed again
+    meanwhile stay flagged for the next run. Returns ``updated`` and
+    ``failed`` document counts.
+    """
+    totals = {"updated": 0, "failed": 0}
+    if not get_client():
+        return totals
+    flagged = Listing.objects.filter(engagement_changed_at__lte=timezone.now())
+    last_id = 0
+    while True:
+        ids = list(flagged.filter(id__gt=last_id).order_by("id").values_list("id", flat=True)[:batch_size])
+        if not ids:
+            break
+        last_id = ids[-1]
+        succeeded, failed = bulk_update_listings(engagement_docs(ids))
+        totals["updated"] += succeeded
+        totals["failed"] += failed
+        if not failed:
+            flagged.filter(id__in=ids).update(engagement_changed_at=None)
+    return totals
@@ -1,19 +1,107 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
+import logging
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
 
 from django.conf import settings
+from django.db.models import Case, Count, FloatField, Value, When
+from django.utils import timezone
 
 from listings.models import Listing, ListingAttributeValue, ListingMedia
-from taxonomy.models import Category, Location
+from listings.quality import quality_score
+
+from searchapp.signals import listings_indexed
 
 from .opensearch_client import get_client
+from .response_cache import bump_generation
 
+try:
+    from opensearchpy import helpers
+    from opensearchpy.exceptions import ConflictError
+except Exception:  # pragma: no cover - library may be missing in some envs
+    helpers = None  # type: ignore
 
-def index_name() -> str:
-    prefix = getattr(settings, "OPENSEARCH_INDEX_PREFIX", "sail")
+    class ConflictError(Exception):  # type: ignore[no-redef]
+        pass
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BULK_CHUNK_SIZE = 500
+# Document versions are the listing revision shifted left by this many bits.
+# In-place updates (update_by_query, partial updates) bump the version by one
+# each; the headroom keeps them below the next revision's full write
+VERSION_HEADROOM_BITS = 20
+VERSION_TYPE = "external_gte"
+# A write rejected by such an in-place bump of its own revision is resent at
+# the stored version this many times before it is reported as failed
+CONFLICT_RETRIES = 1
+# How long a process trusts its view of which physical indexes receive writes
+WRITE_TARGETS_TTL = 5.0
+
+_write_targets_cache: Tuple[float, List[str]] = (0.0, [])
+# Set once the live alias is known to exist, so later calls skip the round trip
+_index_ready = False
+
+
+def _index_prefix() -> str:
+    return getattr(settings, "OPENSEARCH_INDEX_PREFIX", "sail")
+
+
+def alias_name() -> str:
+    """Alias that always points at the fully built index serving searches."""
+    return f"{_index_prefix()}_listings"
+
+
+def building_alias_name() -> str:
+    """Alias marking an index that is being rebuilt and must receive writes too."""
+    return f"{alias_name()}_building"
+
+
+def versioned_index_name(suffix: Optional[str] = None) -> str:
     version = getattr(settings, "OPENSEARCH_INDEX_VERSION", 1)
-    return f"{prefix}_listings_v{version}"
+    name = f"{_index_prefix()}_listings_v{version}"
+    return f"{name}_{suffix}" if suffix else name
+
+
+def document_version(revision: int) -> int:
+    """External version for a document built from ``revision`` of its listing.
+
+    Offset by one so even revision 0 outranks the internal versions of
+    documents written before versioning was introduced.
+    """
+    return (int(revision) + 1) << VERSION_HEADROOM_BITS
+
+
+def _same_revision(stored_version: Optional[int], written_version: int) -> bool:
+    """Whether a stored document comes from the same revision as a rejected write.
+
+    That happens when a partial update bumped the stored version past the
+    write's external version; anything newer supersedes the write.
+    """
+    if stored_version is None:
+        return False
+    return stored_version >> VERSION_HEADROOM_BITS == written_version >> VERSION_HEADROOM_BITS
+
+
+def _stored_versions(client, idx: str, ids: Sequence[str]) -> Dict[str, Optional[int]]:
+    """Current ``_version`` of each id in ``idx``; ``None`` for absent documents."""
+    resp = client.mget(index=idx, body={"ids": list(ids)}, _source=False)
+    return {
+        str(doc.get("_id")): doc.get("_version") if doc.get("found") else None
+        for doc in resp.get("docs", [])
+    }
+
+
+def index_name() -> str:
+    """Name searches address. This is the live alias, never a physical index."""
+    return alias_name()
+
+
+# Display-only fields: returned in _source but neither searchable nor sortable
+_STORED_ONLY: Dict[str, Any] = {"type": "keyword", "index": False, "doc_values": False}
 
 
 def mapping_body() -> Dict[str, Any]:
@@ -21,32 +109,62 @@ def mapping_body() -> Dict[str, Any]:
         "settings": {
             "index": {"number_of_shards": 1, "number_of_replicas": 0},
             "analysis": {
+                "tokenizer": {
+                    "trigram": {
+                        "type": "ngram",
+                        "min_gram": 3,
+                        "max_gram": 3,
+                        "token_chars": ["letter", "digit"],
+                    }
+                },
                 "analyzer": {
                     "folding": {
                         "tokenizer": "standard",
                         "filter": ["lowercase", "asciifolding"],
-                    }
-                }
+                    },
+                    # Same folding as above, split into trigrams so substring
+                    # matches become term lookups instead of wildcard scans
+                    "folding_ngram": {
+                        "tokenizer": "trigram",
+                        "filter": ["lowercase", "asciifolding"],
+                    },
+                },
             },
         },
         "mappings": {
             "dynamic": "false",
             "properties": {
                 "id": {"type": "keyword"},
+                # Numeric copy of id: keyword ids sort as strings ("10" < "9")
+                "listing_id": {"type": "long"},
                 "user_id": {"type": "keyword"},
-                "title": {"type": "text", "analyzer": "folding"},
-                "description": {"type": "text", "analyzer": "folding"},
+                "title": {
+                    "type": "text",
+                    "analyzer": "folding",
+                    "fields": {"ngram": {"type": "text", "analyzer": "folding_ngram"}},
+                },
+                "description": {
+                    "type": "text",
+                    "analyzer": "folding",
+                    "fields": {"ngram": {"type": "text", "analyzer": "folding_ngram"}},
+                },
                 "category_path": {"type": "keyword"},
                 "location_path": {"type": "keyword"},
-                "location_name_ru": {"type": "keyword"},
-                "location_name_uz": {"type": "keyword"},
+                "location_name_ru": _STORED_ONLY,
+                "location_name_uz": _STORED_ONLY,
                 "price": {"type": "double"},
                 "price_normalized": {"type": "double"},
                 "currency": {"type": "keyword"},
                 "condition": {"type": "keyword"},
                 "geo": {"type": "geo_point"},
+                "status": {"type": "keyword"},
+                "revision": {"type": "long", "index": False},
+                "created_at": {"type": "date"},
                 "refreshed_at": {"type": "date"},
                 "quality_score": {"type": "double"},
+                # Ranking signals, refreshed by partial updates (search.refresh_engagement)
+                "view_count": {"type": "integer"},
+                "favorite_count": {"type": "integer"},
                 "attrs": {
                     "type": "nested",
                     "properties": {
@@ -58,51 +176,193 @@ def mapping_body() -> Dict[str, Any]:
                         "value_option_key": {"type": "keyword"},
                     },
                 },
-                "media_urls": {"type": "keyword"},
+                "media_urls": _STORED_ONLY,
                 "seller_id": {"type": "keyword"},
-                "seller_name": {"type": "keyword"},
+                "seller_name": _STORED_ONLY,
+                # Everything a result tile renders (versioned by "v"); kept in
+                # _source only, nothing in it is searchable
+                "card": {"type": "object", "enabled": False},
+                # Prefix autocomplete (/search/suggest): title word suffixes,
+                # and the leaf category/location names in every language
+                "suggest": {"type": "completion", "analyzer": "folding"},
+                "suggest_category": {"type": "completion", "analyzer": "folding"},
+                "suggest_location": {"type": "completion", "analyzer": "folding"},
             },
         },
     }
 
 
-def ensure_index():
+def ensure_index(force: bool = False):
+    """Make sure the live alias exists, adopting or creating the versioned index.
+
+    The result is remembered for the life of the process; pass ``force`` to
+    check again.
+    """
+    global _index_ready
+    if _index_ready and not force:
+        return
     client = get_client()
     if not client:
         return
-    idx = index_name()
-    if not client.indices.exists(index=idx):  # type: ignore[attr-defined]
-        client.indices.create(index=idx, body=mapping_body())  # type: ignore[attr-defined]
+    alias = alias_name()
+    if not client.indices.exists_alias(name=alias):  # type: ignore[attr-defined]
+        idx = versioned_index_name()
+        if not client.indices.exists(index=idx):  # type: ignore[attr-defined]
+            client.indices.create(index=idx, body=mapping_body())  # type: ignore[attr-defined]
+        client.indices.put_alias(index=idx, name=alias)  # type: ignore[attr-defined]
+        _reset_write_targets()
+    _index_ready = True
 
 
-def build_document(listing: Listing) -> Dict[str, Any]:
-    # Build category path up to root
-    cat_path: List[str] = []
-    cat = listing.category
-    while cat:
-        cat_path.append(cat.slug)
-        cat = cat.parent  # type: ignore[attr-defined]
-    cat_path.reverse()
-
-    # Location path
-    loc_path: List[str] = []
-    loc = listing.location
-    while loc:
-        loc_path.append(loc.slug)
-        loc = loc.parent  # type: ignore[attr-defined]
-    loc_path.reverse()
-    # Location names (ru/uz) for display in search cards
-    loc_display_ru = listing.location.name_ru or listing.location.name or ""
-    loc_display_uz = listing.location.name_uz or listing.location.name or ""
+def _reset_write_targets() -> None:
+    global _write_targets_cache
+    _write_targets_cache = (0.0, [])
 
-    # Attributes
-    attr_rows = (
-        ListingAttributeValue.objects.filter(listing=listing).select_related("attribute")
+
+def _aliased_indices(client) -> Dict[str, List[str]]:
+    """Map each of our aliases to the physical indexes behind it (one request)."""
+    try:
+        resp = client.indices.get_alias(  # type: ignore[attr-defined]
+            index=f"{_index_prefix()}_listings_v*", ignore_unavailable=True
+        )
+    except Exception:
+        return {}
+    result: Dict[str, List[str]] = {}
+    for idx, info in (resp or {}).items():
+        for alias in (info.get("aliases") or {}):
+            result.setdefault(alias, []).append(idx)
+    return result
+
+
+def write_targets() -> List[str]:
+    """Physical indexes every document write must reach.
+
+    That is the live index plus, while a rebuild runs, the index being built,
+    so the new index does not miss updates made during the load.
+    """
+    global _write_targets_cache
+    expires_at, targets = _write_targets_cache
+    if targets and time.monotonic() < expires_at:
+        return targets
+    client = get_client()
+    if not client:
+        return []
+    aliases = _aliased_indices(client)
+    targets = sorted(set(aliases.get(alias_name(), [])) | set(aliases.get(building_alias_name(), [])))
+    if not targets:
+        # No alias yet (or lookup failed): fall back to addressing the alias itself
+        return [alias_name()]
+    _write_targets_cache = (time.monotonic() + WRITE_TARGETS_TTL, targets)
+    return targets
+
+
+def building_indices() -> List[str]:
+    """Physical indexes a rebuild is currently loading (normally none or one)."""
+    client = get_client()
+    if not client:
+        return []
+    return sorted(_aliased_indices(client).get(building_alias_name(), []))
+
+
+def start_rebuild() -> str:
+    """Create a fresh versioned index from ``mapping_body()`` and mark it as building."""
+    client = get_client()
+    if not client:
+        raise RuntimeError("OpenSearch client not available")
+    idx = versioned_index_name(timezone.now().strftime("%Y%m%d%H%M%S"))
+    client.indices.create(index=idx, body=mapping_body())  # type: ignore[attr-defined]
+    client.indices.put_alias(index=idx, name=building_alias_name())  # type: ignore[attr-defined]
+    _reset_write_targets()
+    # Other processes keep their cached write targets for up to the TTL; once
+    # it has passed every live write reaches the new index too, so a load
+    # starting now can't miss an edit
+    time.sleep(WRITE_TARGETS_TTL)
+    return idx
+
+
+def finish_rebuild(new_idx: str, delete_old: bool = False) -> List[str]:
+    """Atomically point the live alias at ``new_idx`` and return the indexes it left."""
+    client = get_client()
+    if not client:
+        raise RuntimeError("OpenSearch client not available")
+    alias = alias_name()
+    old = [i for i in _aliased_indices(client).get(alias, []) if i != new_idx]
+    actions: List[Dict[str, Any]] = [{"remove": {"index": i, "alias": alias}} for i in old]
+    actions.append({"add": {"index": new_idx, "alias": alias}})
+    actions.append({"remove": {"index": new_idx, "alias": building_alias_name()}})
+    client.indices.update_aliases(body={"actions": actions})  # type: ignore[attr-defined]
+    _reset_write_targets()
+    bump_generation()
+    if delete_old and old:
+        # Let cached write targets naming the old indexes expire first: a write
+        # to a deleted index would recreate it with a dynamic mapping
+        time.sleep(WRITE_TARGETS_TTL)
+        for idx in old:
+            client.indices.delete(index=idx)  # type: ignore[attr-defined]
+    return old
+
+
+def abort_rebuild(new_idx: str) -> None:
+    """Drop a partially built index; the live alias is left untouched."""
+    client = get_client()
+    if not client:
+        return
+    client.indices.delete(index=new_idx, ignore_unavailable=True)  # type: ignore[attr-defined]
+    _reset_write_targets()
+
+
+SUGGEST_TITLE_WORDS = 4
+# Bump when the card layout changes; clients can tell stale documents apart
+# until `search_reindex --rebuild` has rewritten them
+CARD_VERSION = 1
+
+
+def _title_suggest_inputs(title: str) -> List[str]:
+    """Title suffixes starting at each of the first few words.
+
+    Completion fields only match from the start of an input, so "iph" finds
+    "Apple iPhone 15" through its "iPhone 15" suffix.
+    """
+    words = (title or "").split()
+    return [" ".join(words[i:]) for i in range(min(len(words), SUGGEST_TITLE_WORDS))]
+
+
+def _name_suggest_inputs(node) -> List[str]:
+    names = [node.name, node.name_ru, node.name_uz]
+    return list(dict.fromkeys(n for n in names if n))
+
+
+def favorite_counts(listing_ids: Iterable[int]) -> Dict[int, int]:
+    """Favorites per listing; listings nobody favorited are absent."""
+    from favorites.models import FavoriteListing
+
+    return dict(
+        FavoriteListing.objects.filter(listing_id__in=list(listing_ids))
+        .values("listing_id")
+        .annotate(n=Count("id"))
+        .values_list("listing_id", "n")
     )
-    attrs: List[Dict[str, Any]] = []
+
+
+def build_documents(listings: Sequence[Listing]) -> Dict[int, Dict[str, Any]]:
+    """Build search documents for already-fetched listings, keyed by listing id.
+
+    Listings should come with ``category`` and ``location`` selected. Related
+    data is loaded with a fixed set of queries for the whole batch.
+    """
+    from accounts.models import Profile
+    from currency.services import CurrencyService
+
+    if not listings:
+        return {}
+    ids = [l.id for l in listings]
+
+    # Attributes
+    attrs_by_listing: Dict[int, List[Dict[str, Any]]] = {}
+    attr_rows = ListingAttributeValue.objects.filter(listing_id__in=ids).select_related("attribute")
     for row in attr_rows:
         a = row.attribute
-        attrs.append(
+        attrs_by_listing.setdefault(row.listing_id, []).append(
             {
                 "key": a.key,
                 "type": a.type,
@@ -113,48 +373,138 @@ def build_document(listing: Listing) -> Dict[str, Any]:
             }
         )
 
-    # Media URLs (first few only)
-    media = ListingMedia.objects.filter(listing=listing).order_by("order", "id")[:5]
-    media_urls = [m.image.url for m in media if m.image]
+    # Media URLs (first few only), plus the cover image for the card
+    media_by_listing: Dict[int, List[str]] = {}
+    media_counts: Dict[int, int] = {}
+    cover_by_listing: Dict[int, Dict[str, Any]] = {}
+    media_rows = ListingMedia.objects.filter(listing_id__in=ids).order_by("listing_id", "order", "id")
+    for m in media_rows:
+        urls = media_by_listing.setdefault(m.listing_id, [])
+        if m.image:
+            media_counts[m.listing_id] = media_counts.get(m.listing_id, 0) + 1
+        if len(urls) < 5 and m.image:
+            urls.append(m.image.url)
+            if m.listing_id not in cover_by_listing:
+                cover_by_listing[m.listing_id] = {"url": m.image.url, "width": m.width, "height": m.height}
 
-    # Normalize price to base currency (UZS) for consistent sorting
-    from currency.services import CurrencyService
+    # Normalize price to base currency (UZS) for consistent sorting; one rate
+    # lookup per currency in the batch rather than per listing
+    rate_to_base = {
+        code: CurrencyService.normalize_price_to_base(Decimal("1"), code)
+        for code in {l.price_currency for l in listings}
+    }
 
-    price_normalized = float(
-        CurrencyService.normalize_price_to_base(listing.price_amount or 0, listing.price_currency)
-    )
+    favorites = favorite_counts(ids)
 
     # Seller info from profile
-    from accounts.models import Profile
-    seller_name = ""
-    try:
-        profile = Profile.objects.get(user_id=listing.user_id)
-        seller_name = profile.display_name or ""
-    except Profile.DoesNotExist:
-        pass
-
-    doc = {
-        "id": str(listing.id),
-        "user_id": str(listing.user_id),
-        "title": listing.title,
-        "description": listing.description,
-        "category_path": cat_path,
-        "location_path": loc_path,
-        "location_name_ru": loc_display_ru,
-        "location_name_uz": loc_display_uz,
-        "price": float(listing.price_amount or 0),
-        "price_normalized": price_normalized,
-        "currency": listing.price_currency,
-        "condition": listing.condition,
-        "geo": {"lat": listing.lat, "lon": listing.lon} if listing.lat and listing.lon else None,
-        "refreshed_at": listing.refreshed_at,
-        "quality_score": listing.quality_score,
-        "attrs": attrs,
-        "media_urls": media_urls,
-        "seller_id": str(listing.user_id),
-        "seller_name": seller_name,
+    sellers = {
+        user_id: (name or "", avatar or "")
+        for user_id, name, avatar in Profile.objects.filter(user_id__in={l.user_id for l in listings}).values_list(
+            "user_id", "display_name", "avatar_url"
+        )
     }
-    return doc
+
+    docs: Dict[int, Dict[str, Any]] = {}
+    rescored: Dict[int, float] = {}
+    for listing in listings:
+        score = quality_score(
+            description=listing.description,
+            photo_count=media_counts.get(listing.id, 0),
+            attribute_count=len(attrs_by_listing.get(listing.id, [])),
+            has_price=bool(listing.price_amount),
+            has_geo=bool(listing.lat and listing.lon),
+        )
+        if score != listing.quality_score:
+            rescored[listing.id] = score
+
+        # Location names (ru/uz) for display in search cards
+        loc_display_ru = listing.location.name_ru or listing.location.name or ""
+        loc_display_uz = listing.location.name_uz or listing.location.name or ""
+
+        price_normalized = float((listing.price_amount or 0) * rate_to_base[listing.price_currency])
+        seller_name, seller_avatar = sellers.get(listing.user_id, ("", ""))
+
+        docs[listing.id] = {
+            "id": str(listing.id),
+            "listing_id": listing.id,
+            "user_id": str(listing.user_id),
+            "title": listing.title,
+            "description": listing.description,
+            # Materialized on the taxonomy rows, so no per-level lookups
+            "category_path": listing.category.ancestor_slugs,
+            "location_path": listing.location.ancestor_slugs,
+            "location_name_ru": loc_display_ru,
+            "location_name_uz": loc_display_uz,
+            "price": float(listing.price_amount or 0),
+            "price_normalized": price_normalized,
+            "currency": listing.price_currency,
+            "condition": listing.condition,
+            "geo": {"lat": listing.lat, "lon": listing.lon} if listing.lat and listing.lon else None,
+            "status": listing.status,
+            "revision": listing.revision,
+            "created_at": listing.created_at,
+            "refreshed_at": listing.refreshed_at,
+            "quality_score": score,
+            "view_count": listing.view_count,
+            "favorite_count": favorites.get(listing.id, 0),
+            "attrs": attrs_by_listing.get(listing.id, []),
+            "media_urls": media_by_listing.get(listing.id, []),
+            "seller_id": str(listing.user_id),
+            "seller_name": seller_name,
+            "card": {
+                "v": CARD_VERSION,
+                "id": listing.id,
+                "title": listing.title,
+                "price": float(listing.price_amount or 0),
+                "currency": listing.price_currency,
+                "is_price_negotiable": listing.is_price_negotiable,
+                "deal_type": listing.deal_type,
+                "condition": listing.condition,
+                "image": cover_by_listing.get(listing.id),
+                "media_count": media_counts.get(listing.id, 0),
+                "location_name_ru": loc_display_ru,
+                "location_name_uz": loc_display_uz,
+                "seller": {"id": listing.user_id, "name": seller_name, "avatar_url": seller_avatar},
+                "created_at": listing.created_at,
+                "refreshed_at": listing.refreshed_at,
+            },
+            "suggest": _title_suggest_inputs(listing.title),
+            "suggest_category": _name_suggest_inputs(listing.category),
+            "suggest_location": _name_suggest_inputs(listing.location),
+        }
+    _store_quality_scores(rescored)
+    return docs
+
+
+def _store_quality_scores(changed: Dict[int, float]) -> None:
+    """Persist recomputed scores with one UPDATE, bypassing save() and its reindex signals."""
+    if not changed:
+        return
+    ids_by_score: Dict[float, List[int]] = {}
+    for listing_id, score in changed.items():
+        ids_by_score.setdefault(score, []).append(listing_id)
+    Listing.objects.filter(id__in=changed).update(
+        quality_score=Case(
+            *(When(id__in=ids, then=Value(score)) for score, ids in ids_by_score.items()),
+            output_field=FloatField(),
+        )
+    )
+
+
+def build_document_many(listing_ids: Iterable[int], active_only: bool = True) -> Dict[int, Dict[str, Any]]:
+    """Fetch listings by id and build their documents in a fixed number of queries.
+
+    Ids that are missing (or not active, with ``active_only``) are absent from
+    the result, which callers use to decide what to delete from the index.
+    """
+    qs = Listing.objects.select_related("category", "location").filter(id__in=list(listing_ids))
+    if active_only:
+        qs = qs.filter(status=Listing.Status.ACTIVE)
+    return build_documents(list(qs))
+
+
+def build_document(listing: Listing) -> Dict[str, Any]:
+    return build_documents([listing])[listing.id]
 
 
 def index_listing(listing_id: int):
@@ -162,23 +512,306 @@ def index_listing(listing_id: int):
     if not client:
         return
     ensure_index()
-    try:
-        listing = Listing.objects.select_related("category", "location").get(id=listing_id)
-    except Listing.DoesNotExist:
-        delete_listing(listing_id)
+    doc = build_document_many([listing_id]).get(listing_id)
+    if doc is None:
+        revision = Listing.objects.filter(pk=listing_id).values_list("revision", flat=True).first()
+        delete_listing(listing_id, revision=revision)
         return
-    if listing.status != Listing.Status.ACTIVE:
-        delete_listing(listing_id)
+    current = True
+    for idx in write_targets():
+        if not _index_document(client, idx, listing_id, doc):
+            current = False
+    bump_generation()
+    if current:
+        _notify_indexed({listing_id: doc})
+
+
+def _index_document(client, idx: str, listing_id: int, doc: Dict[str, Any]) -> bool:
+    """Write ``doc`` to ``idx``; ``False`` if a newer revision is already there."""
+    version = document_version(doc["revision"])
+    for _ in range(CONFLICT_RETRIES + 1):
+        try:
+            client.index(  # type: ignore[arg-type]
+                index=idx,
+                id=str(listing_id),
+                body=doc,
+                version=version,
+                version_type=VERSION_TYPE,
+            )
+            return True
+        except ConflictError:
+            try:
+                stored = _stored_versions(client, idx, [str(listing_id)]).get(str(listing_id))
+            except Exception as e:
+                logger.error("Version lookup for listing %s in %s failed: %s", listing_id, idx, e)
+                return False
+            if not _same_revision(stored, version):
+                # A newer revision got there first
+                return False
+            version = stored
+    logger.error("Indexing listing %s into %s kept conflicting with its own revision", listing_id, idx)
+    return False
+
+
+def _notify_indexed(docs: Dict[int, Dict[str, Any]]) -> None:
+    if not docs:
+        return
+    for receiver, result in listings_indexed.send_robust(sender=None, documents=docs):
+        if isinstance(result, Exception):
+            logger.error("listings_indexed receiver %r failed: %s", receiver, result)
+
+
+def delete_listing(listing_id: int, revision: Optional[int] = None):
+    """Remove a listing's documents; with ``revision``, only if no newer write exists."""
+    client = get_client()
+    if not client:
         return
-    doc = build_document(listing)
-    client.index(index=index_name(), id=str(listing_id), body=doc)  # type: ignore[arg-type]
+    versioning = (
+        {"version": document_version(revision), "version_type": VERSION_TYPE} if revision is not None else {}
+    )
+    for idx in write_targets():
+        try:
+            client.delete(index=idx, id=str(listing_id), **versioning)
+        except Exception:
+            pass
+    bump_generation()
+
+
+def iter_listing_id_chunks(
+    chunk_size: int = DEFAULT_BULK_CHUNK_SIZE,
+    status: Optional[str] = Listing.Status.ACTIVE,
+    start_id: int = 1,
+    end_id: Optional[int] = None,
+) -> Iterator[List[int]]:
+    """Yield listing ids in ascending chunks using keyset pagination.
+
+    Seeking on ``id > last_id`` keeps every chunk query an index range scan,
+    unlike OFFSET paging which slows down as the reindex progresses. Only
+    ids in ``[start_id, end_id)`` are yielded.
+    """
+    qs = Listing.objects.all()
+    if status is not None:
+        qs = qs.filter(status=status)
+    if end_id is not None:
+        qs = qs.filter(id__lt=end_id)
+    last_id = start_id - 1
+    while True:
+        ids = list(
+            qs.filter(id__gt=last_id).order_by("id").values_list("id", flat=True)[:chunk_size]
+        )
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+
+def _bulk_actions(
+    ids: Sequence[int],
+    docs: Dict[int, Dict[str, Any]],
+    indices: Sequence[str],
+    delete_revisions: Optional[Dict[int, int]] = None,
+) -> List[Dict[str, Any]]:
+    """Index ``docs`` and delete the rest of ``ids``, versioned by listing revision.
+
+    Deletes are versioned when the listing still exists (``delete_revisions``),
+    so a stale write arriving shortly after is rejected by the tombstone.
+    """
+    delete_revisions = delete_revisions or {}
+    actions: List[Dict[str, Any]] = []
+    for idx in indices:
+        actions.extend(
+            {
+                "_op_type": "index",
+                "_index": idx,
+                "_id": str(listing_id),
+                "_source": doc,
+                "version": document_version(doc["revision"]),
+                "version_type": VERSION_TYPE,
+            }
+            for listing_id, doc in docs.items()
+        )
+        # Missing or inactive listings must not linger in the index
+        for listing_id in ids:
+            if listing_id in docs:
+                continue
+            action: Dict[str, Any] = {"_op_type": "delete", "_index": idx, "_id": str(listing_id)}
+            if listing_id in delete_revisions:
+                action.update(version=document_version(delete_revisions[listing_id]), version_type=VERSION_TYPE)
+            actions.append(action)
+    return actions
+
+
+def _run_bulk(client, actions: List[Dict[str, Any]]) -> Tuple[int, int, Set[str]]:
+    """Send ``actions`` as one ``_bulk`` request.
+
+    Returns ``(succeeded, failed, superseded_ids)``. Deletes and partial
+    updates of absent documents count as succeeded. A versioned write
+    rejected with 409 is superseded (and its id reported) when a newer
+    revision is stored; when the stored document is the same revision with
+    an in-place bump, the write is resent at the stored version instead.
+    """
+    succeeded = failed = 0
+    superseded: Set[str] = set()
+    pending = actions
+    for attempt in range(CONFLICT_RETRIES + 1):
+        ok, errors = helpers.bulk(
+            client,
+            pending,
+            chunk_size=len(pending),
+            stats_only=False,
+            raise_on_error=False,
+        )
+        succeeded += ok
+        conflicts: List[Dict[str, Any]] = []
+        for error in errors:
+            op_type, item = next(iter(error.items()))
+            status = item.get("status")
+            action = _failed_action(pending, op_type, item)
+            if status == 409 and action is not None and "version" in action:
+                conflicts.append(action)
+            elif status == 404 and op_type in ("delete", "update"):
+                succeeded += 1
+            else:
+                failed += 1
+        pending, unresolved = _rebase_conflicts(client, conflicts, superseded)
+        failed += unresolved
+        if not pending:
+            break
+    else:
+        failed += len(pending)
+        logger.error("%d bulk writes kept conflicting with their own revision", len(pending))
+    return succeeded, failed, superseded
+
+
+def _failed_action(actions: List[Dict[str, Any]], op_type: str, item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """The action a ``_bulk`` error item belongs to.
 
+    Items name the physical index, which differs from the action's when it
+    addressed an alias; an id written to a single index still matches.
+    """
+    _id = str(item.get("_id"))
+    candidates = [a for a in actions if a["_op_type"] == op_type and a["_id"] == _id]
+    exact = [a for a in candidates if a["_index"] == item.get("_index")]
+    if exact:
+        return exact[0]
+    return candidates[0] if len(candidates) == 1 else None
 
-def delete_listing(listing_id: int):
+
+def _rebase_conflicts(
+    client, conflicts: List[Dict[str, Any]], superseded: Set[str]
+) -> Tuple[List[Dict[str, Any]], int]:
+    """Split 409-rejected ``conflicts`` into superseded ids and writes to resend.
+
+    Returns ``(retry, unresolved)``: writes whose revision is still the stored
+    one, re-versioned at the stored version, and how many conflicts could not
+    be checked because the version lookup failed. The ids of the rest are
+    added to ``superseded``.
+    """
+    by_index: Dict[str, List[Dict[str, Any]]] = {}
+    for action in conflicts:
+        by_index.setdefault(action["_index"], []).append(action)
+    retry: List[Dict[str, Any]] = []
+    unresolved = 0
+    for idx, idx_actions in by_index.items():
+        try:
+            stored = _stored_versions(client, idx, [a["_id"] for a in idx_actions])
+        except Exception as e:
+            logger.error("Version lookup in %s failed: %s", idx, e)
+            unresolved += len(idx_actions)
+            continue
+        for action in idx_actions:
+            version = stored.get(action["_id"])
+            if _same_revision(version, action["version"]):
+                retry.append({**action, "version": version})
+            else:
+                superseded.add(action["_id"])
+    return retry, unresolved
+
+
+def bulk_index_listings(
+    listing_ids: Iterable[int], indices: Optional[Sequence[str]] = None, notify: bool = True
+) -> Tuple[int, int]:
+    """Index or delete a batch of listings with a single ``_bulk`` request.
+
+    Writes go to ``write_targets()`` unless ``indices`` is given. Returns a
+    ``(succeeded, failed)`` tuple; deleting a document that is already
+    absent is not counted as a failure. Live writes (no ``indices``) send
+    ``listings_indexed`` for the documents written, unless ``notify`` is
+    off: bulk loads and reconciliation rewrite listings nobody just edited.
+    """
     client = get_client()
+    if not client or helpers is None:
+        return 0, 0
+    ids = list(listing_ids)
+    docs = build_document_many(ids)
+    gone = [i for i in ids if i not in docs]
+    delete_revisions = dict(Listing.objects.filter(id__in=gone).values_list("id", "revision")) if gone else {}
+    actions = _bulk_actions(ids, docs, indices or write_targets(), delete_revisions)
+    if not actions:
+        return 0, 0
+    succeeded, failed, superseded = _run_bulk(client, actions)
+    bump_generation()
+    if notify and indices is None:
+        _notify_indexed({i: doc for i, doc in docs.items() if str(i) not in superseded})
+    return succeeded, failed
+
+
+def bulk_delete_listings(listing_ids: Iterable[int], indices: Optional[Sequence[str]] = None) -> Tuple[int, int]:
+    """Delete a batch of documents with a single ``_bulk`` request.
+
+    Returns ``(succeeded, failed)``; ids already absent count as succeeded.
+    """
+    client = get_client()
+    if not client or helpers is None:
+        return 0, 0
+    actions = _bulk_actions(list(listing_ids), {}, indices or write_targets())
+    if not actions:
+        return 0, 0
+    succeeded, failed, _ = _run_bulk(client, actions)
+    bump_generation()
+    return succeeded, failed
+
+
+def bulk_update_listings(
+    partial_docs: Dict[int, Dict[str, Any]], indices: Optional[Sequence[str]] = None
+) -> Tuple[int, int]:
+    """Merge ``partial_docs`` into indexed documents with a single ``_bulk`` request.
+
+    Partial updates bump the internal version by one, which stays inside the
+    revision headroom; a later write of the same revision then conflicts and
+    is resent at the stored version by ``_run_bulk``. Returns
+    ``(succeeded, failed)``; listings that aren't indexed count as succeeded.
+    """
+    client = get_client()
+    if not client or helpers is None:
+        return 0, 0
+    actions = [
+        {"_op_type": "update", "_index": idx, "_id": str(listing_id), "doc": doc}
+        for idx in indices or write_targets()
+        for listing_id, doc in partial_docs.items()
+    ]
+    if not actions:
+        return 0, 0
+    succeeded, failed, _ = _run_bulk(client, actions)
+    bump_generation()
+    return succeeded, failed
+
+
+@contextmanager
+def refresh_disabled(idx: Optional[str] = None):
+    """Turn off periodic refresh on the index for the duration of a bulk load.
+
+    The default refresh interval is restored and a single refresh issued on
+    exit so the loaded documents become searchable at once.
+    """
+    client = get_client()
+    idx = idx or index_name()
     if not client:
+        yield
         return
+    client.indices.put_settings(index=idx, body={"index": {"refresh_interval": "-1"}})  # type: ignore[attr-defined]
     try:
-        client.delete(index=index_name(), id=str(listing_id))
-    except Exception:
-        pass
+        yield
+    finally:
+        client.indices.put_settings(index=idx, body={"index": {"refresh_interval": None}})  # type: ignore[attr-defined]
+        client.indices.refresh(index=idx)  # type: ignore[attr-defined]
@@ -1,110 +1,178 @@
 from __future__ import annotations
 
-import re
-from typing import Any, Dict, List
+import base64
+import json
+from typing import Any, Dict, List, Tuple
 
 from django.conf import settings
+from django.core.cache import cache
 from drf_spectacular.utils import OpenApiExample, OpenApiParameter, extend_schema
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from taxonomy.models import Attribute, Category
+
+from . import query_compiler, response_cache
+from .circuit_breaker import get_breaker
 from .opensearch_client import get_client
 from .index import index_name, ensure_index
 
 
-def _parse_filters(params) -> Dict[str, Any]:
-    filters: Dict[str, Any] = {}
-    # Handle repeated keys and comma-separated values
-    for k, values in params.lists():
-        if k.startswith("attrs."):
-            key = k.split(".", 1)[1]
-            # Support range suffixes _min/_max
-            if key.endswith("_min") or key.endswith("_max"):
-                filters.setdefault("attrs_range", {})[key] = values[-1]
-            else:
-                vals: List[str] = []
-                for v in values:
-                    if "," in v:
-                        vals.extend([s for s in v.split(",") if s])
-                    else:
-                        vals.append(v)
-                filters.setdefault("attrs", {})[key] = vals
-        elif k in {"category_slug", "location_slug", "min_price", "max_price", "condition", "currency", "user_id"}:
-            filters[k] = values[-1]
-    return filters
-
-
-def _build_text_query(query: str) -> Dict[str, Any]:
-    tokens = [token.strip() for token in re.split(r"\s+", query) if token.strip()]
-    if not tokens:
-        return {"match_all": {}}
-
-    must_clauses: List[Dict[str, Any]] = []
-    for token in tokens:
-        normalized = _normalize_query_token(token)
-        token_shoulds: List[Dict[str, Any]] = [
-            {
-                "multi_match": {
-                    "query": token,
-                    "fields": ["title^5", "description^2"],
-                    "type": "best_fields",
-                }
-            },
-            {
-                "multi_match": {
-                    "query": token,
-                    "fields": ["title^6", "description^2"],
-                    "type": "phrase_prefix",
-                }
-            },
-            {
-                "multi_match": {
-                    "query": token,
-                    "fields": ["title^4", "description"],
-                    "type": "best_fields",
-                    "fuzziness": "AUTO",
-                }
-            },
-        ]
+PIT_KEEP_ALIVE = "2m"
+
+
+def _encode_cursor(state: Dict[str, Any]) -> str:
+    raw = json.dumps(state, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(value: str) -> Dict[str, Any]:
+    """Decode an opaque cursor; an empty value starts a new cursor walk."""
+    if not value:
+        return {}
+    try:
+        raw = base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+        state = json.loads(raw)
+    except Exception:
+        raise ValidationError({"cursor": "Invalid cursor."})
+    if not isinstance(state, dict) or not isinstance(state.get("after"), list):
+        raise ValidationError({"cursor": "Invalid cursor."})
+    return state
+
+
+FACET_LEVELS = ("none", "basic", "full")
+RESULT_VIEWS = ("full", "card")
 
-        if len(normalized) >= 3:
-            token_shoulds.extend(
-                [
-                    {
-                        "wildcard": {
-                            "title": {
-                                "value": f"*{normalized}*",
-                                "boost": 2.5,
-                            }
-                        }
-                    },
-                    {
-                        "wildcard": {
-                            "description": {
-                                "value": f"*{normalized}*",
-                                "boost": 1.0,
-                            }
-                        }
-                    },
-                ]
-            )
 
-        must_clauses.append(
-            {
-                "bool": {
-                    "should": token_shoulds,
-                    "minimum_should_match": 1,
+def _category_facet_keys(category_slug: str) -> List[str]:
+    """Indexed attribute keys of a category, including inherited ones."""
+    category = Category.objects.filter(slug=category_slug).first()
+    ids = category.ancestor_ids if category else []
+    return list(
+        Attribute.objects.filter(category_id__in=ids, is_indexed=True)
+        .values_list("key", flat=True)
+        .distinct()
+    )
+
+
+def _facet_aggs(level: str, category_slug: str | None = None) -> Dict[str, Any]:
+    """Aggregations for a facet level.
+
+    ``basic`` covers categories, locations, conditions and the price range.
+    ``full`` adds attribute facets, restricted to the selected category's
+    indexed attributes; without a category there are no attribute facets.
+    """
+    if level == "none":
+        return {}
+    aggs: Dict[str, Any] = {
+        "categories": {
+            "terms": {"field": "category_path", "size": 50}
+        },
+        "locations": {
+            "terms": {"field": "location_path", "size": 50}
+        },
+        "conditions": {
+            "terms": {"field": "condition", "size": 10}
+        },
+        "price_stats": {
+            "stats": {"field": "price_normalized"}
+        },
+    }
+    keys = _category_facet_keys(category_slug) if level == "full" and category_slug else []
+    if keys:
+        aggs["attrs"] = {
+            "nested": {"path": "attrs"},
+            "aggs": {
+                "attr_keys": {
+                    "terms": {"field": "attrs.key", "include": keys, "size": len(keys)},
+                    "aggs": {
+                        "values": {
+                            "terms": {"field": "attrs.value_option_key", "size": 30}
+                        },
+                        "text_values": {
+                            "terms": {"field": "attrs.value_text", "size": 30}
+                        }
+                    }
                 }
             }
-        )
-
-    return {"bool": {"must": must_clauses}}
+        }
+    return aggs
 
 
-def _normalize_query_token(token: str) -> str:
-    cleaned = token.strip().lower()
-    cleaned = cleaned.replace("*", "").replace("?", "")
-    return cleaned
+def _format_facets(aggregations: Dict[str, Any], currency: str) -> Dict[str, Any]:
+    facets = {}
+    if "categories" in aggregations:
+        facets["categories"] = [
+            {"key": b["key"], "count": b["doc_count"]}
+            for b in aggregations["categories"]["buckets"]
+        ]
+    if "locations" in aggregations:
+        facets["locations"] = [
+            {"key": b["key"], "count": b["doc_count"]}
+            for b in aggregations["locations"]["buckets"]
+        ]
+    if "conditions" in aggregations:
+        facets["conditions"] = [
+            {"key": b["key"], "count": b["doc_count"]}
+            for b in aggregations["conditions"]["buckets"]
+        ]
+    if "price_stats" in aggregations:
+        from currency.services import CurrencyService
+        from decimal import Decimal
+
+        # Get price stats (in base currency)
+        min_price_normalized = aggregations["price_stats"]["min"]
+        max_price_normalized = aggregations["price_stats"]["max"]
+
+        # Convert to user's requested currency if specified
+        if currency != "UZS":
+            # Get default currency to determine base currency
+            default_currency = CurrencyService.get_default_currency()
+            base_currency_code = default_currency.code if default_currency else "UZS"
+
+            # Convert min price from base to user's currency
+            if min_price_normalized is not None:
+                converted_min = CurrencyService.convert_price(
+                    Decimal(str(min_price_normalized)),
+                    base_currency_code,
+                    currency
+                )
+                min_price_display = float(converted_min) if converted_min is not None else min_price_normalized
+            else:
+                min_price_display = None
+
+            # Convert max price from base to user's currency
+            if max_price_normalized is not None:
+                converted_max = CurrencyService.convert_price(
+                    Decimal(str(max_price_normalized)),
+                    base_currency_code,
+                    currency
+                )
+                max_price_display = float(converted_max) if converted_max is not None else max_price_normalized
+            else:
+                max_price_display = None
+        else:
+            # Already in base currency (UZS)
+            min_price_display = min_price_normalized
+            max_price_display = max_price_normalized
+
+        facets["price_range"] = {
+            "min": min_price_display,
+            "max": max_price_display,
+            "currency": currency
+        }
+    if "attrs" in aggregations:
+        facets["attributes"] = {}
+        for attr_bucket in aggregations["attrs"]["attr_keys"]["buckets"]:
+            attr_key = attr_bucket["key"]
+            values = []
+            for val_bucket in attr_bucket["values"]["buckets"]:
+                values.append({"key": val_bucket["key"], "count": val_bucket["doc_count"]})
+            for val_bucket in attr_bucket["text_values"]["buckets"]:
+                values.append({"key": val_bucket["key"], "count": val_bucket["doc_count"]})
+            facets["attributes"][attr_key] = values
+    return facets
 
 
 class ListingSearchView(APIView):
@@ -120,9 +188,18 @@ class ListingSearchView(APIView):
         - location_slug: Filter by location slug
         - condition: Filter by condition (new/used)
         - user_id: Filter by user ID (for fetching user's listings)
-        - sort: Sort order (relevance/newest/price_asc/price_desc)
+        - sort: Sort order (relevance/newest/price_asc/price_desc/distance)
+        - lat, lon: Point for radius search and distance sort
+        - radius: Only listings within this many km of lat/lon (max 500)
         - page: Page number (default: 1)
         - per_page: Results per page (default: 20, max: 50)
+        - cursor: Opaque cursor for search_after paging; pass it empty for the
+          first page, then the returned next_cursor (ignores page)
+        - pit: With an empty cursor, pin the walk to a point-in-time snapshot
+        - facets: none, basic or full (default); full adds attribute facets
+          for the selected category
+        - view: full (default) returns the whole document; card returns only
+          the compact tile payload, enough to render a results page
 
     Examples:
         GET /api/search/?min_price=100&max_price=1000&currency=USD
@@ -145,9 +222,16 @@ class ListingSearchView(APIView):
             OpenApiParameter(name="location_slug", description="Filter by location slug", required=False, type=str),
             OpenApiParameter(name="condition", description="Filter by condition (new/used)", required=False, type=str),
             OpenApiParameter(name="user_id", description="Filter by user ID", required=False, type=int),
-            OpenApiParameter(name="sort", description="Sort order: relevance, newest, price_asc, price_desc", required=False, type=str),
+            OpenApiParameter(name="sort", description="Sort order: relevance, newest, price_asc, price_desc, distance (needs lat/lon)", required=False, type=str),
+            OpenApiParameter(name="lat", description="Latitude for radius search and distance sort", required=False, type=float),
+            OpenApiParameter(name="lon", description="Longitude for radius search and distance sort", required=False, type=float),
+            OpenApiParameter(name="radius", description="Radius in km around lat/lon (max 500)", required=False, type=float),
             OpenApiParameter(name="page", description="Page number (default: 1)", required=False, type=int),
             OpenApiParameter(name="per_page", description="Results per page (default: 20, max: 50)", required=False, type=int),
+            OpenApiParameter(name="cursor", description="Cursor paging: empty for the first page, then the returned next_cursor. Works past the 10k result window", required=False, type=str),
+            OpenApiParameter(name="pit", description="With an empty cursor, read all pages from one point-in-time snapshot", required=False, type=bool),
+            OpenApiParameter(name="facets", description="Facet level: none, basic (categories, locations, conditions, price range) or full (default; adds the selected category's attribute facets)", required=False, type=str),
+            OpenApiParameter(name="view", description="Result shape: full (default) or card (compact tile payload only)", required=False, type=str),
         ],
         examples=[
             OpenApiExample(
@@ -162,307 +246,218 @@ class ListingSearchView(APIView):
         if not client:
             return Response({"results": [], "total": 0, "note": "Search backend not configured"}, status=200)
 
-        # Quick connectivity guard to avoid noisy connection errors in dev
-        try:  # pragma: no cover
-            if not client.ping():
-                return Response({"results": [], "total": 0, "note": "Search backend unavailable (ping failed)"}, status=200)
-        except Exception:  # pragma: no cover
+        # Fail fast while the backend is known to be down instead of tying up
+        # the worker on a request that will time out
+        if get_breaker().is_open():
             return Response({"results": [], "total": 0, "note": "Search backend unavailable"}, status=200)
 
-        # Ensure index exists; ignore errors (still attempt a search)
+        # Ensure index exists (a no-op once it has succeeded in this process);
+        # connection problems surface from the search call below
         try:  # pragma: no cover
             ensure_index()
         except Exception:  # pragma: no cover
             pass
 
-        q = request.query_params.get("q")
-        sort = request.query_params.get("sort", "relevance")
-        page = int(request.query_params.get("page", 1))
-        per_page = int(request.query_params.get("per_page", 20))
-        per_page = max(1, min(per_page, 50))
-        from_ = (page - 1) * per_page
-        filters = _parse_filters(request.query_params)
-
-        must: List[Dict[str, Any]] = []
-        filter_clauses: List[Dict[str, Any]] = []
-
-        if q:
-            must.append(_build_text_query(q))
-
-        # Category filter: requires full path slug match; we accept single slug and filter on prefix
-        if slug := filters.get("category_slug"):
-            filter_clauses.append({"terms": {"category_path": [slug]}})
-
-        if lslug := filters.get("location_slug"):
-            filter_clauses.append({"terms": {"location_path": [lslug]}})
-
-        if cnd := filters.get("condition"):
-            filter_clauses.append({"term": {"condition": cnd}})
-
-        # User filter
-        if user_id := filters.get("user_id"):
-            filter_clauses.append({"term": {"user_id": str(user_id)}})
-
-        # Price filtering with currency conversion
-        min_price = filters.get("min_price")
-        max_price = filters.get("max_price")
-        currency = filters.get("currency", "UZS").upper()
-
-        if min_price or max_price:
-            from currency.services import CurrencyService
-            from decimal import Decimal
-
-            rng: Dict[str, Any] = {}
-
-            # Convert user's price range to normalized base currency (UZS) for filtering
-            # since price_normalized in index is always in base currency
-            if min_price:
-                min_price_decimal = Decimal(str(min_price))
-                # Convert from user's currency to base currency
-                converted_min = CurrencyService.normalize_price_to_base(min_price_decimal, currency)
-                if converted_min is not None:
-                    rng["gte"] = float(converted_min)
-                else:
-                    # Fallback: if conversion fails, use original value
-                    rng["gte"] = float(min_price)
-
-            if max_price:
-                max_price_decimal = Decimal(str(max_price))
-                # Convert from user's currency to base currency
-                converted_max = CurrencyService.normalize_price_to_base(max_price_decimal, currency)
-                if converted_max is not None:
-                    rng["lte"] = float(converted_max)
-                else:
-                    # Fallback: if conversion fails, use original value
-                    rng["lte"] = float(max_price)
-
-            # Use price_normalized field which stores prices in base currency
-            filter_clauses.append({"range": {"price_normalized": rng}})
-
-        # Attribute filters
-        for key, vals in filters.get("attrs", {}).items():
-            # For each value, create a should; if multiple values, OR them
-            shoulds_all: List[Dict[str, Any]] = []
-            for val in vals:
-                shoulds: List[Dict[str, Any]] = [
-                    {"term": {"attrs.value_option_key": str(val)}},
-                    {"term": {"attrs.value_text": str(val)}},
-                ]
-                vstr = str(val).lower()
-                if vstr in {"true", "false"}:
-                    shoulds.append({"term": {"attrs.value_bool": vstr == "true"}})
+        # Identical query shapes share one cached response until the TTL
+        # expires or the index changes (generation bump)
+        key = response_cache.cache_key(request.query_params)
+        payload = response_cache.get_or_compute(
+            key, lambda: self._search(client, request.query_params)
+        )
+        return Response(payload)
+
+    def _search(self, client, params) -> Tuple[Dict[str, Any], bool]:
+        """Run the query and return ``(payload, cacheable)``."""
+        plan = plan_search(params)
+        pit_id = plan["pit_id"]
+        if plan["wants_pit"]:
+            try:
+                pit_id = client.create_pit(
+                    index=index_name(), params={"keep_alive": PIT_KEEP_ALIVE}
+                ).get("pit_id")
+            except Exception:
+                # Fall back to a plain search_after walk without a snapshot
+                pit_id = None
+        try:
+            resp = client.search(
+                request_timeout=getattr(settings, "OPENSEARCH_SEARCH_TIMEOUT", 2),
+                **search_request(plan, pit_id),
+            )
+            # Drop hits whose listing is no longer active (index lag); checked
+            # against the shared availability bitmaps rather than the DB
+            from listings import availability
+            active = availability.active_ids(hit_listing_ids(resp))
+            payload, cacheable, release_pit = finish_search(plan, resp, active, pit_id)
+            if release_pit:
                 try:
-                    vnum = float(val)
-                    shoulds.append({"term": {"attrs.value_number": vnum}})
+                    client.delete_pit(body={"pit_id": [release_pit]})
                 except Exception:
                     pass
-                shoulds_all.append({
-                    "bool": {"must": [
-                        {"term": {"attrs.key": key}},
-                        {"bool": {"should": shoulds, "minimum_should_match": 1}},
-                    ]}
-                })
-            nested_query = {
-                "nested": {
-                    "path": "attrs",
-                    "query": {
-                        "bool": {"should": shoulds_all, "minimum_should_match": 1}
-                    },
-                }
-            }
-            filter_clauses.append(nested_query)
-
-        # Attribute numeric ranges
-        for rng_key, val in filters.get("attrs_range", {}).items():
-            # rng_key format: <attrkey>_min or <attrkey>_max
-            if rng_key.endswith("_min"):
-                attr_key = rng_key[:-4]
-                rng = {"gte": float(val)}
-            elif rng_key.endswith("_max"):
-                attr_key = rng_key[:-4]
-                rng = {"lte": float(val)}
-            else:
-                continue
-            nested_query = {
-                "nested": {
-                    "path": "attrs",
-                    "query": {
-                        "bool": {
-                            "must": [
-                                {"term": {"attrs.key": attr_key}},
-                                {"range": {"attrs.value_number": rng}},
-                            ]
-                        }
-                    },
-                }
-            }
-            filter_clauses.append(nested_query)
-
-        # Sorting: use price_normalized for consistent price sorting across currencies
-        sort_clause: List[Any] = []
-        if sort == "newest":
-            sort_clause = [{"refreshed_at": {"order": "desc"}}]
-        elif sort == "price_asc":
-            sort_clause = [{"price_normalized": {"order": "asc"}}]
-        elif sort == "price_desc":
-            sort_clause = [{"price_normalized": {"order": "desc"}}]
-
-        # Add aggregations for faceted search
-        aggs = {
-            "categories": {
-                "terms": {"field": "category_path", "size": 50}
-            },
-            "locations": {
-                "terms": {"field": "location_path", "size": 50}
-            },
-            "conditions": {
-                "terms": {"field": "condition", "size": 10}
-            },
-            "price_stats": {
-                "stats": {"field": "price"}
-            },
-            "attrs": {
-                "nested": {"path": "attrs"},
-                "aggs": {
-                    "attr_keys": {
-                        "terms": {"field": "attrs.key", "size": 20},
-                        "aggs": {
-                            "values": {
-                                "terms": {"field": "attrs.value_option_key", "size": 30}
-                            },
-                            "text_values": {
-                                "terms": {"field": "attrs.value_text", "size": 30}
-                            }
-                        }
-                    }
-                }
-            }
-        }
+            return payload, cacheable
+        except Exception as e:
+            return unavailable_payload(e), False
 
-        body: Dict[str, Any] = {
-            "from": from_,
-            "size": per_page,
-            "query": {"bool": {"must": must, "filter": filter_clauses}},
-            "aggs": aggs,
-        }
-        if sort_clause:
-            body["sort"] = sort_clause
 
-        try:
-            resp = client.search(index=index_name(), body=body)
-            hits = resp.get("hits", {}).get("hits", [])
-            total = resp.get("hits", {}).get("total", {}).get("value", 0)
-            aggregations = resp.get("aggregations", {})
-
-            # Verify listings exist in database to prevent stale data
-            from listings.models import Listing
-            listing_ids = [h.get("_id") for h in hits]
-            existing_ids = set(
-                str(id) for id in Listing.objects.filter(
-                    id__in=listing_ids,
-                    status=Listing.Status.ACTIVE
-                ).values_list('id', flat=True)
-            )
+def plan_search(params) -> Dict[str, Any]:
+    """Everything about a search request that doesn't need the backend.
 
-            results = [
-                {
-                    "id": h.get("_id"),
-                    "score": h.get("_score"),
-                    **h.get("_source", {}),
-                }
-                for h in hits
-                if h.get("_id") in existing_ids
-            ]
-
-            # Adjust total if we filtered out stale results
-            filtered_count = len(hits) - len(results)
-            if filtered_count > 0:
-                total = max(0, total - filtered_count)
-            
-            # Process aggregations for frontend
-            facets = {}
-            if "categories" in aggregations:
-                facets["categories"] = [
-                    {"key": b["key"], "count": b["doc_count"]}
-                    for b in aggregations["categories"]["buckets"]
-                ]
-            if "locations" in aggregations:
-                facets["locations"] = [
-                    {"key": b["key"], "count": b["doc_count"]}
-                    for b in aggregations["locations"]["buckets"]
-                ]
-            if "conditions" in aggregations:
-                facets["conditions"] = [
-                    {"key": b["key"], "count": b["doc_count"]}
-                    for b in aggregations["conditions"]["buckets"]
-                ]
-            if "price_stats" in aggregations:
-                from currency.services import CurrencyService
-                from decimal import Decimal
-
-                # Get price stats (in base currency)
-                min_price_normalized = aggregations["price_stats"]["min"]
-                max_price_normalized = aggregations["price_stats"]["max"]
-
-                # Convert to user's requested currency if specified
-                if currency != "UZS":
-                    # Get default currency to determine base currency
-                    default_currency = CurrencyService.get_default_currency()
-                    base_currency_code = default_currency.code if default_currency else "UZS"
-
-                    # Convert min price from base to user's currency
-                    if min_price_normalized is not None:
-                        converted_min = CurrencyService.convert_price(
-                            Decimal(str(min_price_normalized)),
-                            base_currency_code,
-                            currency
-                        )
-                        min__display = float(converted_min) if converted_min is not None else min_price_normalized
-                    else:
-                        min_price_display = None
-
-                    # Convert max price from base to user's currency
-                    if max_price_normalized is not None:
-                        converted_max = CurrencyService.convert_price(
-                            Decimal(str(max_price_normalized)),
-                            base_currency_code,
-                            currency
-                        )
-                        max_price_display = float(converted_max) if converted_max is not None else max_price_normalized
-                    else:
-                        max_price_display = None
-                else:
-                    # Already in base currency (UZS)
-                    min_price_display = min_price_normalized
-                    max_price_display = max_price_normalized
-
-                facets["price_range"] = {
-                    "min": min_price_display,
-                    "max": max_price_display,
-                    "currency": currency
-                }
-            if "attrs" in aggregations:
-                facets["attributes"] = {}
-                for attr_bucket in aggregations["attrs"]["attr_keys"]["buckets"]:
-                    attr_key = attr_bucket["key"]
-                    values = []
-                    for val_bucket in attr_bucket["values"]["buckets"]:
-                        values.append({"key": val_bucket["key"], "count": val_bucket["doc_count"]})
-                    for val_bucket in attr_bucket["text_values"]["buckets"]:
-                        values.append({"key": val_bucket["key"], "count": val_bucket["doc_count"]})
-                    facets["attributes"][attr_key] = values
-            
-            return Response({
-                "results": results,
-                "total": total,
-                "page": page,
-                "per_page": per_page,
-                "facets": facets,
-            })
-        except Exception as e:
-            # Return a graceful response rather than 500 in dev
-            return Response({
-                "results": [],
-                "total": 0,
-                "note": f"Search backend unavailable or index missing: {type(e).__name__}",
-            }, status=200)
+    Validates the parameters, compiles the query and reads the facet cache.
+    Shared by the sync and async views, which only differ in how they do
+    the I/O around it.
+    """
+    sort = params.get("sort", "relevance")
+    page = int(params.get("page", 1))
+    per_page = int(params.get("per_page", 20))
+    per_page = max(1, min(per_page, 50))
+    from_ = (page - 1) * per_page
+
+    # Cursor mode: search_after paging at constant cost past the result
+    # window; the cursor pins the sort and, optionally, a point in time
+    cursor_mode = "cursor" in params
+    cursor = _decode_cursor(params.get("cursor", "")) if cursor_mode else {}
+    sort = cursor.get("sort", sort)
+    wants_pit = cursor_mode and not cursor and params.get("pit", "").lower() in {"1", "true", "yes"}
+    bag = query_compiler.from_query_params(params, require_point=sort == "distance")
+    sort_clause = query_compiler.sort_clause(sort, bag["geo"])
+
+    # Facets depend only on the filter context, so they are cached apart
+    # from hits and the aggregations are skipped whenever that cache is warm
+    facet_level = (params.get("facets") or "full").strip().lower()
+    if facet_level not in FACET_LEVELS:
+        raise ValidationError({"facets": f"Expected one of: {', '.join(FACET_LEVELS)}."})
+    facets_key = response_cache.facets_cache_key(params) if facet_level != "none" else None
+    cached_facets = cache.get(facets_key) if facets_key else {}
+    aggs = _facet_aggs(facet_level, bag["category_slug"]) if cached_facets is None else {}
+
+    view = (params.get("view") or "full").strip().lower()
+    if view not in RESULT_VIEWS:
+        raise ValidationError({"view": f"Expected one of: {', '.join(RESULT_VIEWS)}."})
+
+    body: Dict[str, Any] = {
+        "from": from_,
+        "size": per_page,
+        "query": query_compiler.ranked_query(query_compiler.compile_query(bag), sort, bag["geo"]),
+    }
+    if view == "card":
+        body["_source"] = ["card"]
+    if aggs:
+        body["aggs"] = aggs
+    if sort_clause:
+        body["sort"] = sort_clause
+    if cursor_mode:
+        del body["from"]
+        # "id" breaks ties so every document has a unique sort position
+        body["sort"] = (sort_clause or ["_score"]) + [{"id": "asc"}]
+        if cursor:
+            body["search_after"] = cursor["after"]
+
+    return {
+        "body": body,
+        "sort": sort,
+        "page": page,
+        "per_page": per_page,
+        "currency": bag["currency"],
+        "cursor_mode": cursor_mode,
+        "pit_id": cursor.get("pit"),
+        "wants_pit": wants_pit,
+        "facets_key": facets_key,
+        "cached_facets": cached_facets,
+    }
+
+
+def search_request(plan: Dict[str, Any], pit_id: str | None) -> Dict[str, Any]:
+    """Keyword arguments for ``client.search`` for a plan."""
+    body = dict(plan["body"])
+    if not pit_id:
+        return {"index": index_name(), "body": body}
+    # Point-in-time searches address the PIT, not the index
+    body["pit"] = {"id": pit_id, "keep_alive": PIT_KEEP_ALIVE}
+    return {"body": body}
+
+
+def hit_listing_ids(resp: Dict[str, Any]) -> List[int]:
+    hits = resp.get("hits", {}).get("hits", [])
+    return [int(h["_id"]) for h in hits if str(h.get("_id", "")).isdigit()]
+
+
+def finish_search(
+    plan: Dict[str, Any], resp: Dict[str, Any], active_ids, pit_id: str | None
+) -> Tuple[Dict[str, Any], bool, str | None]:
+    """Shape a search response into ``(payload, cacheable, pit_to_release)``.
+
+    Hits whose listing is not in ``active_ids`` are dropped. The last item
+    is a point in time the caller should delete once a walk is exhausted.
+
+    The drop can't move into the query: only listings still active are
+    indexed, so these are documents whose removal is queued but not yet
+    written, which the index can't tell apart. Such a page comes back a
+    little short and ``total`` only discounts the hits dropped from it.
+    """
+    hits = resp.get("hits", {}).get("hits", [])
+    total = resp.get("hits", {}).get("total", {}).get("value", 0)
+    aggregations = resp.get("aggregations", {})
+    existing_ids = {str(i) for i in active_ids}
+
+    results = [
+        {
+            "id": h.get("_id"),
+            "score": h.get("_score"),
+            **h.get("_source", {}),
+        }
+        for h in hits
+        if h.get("_id") in existing_ids
+    ]
+    if plan["sort"] == "distance":
+        # The first sort value is the distance from the requested point
+        distances = {h.get("_id"): (h.get("sort") or [None])[0] for h in hits}
+        for result in results:
+            result["distance_km"] = distances.get(result["id"])
+
+    # Adjust total for the stale hits seen on this page (others stay counted
+    # until their removal reaches the index)
+    filtered_count = len(hits) - len(results)
+    if filtered_count > 0:
+        total = max(0, total - filtered_count)
+
+    if plan["cached_facets"] is None:
+        facets = _format_facets(aggregations, plan["currency"])
+        cache.set(plan["facets_key"], facets, int(getattr(settings, "SEARCH_FACET_CACHE_TTL", 300)))
+    else:
+        facets = plan["cached_facets"]
+
+    per_page = plan["per_page"]
+    if plan["cursor_mode"]:
+        pit_id = resp.get("pit_id", pit_id)
+        next_cursor = None
+        release_pit = None
+        if len(hits) == per_page and hits[-1].get("sort"):
+            state: Dict[str, Any] = {"after": hits[-1]["sort"], "sort": plan["sort"]}
+            if pit_id:
+                state["pit"] = pit_id
+            next_cursor = _encode_cursor(state)
+        elif pit_id:
+            release_pit = pit_id
+        return {
+            "results": results,
+            "total": total,
+            "per_page": per_page,
+            "next_cursor": next_cursor,
+            "facets": facets,
+        }, not pit_id, release_pit
+
+    return {
+        "results": results,
+        "total": total,
+        "page": plan["page"],
+        "per_page": per_page,
+        "facets": facets,
+    }, True, None
+
+
+def unavailable_payload(exc: Exception) -> Dict[str, Any]:
+    # Return a graceful response rather than 500 in dev
+    return {
+        "results": [],
+        "total": 0,
+        "note": f"Search backend unavailable or index missing: {type(exc).__name__}",
+    }
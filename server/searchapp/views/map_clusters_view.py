@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Tuple
+
+from django.conf import settings
+from drf_spectacular.utils import OpenApiExample, OpenApiParameter, extend_schema
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from . import query_compiler, response_cache
+from .circuit_breaker import get_breaker
+from .index import index_name
+from .opensearch_client import get_client
+
+# Cells are this many zoom levels finer than the map tiles, i.e. about 64px
+# on a 256px tile, which keeps markers from overlapping
+PRECISION_OFFSET = 2
+MAX_PRECISION = 22
+MAX_CLUSTERS = 1000
+
+
+def _parse_bbox(raw: str | None) -> Tuple[float, float, float, float]:
+    """Parse ``west,south,east,north`` (GeoJSON order)."""
+    try:
+        west, south, east, north = (float(v) for v in (raw or "").split(","))
+    except ValueError:
+        raise ValidationError({"bbox": "Expected west,south,east,north."})
+    if not (-180 <= west <= 180 and -180 <= east <= 180 and -90 <= south < north <= 90):
+        raise ValidationError({"bbox": "Coordinates out of range."})
+    return west, south, east, north
+
+
+class MapClustersView(APIView):
+    """
+    Listing counts per map cell for a viewport.
+
+    Accepts the same filters as ``/search/listings`` and returns geotile grid
+    buckets with their centroids, so a map screen is one small response
+    instead of pages of listing documents.
+
+    Query Parameters:
+        - bbox: Viewport as west,south,east,north
+        - zoom: Map zoom level (0-20)
+        - q, category_slug, location_slug, condition, min_price, max_price,
+          currency, user_id, attrs.*: Same as /search/listings
+    """
+    authentication_classes: list = []
+    permission_classes: list = []
+
+    @extend_schema(
+        tags=["search"],
+        summary="Cluster listings on a map",
+        description="Return geotile buckets (count and centroid) for listings inside a viewport, with the /search/listings filters applied.",
+        parameters=[
+            OpenApiParameter(name="bbox", description="Viewport: west,south,east,north", required=True, type=str),
+            OpenApiParameter(name="zoom", description="Map zoom level (0-20)", required=True, type=int),
+            OpenApiParameter(name="q", description="Search query text", required=False, type=str),
+            OpenApiParameter(name="category_slug", description="Filter by category slug", required=False, type=str),
+            OpenApiParameter(name="location_slug", description="Filter by location slug", required=False, type=str),
+        ],
+        examples=[
+            OpenApiExample(
+                "Success",
+                value={"success": True, "data": {"total": 42, "clusters": [{"key": "12/2762/1512", "count": 40, "lat": 41.31, "lon": 69.27}]}, "error": None, "code": 200},
+                response_only=True,
+            ),
+        ],
+    )
+    def get(self, request):
+        params = request.query_params
+        bbox = _parse_bbox(params.get("bbox"))
+        try:
+            zoom = int(params.get("zoom", ""))
+        except ValueError:
+            raise ValidationError({"zoom": "Must be an integer."})
+        precision = max(0, min(zoom + PRECISION_OFFSET, MAX_PRECISION))
+
+        client = get_client()
+        if not client:
+            return Response({"total": 0, "clusters": [], "note": "Search backend not configured"}, status=200)
+        if get_breaker().is_open():
+            return Response({"total": 0, "clusters": [], "note": "Search backend unavailable"}, status=200)
+
+        key = response_cache.cache_key(params, namespace="clusters", extra={"bbox": bbox, "precision": precision})
+        payload = response_cache.get_or_compute(key, lambda: self._clusters(client, params, bbox, precision))
+        return Response(payload)
+
+    def _clusters(self, client, params, bbox, precision: int) -> Tuple[Dict[str, Any], bool]:
+        west, south, east, north = bbox
+        query = query_compiler.compile_query(query_compiler.from_query_params(params))
+        query["bool"]["filter"].append(
+            {
+                "geo_bounding_box": {
+                    "geo": {
+                        "top_left": {"lat": north, "lon": west},
+                        "bottom_right": {"lat": south, "lon": east},
+                    }
+                }
+            }
+        )
+        body = {
+            "size": 0,
+            "query": query,
+            "aggs": {
+                "cells": {
+                    "geotile_grid": {"field": "geo", "precision": precision, "size": MAX_CLUSTERS},
+                    "aggs": {"centroid": {"geo_centroid": {"field": "geo"}}},
+                }
+            },
+        }
+        try:
+            resp = client.search(
+                index=index_name(),
+                body=body,
+                request_timeout=getattr(settings, "OPENSEARCH_SEARCH_TIMEOUT", 2),
+            )
+        except Exception:
+            return {"total": 0, "clusters": [], "note": "Search temporarily unavailable"}, False
+
+        clusters: List[Dict[str, Any]] = []
+        for bucket in resp.get("aggregations", {}).get("cells", {}).get("buckets", []):
+            location = bucket.get("centroid", {}).get("location") or {}
+            clusters.append(
+                {
+                    "key": bucket["key"],
+                    "count": bucket["doc_count"],
+                    "lat": location.get("lat"),
+                    "lon": location.get("lon"),
+                }
+            )
+        total = resp.get("hits", {}).get("total", {}).get("value", 0)
+        return {"total": total, "clusters": clusters}, True
@@ -1,23 +1,58 @@
 from __future__ import annotations
 
+import asyncio
 import os
+import threading
+import weakref
 from typing import Optional
 from urllib.parse import urlparse, unquote
 
 from django.conf import settings
 
+from .circuit_breaker import AsyncCircuitBreakerTransport, CircuitBreakerTransport
+
 try:
     from opensearchpy import OpenSearch
 except Exception:  # pragma: no cover - library may be missing in some envs
     OpenSearch = None  # type: ignore
 
+try:
+    from opensearchpy import AsyncOpenSearch
+except Exception:  # pragma: no cover - needs aiohttp
+    AsyncOpenSearch = None  # type: ignore
 
-def get_client() -> Optional["OpenSearch"]:
-    if OpenSearch is None:
-        return None
+_client: Optional["OpenSearch"] = None
+_client_pid: Optional[int] = None
+_client_lock = threading.Lock()
+# One async client per event loop: its aiohttp session is bound to the loop
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOpenSearch]" = weakref.WeakKeyDictionary()
+
+
+def _client_options() -> dict:
+    return {
+        "timeout": float(getattr(settings, "OPENSEARCH_TIMEOUT", 10)),
+        "max_retries": int(getattr(settings, "OPENSEARCH_MAX_RETRIES", 1)),
+        "retry_on_timeout": False,
+        "pool_maxsize": int(getattr(settings, "OPENSEARCH_POOL_MAXSIZE", 10)),
+        "http_compress": bool(getattr(settings, "OPENSEARCH_HTTP_COMPRESS", False)),
+        "transport_class": CircuitBreakerTransport,
+    }
+
+
+def _async_client_options() -> dict:
+    options = _client_options()
+    # aiohttp names the per-host connection limit ``maxsize``
+    options["maxsize"] = options.pop("pool_maxsize")
+    options["transport_class"] = AsyncCircuitBreakerTransport
+    return options
+
+
+def _build_client(client_class=None, options: Optional[dict] = None):
+    client_class = client_class or OpenSearch
     url = getattr(settings, "OPENSEARCH_URL", os.environ.get("OPENSEARCH_URL"))
     if not url:
         return None
+    options = options or _client_options()
     try:
         parsed = urlparse(url)
         host = parsed.hostname or "localhost"
@@ -30,14 +65,68 @@ def get_client() -> Optional["OpenSearch"]:
                 unquote(parsed.password or ""),
             )
         verify_env = os.environ.get("OPENSEARCH_VERIFY_CERTS", "false").lower() in {"1", "true", "yes"}
-        client = OpenSearch(
+        client = client_class(
             hosts=[{"host": host, "port": port, "scheme": scheme}],
             http_auth=http_auth,
             use_ssl=(scheme == "https"),
             verify_certs=verify_env,
             ssl_show_warn=False,
+            **options,
         )
         return client
     except Exception:
         # fall back to simple constructor; let caller handle ping
-        return OpenSearch(hosts=[url])
+        return client_class(hosts=[url], **options)
+
+
+def get_client() -> Optional["OpenSearch"]:
+    """Return the process-wide OpenSearch client, creating it on first use.
+
+    The client is thread-safe and keeps a keep-alive connection pool, so it is
+    shared by all requests and tasks in the process. A forked child (gunicorn
+    or Celery prefork worker) builds its own instead of reusing the parent's
+    sockets.
+    """
+    global _client, _client_pid
+    if OpenSearch is None:
+        return None
+    pid = os.getpid()
+    if _client is not None and _client_pid == pid:
+        return _client
+    with _client_lock:
+        if _client is None or _client_pid != pid:
+            _client = _build_client()
+            _client_pid = pid
+    return _client
+
+
+def get_async_client(shared: bool = True) -> Optional["AsyncOpenSearch"]:
+    """Return the ``AsyncOpenSearch`` client of the running event loop.
+
+    Same connection settings and circuit breaker as ``get_client()``. Must
+    be called from a coroutine; under ASGI each worker runs one loop, so
+    this is one client (and one aiohttp pool) per worker. With ``shared``
+    off a new client is returned and the caller must ``close()`` it: under
+    WSGI every request runs on a fresh loop, and a client cached for it
+    would keep its aiohttp session open forever.
+    """
+    if AsyncOpenSearch is None:
+        return None
+    if not shared:
+        return _build_client(AsyncOpenSearch, _async_client_options())
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _build_client(AsyncOpenSearch, _async_client_options())
+        if client is not None:
+            _async_clients[loop] = client
+    return client
+
+
+def reset_client() -> None:
+    """Drop the cached clients so the next ``get_client()`` rebuilds them from settings."""
+    global _client, _client_pid
+    with _client_lock:
+        _client = None
+        _client_pid = None
+        _async_clients.clear()
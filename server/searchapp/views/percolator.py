@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import copy
+import logging
+from typing import Any, Dict, List
+
+from .index import _index_prefix, mapping_body
+from .opensearch_client import get_client
+
+logger = logging.getLogger(__name__)
+
+# Saved searches fetched per percolate request; larger match sets are paged
+PERCOLATE_PAGE_SIZE = 1000
+
+_percolator_ready = False
+
+
+def percolator_index_name() -> str:
+    """Index holding one percolator query per instant saved search."""
+    return f"{_index_prefix()}_saved_searches"
+
+
+def percolator_mapping() -> Dict[str, Any]:
+    """The listing mapping plus the stored query.
+
+    Percolator queries are parsed against this mapping, so it carries every
+    listing field (and analyzer) the search queries refer to.
+    """
+    body = copy.deepcopy(mapping_body())
+    body["mappings"]["properties"].update(
+        {
+            "query": {"type": "percolator"},
+            "saved_search_id": {"type": "keyword"},
+            "owner_id": {"type": "keyword"},
+        }
+    )
+    return body
+
+
+def ensure_percolator_index(force: bool = False) -> None:
+    """Create the percolator index, or bring its mapping up to the listing mapping.
+
+    Listing fields added since the index was created are put into its
+    mapping, so queries and documents that use them percolate. Changes to
+    existing fields or analyzers can't be applied in place and are logged;
+    they need ``savedsearches_sync_percolator --recreate``.
+    """
+    global _percolator_ready
+    if _percolator_ready and not force:
+        return
+    client = get_client()
+    if not client:
+        return
+    idx = percolator_index_name()
+    body = percolator_mapping()
+    if not client.indices.exists(index=idx):  # type: ignore[attr-defined]
+        client.indices.create(index=idx, body=body)  # type: ignore[attr-defined]
+    else:
+        try:
+            client.indices.put_mapping(index=idx, body=body["mappings"])  # type: ignore[attr-defined]
+        except Exception as e:
+            logger.error(
+                "Percolator mapping of %s is out of date (%s); run savedsearches_sync_percolator --recreate.",
+                idx, e,
+            )
+    _percolator_ready = True
+
+
+def register_query(saved_search_id: int, owner_id: int, query: Dict[str, Any]) -> None:
+    client = get_client()
+    if not client:
+        return
+    ensure_percolator_index()
+    client.index(
+        index=percolator_index_name(),
+        id=str(saved_search_id),
+        body={"query": query, "saved_search_id": str(saved_search_id), "owner_id": str(owner_id)},
+    )
+
+
+def unregister_query(saved_search_id: int) -> None:
+    client = get_client()
+    if not client:
+        return
+    try:
+        client.delete(index=percolator_index_name(), id=str(saved_search_id))
+    except Exception:
+        pass
+
+
+def percolate(documents: Dict[int, Dict[str, Any]]) -> Dict[int, List[int]]:
+    """Match listing documents against every registered saved search at once.
+
+    Returns ``{saved_search_id: [listing_id, ...]}`` for every matching
+    search, paged ``PERCOLATE_PAGE_SIZE`` at a time. A saved search never
+    matches its owner's own listings.
+    """
+    client = get_client()
+    if not client or not documents:
+        return {}
+    ensure_percolator_index()
+    listing_ids = list(documents)
+    body: Dict[str, Any] = {
+        "size": PERCOLATE_PAGE_SIZE,
+        "_source": ["saved_search_id", "owner_id"],
+        "query": {
+            "percolate": {
+                "field": "query",
+                "documents": [documents[i] for i in listing_ids],
+            }
+        },
+        # A total order, so search_after pages through every matching search
+        "sort": [{"saved_search_id": "asc"}],
+    }
+    matches: Dict[int, List[int]] = {}
+    while True:
+        hits = client.search(index=percolator_index_name(), body=body).get("hits", {}).get("hits", [])
+        for hit in hits:
+            source = hit.get("_source", {})
+            # With several documents, the slots say which of them the query matched
+            slots = hit.get("fields", {}).get("_percolator_document_slot", [0])
+            matched = [
+                listing_ids[slot]
+                for slot in slots
+                if documents[listing_ids[slot]].get("user_id") != source.get("owner_id")
+            ]
+            if matched:
+                matches[int(source["saved_search_id"])] = matched
+        if len(hits) < PERCOLATE_PAGE_SIZE:
+            return matches
+        body["search_after"] = hits[-1]["sort"]
@@ -0,0 +1,469 @@
+"""Compile search parameters into OpenSearch queries.
+
+Every query against the listing index (``/search/listings``, map clusters,
+saved-search counts, "run now" and percolator alerts) goes through here:
+callers turn their input into a normalized parameter bag with
+``from_query_params`` or ``from_saved_search`` and compile it with
+``compile_query`` / ``compile_body``.
+"""
+from __future__ import annotations
+
+import copy
+import json
+import re
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from rest_framework.exceptions import ValidationError
+
+MAX_RADIUS_KM = 500.0
+# Compiled queries kept per process, keyed by parameter fingerprint
+COMPILE_CACHE_SIZE = 1024
+
+# (lat, lon, radius_km or None)
+GeoParams = Tuple[float, float, Optional[float]]
+
+_SCALAR_FILTERS = ("category_slug", "location_slug", "min_price", "max_price", "condition", "currency", "user_id")
+
+
+def empty_params() -> Dict[str, Any]:
+    return {
+        "q": "",
+        "category_slug": "",
+        "location_slug": "",
+        "condition": "",
+        "user_id": "",
+        "currency": "UZS",
+        "min_price": "",
+        "max_price": "",
+        "attrs": {},
+        "attrs_range": {},
+        "geo": None,
+        "created_after": None,
+        "status": None,
+    }
+
+
+def _normalized(bag: Dict[str, Any]) -> Dict[str, Any]:
+    bag["q"] = re.sub(r"\s+", " ", bag["q"] or "").strip()
+    bag["currency"] = (bag["currency"] or "UZS").upper()
+    bag["attrs"] = {k: sorted({str(v) for v in vals}) for k, vals in sorted(bag["attrs"].items()) if vals}
+    bag["attrs_range"] = {k: str(v) for k, v in sorted(bag["attrs_range"].items())}
+    return bag
+
+
+def from_query_params(params, require_point: bool = False) -> Dict[str, Any]:
+    """Parameter bag from request query params; invalid geo input raises a 400."""
+    bag = empty_params()
+    bag.update(_parse_filters(params))
+    bag["q"] = params.get("q") or ""
+    geo = _parse_geo(params, require_point=require_point)
+    bag["geo"] = list(geo) if geo else None
+    return _normalized(bag)
+
+
+def from_saved_search(query: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Parameter bag from a stored ``SavedSearch.query``.
+
+    Accepts both ``{"params": {...}}`` and a flat bag, the ``price_min`` /
+    ``price_max`` aliases, and ``attrs`` as a dict of values or lists.
+    """
+    query = query or {}
+    params = query.get("params", query)
+    bag = empty_params()
+    bag["q"] = str(params.get("q") or "")
+    for key in _SCALAR_FILTERS:
+        if params.get(key) not in (None, ""):
+            bag[key] = str(params[key])
+    for key, alias in (("min_price", "price_min"), ("max_price", "price_max")):
+        if not bag[key] and params.get(alias) not in (None, ""):
+            bag[key] = str(params[alias])
+    attrs = params.get("attrs")
+    if isinstance(attrs, dict):
+        for attr_key, values in attrs.items():
+            if attr_key.endswith("_min") or attr_key.endswith("_max"):
+                bag["attrs_range"][attr_key] = values
+            else:
+                bag["attrs"][attr_key] = values if isinstance(values, list) else [values]
+    try:
+        lat, lon = float(params["lat"]), float(params["lon"])
+        radius = float(params["radius"]) if params.get("radius") not in (None, "") else None
+        bag["geo"] = [lat, lon, radius]
+    except (KeyError, TypeError, ValueError):
+        pass
+    return _normalized(bag)
+
+
+def fingerprint(bag: Dict[str, Any]) -> str:
+    """Stable key for a bag. Price bounds are compiled with the current exchange
+    rate, so the rate is part of the key and a rate change yields a new entry."""
+    key: Dict[str, Any] = {"params": bag}
+    if bag.get("min_price") or bag.get("max_price"):
+        from currency.services import CurrencyService
+
+        key["rate"] = str(CurrencyService.normalize_price_to_base(Decimal("1"), bag["currency"]))
+    return json.dumps(key, sort_keys=True, separators=(",", ":"), default=str)
+
+
+@lru_cache(maxsize=COMPILE_CACHE_SIZE)
+def _compile_fingerprint(key: str) -> Dict[str, Any]:
+    return _compile(json.loads(key)["params"])
+
+
+def compile_query(bag: Dict[str, Any]) -> Dict[str, Any]:
+    """The bool query for a bag, memoized per fingerprint. Callers get a copy they may modify."""
+    return copy.deepcopy(_compile_fingerprint(fingerprint(bag)))
+
+
+def sort_clause(sort: str, geo: Optional[GeoParams] = None) -> List[Any]:
+    """Sort for a named order; relevance (the default) sorts by score."""
+    # price_normalized keeps price sorting consistent across currencies
+    if sort == "newest":
+        return [{"refreshed_at": {"order": "desc"}}]
+    if sort == "price_asc":
+        return [{"price_normalized": {"order": "asc"}}]
+    if sort == "price_desc":
+        return [{"price_normalized": {"order": "desc"}}]
+    if sort == "distance" and geo:
+        return [{"_geo_distance": {"geo": {"lat": geo[0], "lon": geo[1]}, "order": "asc", "unit": "km"}}]
+    return []
+
+
+def ranking_functions() -> List[Dict[str, Any]]:
+    """``function_score`` functions for relevance ranking, weighted from settings.
+
+    Freshness decays with the age of ``refreshed_at``; quality and the log of
+    favorites and views add to it. Signals weighted 0 are left out.
+    """
+    weighted = [
+        ("SEARCH_RANKING_BASE_WEIGHT", 1.0, {}),
+        (
+            "SEARCH_RANKING_FRESHNESS_WEIGHT",
+            1.0,
+            {
+                "gauss": {
+                    "refreshed_at": {
+                        "origin": "now",
+                        "scale": getattr(settings, "SEARCH_RANKING_FRESHNESS_SCALE", "14d"),
+                        "decay": 0.5,
+                    }
+                }
+            },
+        ),
+        ("SEARCH_RANKING_QUALITY_WEIGHT", 1.0, {"field_value_factor": {"field": "quality_score", "missing": 0}}),
+        (
+            "SEARCH_RANKING_FAVORITES_WEIGHT",
+            0.5,
+            {"field_value_factor": {"field": "favorite_count", "modifier": "log1p", "missing": 0}},
+        ),
+        (
+            "SEARCH_RANKING_VIEWS_WEIGHT",
+            0.1,
+            {"field_value_factor": {"field": "view_count", "modifier": "log1p", "missing": 0}},
+        ),
+    ]
+    functions = []
+    for setting, default, function in weighted:
+        weight = float(getattr(settings, setting, default))
+        if weight:
+            functions.append({**function, "weight": weight})
+    return functions
+
+
+def ranked_query(query: Dict[str, Any], sort: str = "relevance", geo: Optional[GeoParams] = None) -> Dict[str, Any]:
+    """Wrap ``query`` in the ranking stage when results are ordered by score.
+
+    The text score is multiplied by the sum of the ranking functions. A query
+    of filters alone scores 0, which would zero every signal, so without text
+    clauses (an empty ``q``) the sum replaces the score instead.
+    """
+    functions = ranking_functions()
+    if sort_clause(sort, geo) or not functions:
+        return query
+    scored = bool(query.get("bool", {}).get("must")) if "bool" in query else True
+    return {
+        "function_score": {
+            "query": query,
+            "functions": functions,
+            "score_mode": "sum",
+            "boost_mode": "multiply" if scored else "replace",
+        }
+    }
+
+
+def compile_body(bag: Dict[str, Any], size: int = 20, sort: str = "relevance", **extra: Any) -> Dict[str, Any]:
+    """A complete search body: query, size and sort, plus any ``extra`` keys.
+
+    Bodies that return hits are ranked (see ``ranked_query``); counts are not.
+    """
+    query = compile_query(bag)
+    if size:
+        query = ranked_query(query, sort, bag.get("geo"))
+    body: Dict[str, Any] = {"query": query, "size": size, **extra}
+    if clause := sort_clause(sort, bag.get("geo")):
+        body["sort"] = clause
+    return body
+
+
+def _parse_filters(params) -> Dict[str, Any]:
+    filters: Dict[str, Any] = {}
+    # Handle repeated keys and comma-separated values
+    for k, values in params.lists():
+        if k.startswith("attrs."):
+            key = k.split(".", 1)[1]
+            # Support range suffixes _min/_max
+            if key.endswith("_min") or key.endswith("_max"):
+                filters.setdefault("attrs_range", {})[key] = values[-1]
+            else:
+                vals: List[str] = []
+                for v in values:
+                    if "," in v:
+                        vals.extend([s for s in v.split(",") if s])
+                    else:
+                        vals.append(v)
+                filters.setdefault("attrs", {})[key] = vals
+        elif k in {"category_slug", "location_slug", "min_price", "max_price", "condition", "currency", "user_id"}:
+            filters[k] = values[-1]
+    return filters
+
+
+def _parse_float(params, name: str, low: float, high: float) -> Optional[float]:
+    raw = params.get(name)
+    if raw in (None, ""):
+        return None
+    try:
+        value = float(raw)
+    except ValueError:
+        raise ValidationError({name: "Must be a number."})
+    if not low <= value <= high:
+        raise ValidationError({name: f"Must be between {low:g} and {high:g}."})
+    return value
+
+
+def _parse_geo(params, require_point: bool = False) -> Optional[GeoParams]:
+    """Parse ``lat``/``lon``/``radius`` (km). ``radius`` needs a point."""
+    lat = _parse_float(params, "lat", -90, 90)
+    lon = _parse_float(params, "lon", -180, 180)
+    radius = _parse_float(params, "radius", 0.1, MAX_RADIUS_KM)
+    if (lat is None) != (lon is None):
+        raise ValidationError({"lat": "lat and lon must be given together."})
+    if lat is None:
+        if radius is not None or require_point:
+            raise ValidationError({"lat": "lat and lon are required for radius search and distance sort."})
+        return None
+    return lat, lon, radius  # type: ignore[return-value]
+
+
+def build_text_query(query: str) -> Dict[str, Any]:
+    """Per-token full-text, phrase-prefix, fuzzy and trigram substring matching."""
+    tokens = [token.strip() for token in re.split(r"\s+", query) if token.strip()]
+    if not tokens:
+        return {"match_all": {}}
+
+    must_clauses: List[Dict[str, Any]] = []
+    for token in tokens:
+        normalized = _normalize_query_token(token)
+        token_shoulds: List[Dict[str, Any]] = [
+            {
+                "multi_match": {
+                    "query": token,
+                    "fields": ["title^5", "description^2"],
+                    "type": "best_fields",
+                }
+            },
+            {
+                "multi_match": {
+                    "query": token,
+                    "fields": ["title^6", "description^2"],
+                    "type": "phrase_prefix",
+                }
+            },
+            {
+                "multi_match": {
+                    "query": token,
+                    "fields": ["title^4", "description"],
+                    "type": "best_fields",
+                    "fuzziness": "AUTO",
+                }
+            },
+        ]
+
+        if len(normalized) >= 3:
+            # Substring match via the trigram subfields: every trigram of the
+            # token must be present, which approximates *token* without a
+            # leading-wildcard scan of the term dictionary
+            token_shoulds.extend(
+                [
+                    {
+                        "match": {
+                            "title.ngram": {
+                                "query": normalized,
+                                "operator": "and",
+                                "boost": 2.5,
+                            }
+                        }
+                    },
+                    {
+                        "match": {
+                            "description.ngram": {
+                                "query": normalized,
+                                "operator": "and",
+                                "boost": 1.0,
+                            }
+                        }
+                    },
+                ]
+            )
+
+        must_clauses.append(
+            {
+                "bool": {
+                    "should": token_shoulds,
+                    "minimum_should_match": 1,
+                }
+            }
+        )
+
+    return {"bool": {"must": must_clauses}}
+
+
+def _compile(filters: Dict[str, Any]) -> Dict[str, Any]:
+    """Translate a parameter bag into a bool query."""
+    q = filters.get("q")
+    geo = filters.get("geo")
+    must: List[Dict[str, Any]] = []
+    filter_clauses: List[Dict[str, Any]] = []
+
+    if q:
+        must.append(build_text_query(q))
+
+    # Category filter: requires full path slug match; we accept single slug and filter on prefix
+    if slug := filters.get("category_slug"):
+        filter_clauses.append({"terms": {"category_path": [slug]}})
+
+    if lslug := filters.get("location_slug"):
+        filter_clauses.append({"terms": {"location_path": [lslug]}})
+
+    if cnd := filters.get("condition"):
+        filter_clauses.append({"term": {"condition": cnd}})
+
+    # User filter
+    if user_id := filters.get("user_id"):
+        filter_clauses.append({"term": {"user_id": str(user_id)}})
+
+    # Price filtering with currency conversion
+    min_price = filters.get("min_price")
+    max_price = filters.get("max_price")
+    currency = filters.get("currency") or "UZS"
+
+    if min_price or max_price:
+        from currency.services import CurrencyService
+        from decimal import Decimal
+
+        rng: Dict[str, Any] = {}
+
+        # Convert user's price range to normalized base currency (UZS) for filtering
+        # since price_normalized in index is always in base currency
+        if min_price:
+            min_price_decimal = Decimal(str(min_price))
+            # Convert from user's currency to base currency
+            converted_min = CurrencyService.normalize_price_to_base(min_price_decimal, currency)
+            if converted_min is not None:
+                rng["gte"] = float(converted_min)
+            else:
+                # Fallback: if conversion fails, use original value
+                rng["gte"] = float(min_price)
+
+        if max_price:
+            max_price_decimal = Decimal(str(max_price))
+            # Convert from user's currency to base currency
+            converted_max = CurrencyService.normalize_price_to_base(max_price_decimal, currency)
+            if converted_max is not None:
+                rng["lte"] = float(converted_max)
+            else:
+                # Fallback: if conversion fails, use original value
+                rng["lte"] = float(max_price)
+
+        # Use price_normalized field which stores prices in base currency
+        filter_clauses.append({"range": {"price_normalized": rng}})
+
+    # Attribute filters
+    for key, vals in filters.get("attrs", {}).items():
+        # For each value, create a should; if multiple values, OR them
+        shoulds_all: List[Dict[str, Any]] = []
+        for val in vals:
+            shoulds: List[Dict[str, Any]] = [
+                {"term": {"attrs.value_option_key": str(val)}},
+                {"term": {"attrs.value_text": str(val)}},
+            ]
+            vstr = str(val).lower()
+            if vstr in {"true", "false"}:
+                shoulds.append({"term": {"attrs.value_bool": vstr == "true"}})
+            try:
+                vnum = float(val)
+                shoulds.append({"term": {"attrs.value_number": vnum}})
+            except Exception:
+                pass
+            shoulds_all.append({
+                "bool": {"must": [
+                    {"term": {"attrs.key": key}},
+                    {"bool": {"should": shoulds, "minimum_should_match": 1}},
+                ]}
+            })
+        nested_query = {
+            "nested": {
+                "path": "attrs",
+                "query": {
+                    "bool": {"should": shoulds_all, "minimum_should_match": 1}
+                },
+            }
+        }
+        filter_clauses.append(nested_query)
+
+    # Attribute numeric ranges
+    for rng_key, val in filters.get("attrs_range", {}).items():
+        # rng_key format: <attrkey>_min or <attrkey>_max
+        if rng_key.endswith("_min"):
+            attr_key = rng_key[:-4]
+            rng = {"gte": float(val)}
+        elif rng_key.endswith("_max"):
+            attr_key = rng_key[:-4]
+            rng = {"lte": float(val)}
+        else:
+            continue
+        nested_query = {
+            "nested": {
+                "path": "attrs",
+                "query": {
+                    "bool": {
+                        "must": [
+                            {"term": {"attrs.key": attr_key}},
+                            {"range": {"attrs.value_number": rng}},
+                        ]
+                    }
+                },
+            }
+        }
+        filter_clauses.append(nested_query)
+
+    if geo and geo[2] is not None:
+        filter_clauses.append(
+            {"geo_distance": {"distance": f"{geo[2]}km", "geo": {"lat": geo[0], "lon": geo[1]}}}
+        )
+
+    # Saved-search bookkeeping: only listings posted after a point in time
+    if created_after := filters.get("created_after"):
+        filter_clauses.append({"range": {"created_at": {"gt": created_after}}})
+
+    if status := filters.get("status"):
+        filter_clauses.append({"term": {"status": status}})
+
+    return {"bool": {"must": must, "filter": filter_clauses}}
+
+
+def _normalize_query_token(token: str) -> str:
+    cleaned = token.strip().lower()
+    cleaned = cleaned.replace("*", "").replace("?", "")
+    return cleaned
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+from collections import Counter
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from listings.models import Listing
+
+from .index import DEFAULT_BULK_CHUNK_SIZE, bulk_delete_listings, bulk_index_listings, index_name
+from .opensearch_client import get_client
+
+# Snapshot lifetime between two pages of the index walk
+PIT_KEEP_ALIVE = "5m"
+
+DELETE = "delete"
+INDEX = "index"
+
+# (listing id, refreshed_at in epoch milliseconds)
+Version = Tuple[int, Optional[int]]
+
+
+def epoch_millis(value: Optional[datetime]) -> Optional[int]:
+    """Millisecond timestamp, truncated the way OpenSearch stores ``date`` fields."""
+    if value is None:
+        return None
+    return int(value.timestamp()) * 1000 + value.microsecond // 1000
+
+
+def iter_index_versions(client, page_size: int = DEFAULT_BULK_CHUNK_SIZE) -> Iterator[Version]:
+    """Stream every indexed listing id with its ``refreshed_at``, ascending by id.
+
+    Pages are read with ``search_after`` from a point-in-time snapshot, so
+    deletes issued while walking don't shift the pages.
+    """
+    pit_id = client.create_pit(index=index_name(), params={"keep_alive": PIT_KEEP_ALIVE})["pit_id"]
+    try:
+        after = None
+        last_id = 0
+        while True:
+            body = {
+                "size": page_size,
+                "_source": False,
+                "query": {"match_all": {}},
+                "docvalue_fields": [{"field": "refreshed_at", "format": "epoch_millis"}],
+                "sort": [{"listing_id": "asc"}],
+                "pit": {"id": pit_id, "keep_alive": PIT_KEEP_ALIVE},
+            }
+            if after is not None:
+                body["search_after"] = after
+            resp = client.search(body=body)
+            pit_id = resp.get("pit_id", pit_id)
+            hits = resp.get("hits", {}).get("hits", [])
+            if not hits:
+                return
+            for hit in hits:
+                listing_id = int(hit["_id"])
+                if listing_id <= last_id:
+                    raise RuntimeError(
+                        "Indexed documents are not sorted by listing_id; "
+                        "run `search_reindex --rebuild` to add the field."
+                    )
+                last_id = listing_id
+                refreshed = hit.get("fields", {}).get("refreshed_at")
+                yield listing_id, int(float(refreshed[0])) if refreshed else None
+            after = hits[-1]["sort"]
+    finally:
+        try:
+            client.delete_pit(body={"pit_id": [pit_id]})
+        except Exception:
+            pass
+
+
+def iter_db_versions(chunk_size: int = DEFAULT_BULK_CHUNK_SIZE) -> Iterator[Version]:
+    """Stream active listing ids with their ``refreshed_at``, ascending by id."""
+    qs = Listing.objects.filter(status=Listing.Status.ACTIVE).order_by("id")
+    last_id = 0
+    while True:
+        rows = list(qs.filter(id__gt=last_id).values_list("id", "refreshed_at")[:chunk_size])
+        if not rows:
+            return
+        for listing_id, refreshed_at in rows:
+            yield listing_id, epoch_millis(refreshed_at)
+        last_id = rows[-1][0]
+
+
+def diff_versions(indexed: Iterable[Version], expected: Iterable[Version]) -> Iterator[Tuple[str, int]]:
+    """Merge-join two id-sorted streams into ``(DELETE | INDEX, listing_id)`` steps.
+
+    Ids only in the index are deleted; ids only in the database, or stored
+    with a different ``refreshed_at``, are (re)indexed. Neither side is
+    held in memory beyond its current item.
+    """
+    indexed, expected = iter(indexed), iter(expected)
+    have = next(indexed, None)
+    want = next(expected, None)
+    while have is not None or want is not None:
+        if want is None or (have is not None and have[0] < want[0]):
+            yield DELETE, have[0]  # type: ignore[index]
+            have = next(indexed, None)
+        elif have is None or want[0] < have[0]:
+            yield INDEX, want[0]
+            want = next(expected, None)
+        else:
+            if have[1] != want[1]:
+                yield INDEX, want[0]
+            have = next(indexed, None)
+            want = next(expected, None)
+
+
+def reconcile(
+    batch_size: int = DEFAULT_BULK_CHUNK_SIZE,
+    delete_only: bool = False,
+    progress: Optional[Callable[[Counter], None]] = None,
+) -> Counter:
+    """Bring the live index in line with the database in one streaming pass.
+
+    Stale documents are removed and missing or outdated ones reindexed
+    (unless ``delete_only``), each in ``_bulk`` batches of ``batch_size``.
+    Returns counts of ``deleted``, ``reindexed`` and ``failed`` documents.
+    """
+    stats: Counter = Counter()
+    client = get_client()
+    if not client:
+        return stats
+
+    pending: Dict[str, List[int]] = {DELETE: [], INDEX: []}
+
+    def flush(op: str) -> None:
+        ids = pending[op]
+        if not ids:
+            return
+        if op == DELETE:
+            ok, failed = bulk_delete_listings(ids)
+            stats["deleted"] += ok
+        else:
+            ok, failed = bulk_index_listings(ids, notify=False)
+            stats["reindexed"] += ok
+        stats["failed"] += failed
+        pending[op] = []
+        if progress:
+            progress(stats)
+
+    for op, listing_id in diff_versions(iter_index_versions(client, batch_size), iter_db_versions(batch_size)):
+        if op == INDEX and delete_only:
+            continue
+        pending[op].append(listing_id)
+        if len(pending[op]) >= batch_size:
+            flush(op)
+    flush(DELETE)
+    flush(INDEX)
+    return stats
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import time
+from decimal import Decimal
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .index import write_targets
+from .opensearch_client import get_client
+from .response_cache import bump_generation
+
+# Seconds between task status polls while a repricing runs
+POLL_INTERVAL = 2.0
+
+REPRICE_SCRIPT = "ctx._source.price_normalized = ctx._source.price * params.rate"
+
+
+def rate_to_base(currency: str) -> float:
+    """Multiplier from ``currency`` to the base currency, as ``build_documents`` applies it."""
+    from currency.services import CurrencyService
+
+    return float(CurrencyService.normalize_price_to_base(Decimal("1"), currency))
+
+
+def reprice_body(currency: str, rate: float) -> Dict[str, Any]:
+    return {
+        "query": {"term": {"currency": currency}},
+        "script": {"source": REPRICE_SCRIPT, "lang": "painless", "params": {"rate": rate}},
+    }
+
+
+def start_repricing(currency: str) -> Dict[str, str]:
+    """Start one background ``update_by_query`` per write target; ``{index: task_id}``."""
+    client = get_client()
+    if not client:
+        return {}
+    currency = currency.upper()
+    body = reprice_body(currency, rate_to_base(currency))
+    tasks: Dict[str, str] = {}
+    for idx in write_targets():
+        started = client.update_by_query(
+            index=idx,
+            body=body,
+            params={"conflicts": "proceed", "slices": "auto", "refresh": "true", "wait_for_completion": "false"},
+        )
+        tasks[idx] = started["task"]
+    return tasks
+
+
+def repricing_status(
+    tasks: Dict[str, str],
+    progress: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+) -> Tuple[bool, Dict[str, int]]:
+    """Check the tasks of ``start_repricing`` once.
+
+    Returns ``(completed, totals)`` with the ``total``, ``updated`` and
+    ``failed`` counts summed over all targets so far. ``progress`` gets
+    ``(index, status)`` for each target. The response cache generation is
+    bumped once every task has completed.
+    """
+    totals = {"total": 0, "updated": 0, "failed": 0}
+    client = get_client()
+    if not client:
+        return True, totals
+    completed = True
+    for idx, task_id in tasks.items():
+        status = client.tasks.get(task_id=task_id)
+        task_status = status.get("task", {}).get("status", {})
+        if progress:
+            progress(idx, task_status)
+        completed = completed and bool(status.get("completed"))
+        response = status.get("response", task_status)
+        totals["total"] += response.get("total", 0)
+        totals["updated"] += response.get("updated", 0)
+        totals["failed"] += len(response.get("failures", []))
+    if completed:
+        bump_generation()
+    return completed, totals
+
+
+def reprice_currency(
+    currency: str,
+    progress: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+) -> Dict[str, int]:
+    """Recompute ``price_normalized`` for every indexed listing priced in ``currency``.
+
+    Starts the ``update_by_query`` of every write target, then polls them
+    until all have completed, passing ``(index, status)`` to ``progress`` so
+    callers can report ``updated``/``total``. Returns the summed ``total``,
+    ``updated`` and ``failed`` counts. Blocks for as long as the repricing
+    runs; Celery uses ``start_repricing`` and ``repricing_status`` instead.
+    """
+    tasks = start_repricing(currency)
+    if not tasks:
+        return {"total": 0, "updated": 0, "failed": 0}
+    while True:
+        completed, totals = repricing_status(tasks, progress)
+        if completed:
+            return totals
+        time.sleep(POLL_INTERVAL)
@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import re
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+GENERATION_KEY = "search:generation"
+# Query params that change the search response; anything else (cache busters,
+# tracking params) is ignored when building the key
+_SCALAR_PARAMS = {
+    "q": "",
+    "sort": "relevance",
+    "page": "1",
+    "per_page": "20",
+    "currency": "UZS",
+    "min_price": "",
+    "max_price": "",
+    "category_slug": "",
+    "location_slug": "",
+    "condition": "",
+    "user_id": "",
+    "pit": "",
+    "facets": "full",
+    "view": "full",
+    "lat": "",
+    "lon": "",
+    "radius": "",
+}
+# Params that select which hits are returned but not what the facets count
+_PAGING_PARAMS = ("page", "per_page", "sort", "cursor", "pit", "view")
+_POLL_INTERVAL = 0.025
+
+_inflight: Dict[str, threading.Event] = {}
+_inflight_lock = threading.Lock()
+_async_inflight: Dict[str, asyncio.Event] = {}
+
+
+def normalize_params(params) -> Dict[str, Any]:
+    """Reduce search query params to a canonical form.
+
+    Defaults are filled in, repeated keys keep the value the view uses (the
+    last one), ``q`` is case- and whitespace-folded, and attribute filter
+    values are split and sorted, so equivalent requests share one cache entry.
+    """
+    normalized: Dict[str, Any] = {}
+    for key, default in _SCALAR_PARAMS.items():
+        values = params.getlist(key) if hasattr(params, "getlist") else [params.get(key)]
+        value = (values[-1] if values and values[-1] is not None else default).strip()
+        normalized[key] = value or default
+    # Cursor mode is keyed on presence too: an empty cursor means "first page"
+    normalized["cursor"] = params.get("cursor") if "cursor" in params else None
+    normalized["q"] = re.sub(r"\s+", " ", normalized["q"]).lower()
+    normalized["currency"] = normalized["currency"].upper()
+    normalized["facets"] = normalized["facets"].lower()
+    for key in ("page", "per_page"):
+        try:
+            normalized[key] = int(normalized[key])
+        except ValueError:
+            pass
+    if isinstance(normalized["per_page"], int):
+        normalized["per_page"] = max(1, min(normalized["per_page"], 50))
+
+    attrs: Dict[str, List[str]] = {}
+    items = params.lists() if hasattr(params, "lists") else ((k, [v]) for k, v in params.items())
+    for key, values in items:
+        if not key.startswith("attrs."):
+            continue
+        if key.endswith("_min") or key.endswith("_max"):
+            attrs[key] = [values[-1]]
+        else:
+            attrs[key] = sorted({v for value in values for v in value.split(",") if v})
+    normalized["attrs"] = dict(sorted(attrs.items()))
+    return normalized
+
+
+def current_generation() -> int:
+    return cache.get(GENERATION_KEY) or 0
+
+
+def bump_generation() -> None:
+    """Invalidate every cached search response. Called after index writes."""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.add(GENERATION_KEY, 1, timeout=None)
+
+
+def cache_key(params, namespace: str = "resp", extra: Optional[Dict[str, Any]] = None) -> str:
+    """Generation-scoped key for a normalized query; ``extra`` adds endpoint-specific inputs."""
+    normalized = normalize_params(params)
+    if extra:
+        normalized["extra"] = extra
+    fingerprint = json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+    digest = hashlib.sha1(fingerprint.encode("utf-8")).hexdigest()
+    return f"search:{namespace}:{current_generation()}:{digest}"
+
+
+def facets_cache_key(params) -> str:
+    """Key for the facets of a filter context, shared by every page and sort."""
+    context = normalize_params(params)
+    for key in _PAGING_PARAMS:
+        context.pop(key, None)
+    fingerprint = json.dumps(context, sort_keys=True, separators=(",", ":"))
+    digest = hashlib.sha1(fingerprint.encode("utf-8")).hexdigest()
+    return f"search:facets:{current_generation()}:{digest}"
+
+
+def suggest_cache_key(prefix: str, size: int) -> str:
+    """Key for autocomplete results of a normalized prefix.
+
+    Not tied to the index generation: suggestions tolerate a short TTL of
+    staleness, and keystroke traffic would otherwise miss after every write.
+    """
+    digest = hashlib.sha1(f"{prefix}\n{size}".encode("utf-8")).hexdigest()
+    return f"search:suggest:{digest}"
+
+
+def similar_cache_key(listing_id: int, revision: int, size: int) -> str:
+    """Key for a listing's similar listings.
+
+    Scoped to the listing's revision rather than the index generation, so
+    the entry survives other writes and is replaced once the listing itself
+    changes; the TTL bounds how long other listings' changes go unseen.
+    """
+    return f"search:similar:{listing_id}:{revision}:{size}"
+
+
+def _wait_for(key: str, timeout: float) -> Optional[Any]:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        time.sleep(_POLL_INTERVAL)
+        payload = cache.get(key)
+        if payload is not None:
+            return payload
+    return None
+
+
+def get_or_compute(key: str, compute: Callable[[], Tuple[Any, bool]], ttl: Optional[int] = None) -> Any:
+    """Return the cached payload for ``key`` or compute it once.
+
+    ``compute`` returns ``(payload, cacheable)``. Concurrent misses for the
+    same key are collapsed: threads in this process wait on the leader, and
+    other processes wait on a short-lived lock in the shared cache, so a
+    burst of identical requests reaches the backend once.
+    """
+    ttl = int(getattr(settings, "SEARCH_RESPONSE_CACHE_TTL", 30)) if ttl is None else ttl
+    if ttl <= 0:
+        return compute()[0]
+    payload = cache.get(key)
+    if payload is not None:
+        return payload
+
+    wait = float(getattr(settings, "OPENSEARCH_SEARCH_TIMEOUT", 2))
+    with _inflight_lock:
+        event = _inflight.get(key)
+        leader = event is None
+        if leader:
+            event = _inflight[key] = threading.Event()
+    if not leader:
+        event.wait(wait)
+        payload = cache.get(key)
+        return payload if payload is not None else compute()[0]
+
+    lock_key = f"{key}:lock"
+    owns_lock = False
+    try:
+        owns_lock = cache.add(lock_key, 1, timeout=max(1, int(wait) + 1))
+        if not owns_lock:
+            payload = _wait_for(key, wait)
+            if payload is not None:
+                return payload
+        payload, cacheable = compute()
+        if cacheable:
+            cache.set(key, payload, ttl)
+        return payload
+    finally:
+        # Also when compute() raised, so other processes don't wait out the lock
+        if owns_lock:
+            cache.delete(lock_key)
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        event.set()
+
+
+async def aget_or_compute(
+    key: str, compute: Callable[[], Awaitable[Tuple[Any, bool]]], ttl: Optional[int] = None
+) -> Any:
+    """Async ``get_or_compute`` for the ASGI views.
+
+    Concurrent misses on the same event loop await one ``compute()``. There
+    is no cross-process lock: an ASGI worker already serves its share of a
+    burst from one loop.
+    """
+    ttl = int(getattr(settings, "SEARCH_RESPONSE_CACHE_TTL", 30)) if ttl is None else ttl
+    if ttl <= 0:
+        return (await compute())[0]
+    payload = await cache.aget(key)
+    if payload is not None:
+        return payload
+
+    event = _async_inflight.get(key)
+    if event is not None:
+        try:
+            await asyncio.wait_for(event.wait(), float(getattr(settings, "OPENSEARCH_SEARCH_TIMEOUT", 2)))
+        except asyncio.TimeoutError:
+            pass
+        payload = await cache.aget(key)
+        return payload if payload is not None else (await compute())[0]
+
+    event = _async_inflight[key] = asyncio.Event()
+    try:
+        payload, cacheable = await compute()
+        if cacheable:
+            await cache.aset(key, payload, ttl)
+        return payload
+    finally:
+        _async_inflight.pop(key, None)
+        event.set()
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+from decimal import Decimal
+from typing import Any, Dict, List, Tuple
+
+from django.conf import settings
+from drf_spectacular.utils import OpenApiExample, OpenApiParameter, extend_schema
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from listings.models import Listing
+
+from . import response_cache
+from .circuit_breaker import get_breaker
+from .index import index_name
+from .opensearch_client import get_client
+
+DEFAULT_SIZE = 12
+MAX_SIZE = 24
+# Similar listings cost between (1 - band) and (1 + band) times the source price
+PRICE_BAND = 0.5
+
+
+def similar_query(listing: Listing, price_normalized: float) -> Dict[str, Any]:
+    """``more_like_this`` on the listing's text, within its category and price band.
+
+    The seller's own listings, the source included, are excluded.
+    """
+    filters: List[Dict[str, Any]] = [{"term": {"category_path": listing.category.slug}}]
+    if price_normalized > 0:
+        filters.append(
+            {
+                "range": {
+                    "price_normalized": {
+                        "gte": price_normalized * (1 - PRICE_BAND),
+                        "lte": price_normalized * (1 + PRICE_BAND),
+                    }
+                }
+            }
+        )
+    return {
+        "bool": {
+            "must": [
+                {
+                    "more_like_this": {
+                        "fields": ["title", "description"],
+                        "like": [text for text in (listing.title, listing.description) if text],
+                        # Listing texts are short: one occurrence of a term is signal
+                        "min_term_freq": 1,
+                        "min_doc_freq": 2,
+                        "max_query_terms": 25,
+                        "minimum_should_match": "30%",
+                    }
+                }
+            ],
+            "filter": filters,
+            "must_not": [
+                {"term": {"user_id": str(listing.user_id)}},
+                {"ids": {"values": [str(listing.id)]}},
+            ],
+        }
+    }
+
+
+class SimilarListingsView(APIView):
+    """
+    Listings similar to a given one, for the related-items block on the
+    listing page.
+
+    Matches title and description with ``more_like_this`` inside the
+    listing's category and price band, and leaves out everything from the
+    same seller. Results are result cards (as ``/search/listings?view=card``)
+    and are cached per listing revision, so they refresh when it is reindexed;
+    listings that went inactive since are dropped on every request.
+
+    Query Parameters:
+        - size: Number of listings (default: 12, max: 24)
+    """
+    authentication_classes: list = []
+    permission_classes: list = []
+
+    @extend_schema(
+        tags=["search"],
+        summary="Similar listings",
+        description="Listings like the given one (title and description), in its category and price band, excluding the seller's own listings.",
+        parameters=[
+            OpenApiParameter(name="size", description="Number of listings (default: 12, max: 24)", required=False, type=int),
+        ],
+        examples=[
+            OpenApiExample(
+                "Success",
+                value={"success": True, "data": {"results": [{"id": "8", "score": 7.2, "card": {"v": 1, "id": 8, "title": "iPhone 14"}}]}, "error": None, "code": 200},
+                response_only=True,
+            ),
+        ],
+    )
+    def get(self, request, pk: int):
+        try:
+            size = int(request.query_params.get("size", DEFAULT_SIZE))
+        except ValueError:
+            size = DEFAULT_SIZE
+        size = max(1, min(size, MAX_SIZE))
+
+        listing = (
+            Listing.objects.select_related("category")
+            .filter(pk=pk, status=Listing.Status.ACTIVE)
+            .only("id", "user_id", "title", "description", "price_amount", "price_currency", "revision", "category__slug")
+            .first()
+        )
+        if listing is None:
+            raise NotFound("Listing not found")
+
+        client = get_client()
+        if not client:
+            return Response({"results": [], "note": "Search backend not configured"})
+        if get_breaker().is_open():
+            return Response({"results": [], "note": "Search backend unavailable"})
+
+        key = response_cache.similar_cache_key(listing.id, listing.revision, size)
+        payload = response_cache.get_or_compute(
+            key,
+            lambda: self._similar(client, listing, size),
+            ttl=int(getattr(settings, "SEARCH_SIMILAR_CACHE_TTL", 3600)),
+        )
+        return Response(self._still_active(payload))
+
+    @staticmethod
+    def _still_active(payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Drop results sold or paused since the payload was cached."""
+        from listings import availability
+
+        results = payload.get("results") or []
+        if not results:
+            return payload
+        active = availability.active_ids(int(r["id"]) for r in results)
+        return {**payload, "results": [r for r in results if int(r["id"]) in active]}
+
+    def _similar(self, client, listing: Listing, size: int) -> Tuple[Dict[str, Any], bool]:
+        """Run the query and return ``(payload, cacheable)``."""
+        from currency.services import CurrencyService
+
+        rate = CurrencyService.normalize_price_to_base(Decimal("1"), listing.price_currency)
+        price_normalized = float((listing.price_amount or 0) * rate)
+        body = {
+            "size": size,
+            "_source": ["card"],
+            "query": similar_query(listing, price_normalized),
+        }
+        try:
+            resp = client.search(
+                index=index_name(),
+                body=body,
+                request_timeout=getattr(settings, "OPENSEARCH_SEARCH_TIMEOUT", 2),
+            )
+        except Exception:
+            return {"results": [], "note": "Search temporarily unavailable"}, False
+
+        hits = resp.get("hits", {}).get("hits", [])
+        results = [
+            {"id": h["_id"], "score": h.get("_score"), **h.get("_source", {})}
+            for h in hits
+            if str(h.get("_id", "")).isdigit()
+        ]
+        return {"results": results}, True
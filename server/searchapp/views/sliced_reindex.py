@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from django.db import connections
+from django.db.models import Max, Min, Sum
+from django.utils import timezone
+
+from listings.models import Listing
+
+from ..models import ReindexCheckpoint
+from .index import DEFAULT_BULK_CHUNK_SIZE, bulk_index_listings, iter_listing_id_chunks
+
+# Listing ids per checkpointed range; several ranges per worker keep the pool
+# balanced when ids are unevenly dense
+DEFAULT_RANGE_SIZE = 10000
+
+
+def plan_ranges(target: str, range_size: int = DEFAULT_RANGE_SIZE) -> List[ReindexCheckpoint]:
+    """Return the pending ranges for ``target``, planning them on the first call.
+
+    Ranges cover the active listing ids present when the run started;
+    listings created later reach the target through live writes.
+    """
+    existing = ReindexCheckpoint.objects.filter(target=target)
+    if not existing.exists():
+        bounds = Listing.objects.filter(status=Listing.Status.ACTIVE).aggregate(lo=Min("id"), hi=Max("id"))
+        if bounds["lo"] is None:
+            return []
+        ReindexCheckpoint.objects.bulk_create(
+            [
+                ReindexCheckpoint(target=target, start_id=start, end_id=start + range_size)
+                for start in range(bounds["lo"], bounds["hi"] + 1, range_size)
+            ]
+        )
+    return list(existing.filter(completed_at__isnull=True).order_by("start_id"))
+
+
+def has_pending_ranges(target: str) -> bool:
+    return ReindexCheckpoint.objects.filter(target=target, completed_at__isnull=True).exists()
+
+
+def range_totals(target: str) -> Tuple[int, int]:
+    """``(succeeded, failed)`` over every loaded range, including earlier runs."""
+    totals = ReindexCheckpoint.objects.filter(target=target).aggregate(ok=Sum("succeeded"), failed=Sum("failed"))
+    return totals["ok"] or 0, totals["failed"] or 0
+
+
+def clear_ranges(target: str) -> None:
+    ReindexCheckpoint.objects.filter(target=target).delete()
+
+
+def load_range(
+    indices: Optional[Sequence[str]], start_id: int, end_id: int, chunk_size: int
+) -> Tuple[int, int, int]:
+    """Build and bulk-load the active listings in ``[start_id, end_id)``.
+
+    Runs in a pool worker. Returns ``(start_id, succeeded, failed)``.
+    """
+    succeeded = failed = 0
+    for ids in iter_listing_id_chunks(chunk_size, start_id=start_id, end_id=end_id):
+        try:
+            ok, errors = bulk_index_listings(ids, indices=indices, notify=False)
+        except Exception:
+            ok, errors = 0, len(ids)
+        succeeded += ok
+        failed += errors
+    return start_id, succeeded, failed
+
+
+def run_ranges(
+    indices: Optional[Sequence[str]],
+    ranges: Sequence[ReindexCheckpoint],
+    workers: int,
+    chunk_size: int = DEFAULT_BULK_CHUNK_SIZE,
+    progress: Optional[Callable[[ReindexCheckpoint], None]] = None,
+) -> Tuple[int, int]:
+    """Load ``ranges`` with ``workers`` processes, checkpointing each as it completes.
+
+    Returns the ``(succeeded, failed)`` totals of this invocation. A range
+    with failed documents keeps its counts but stays pending, so the next
+    run loads it again. With a single worker the ranges load in-process.
+    """
+    by_start = {r.start_id: r for r in ranges}
+    totals = [0, 0]
+
+    def complete(start_id: int, ok: int, errors: int) -> None:
+        checkpoint = by_start[start_id]
+        checkpoint.succeeded, checkpoint.failed = ok, errors
+        checkpoint.completed_at = None if errors else timezone.now()
+        checkpoint.save(update_fields=["succeeded", "failed", "completed_at"])
+        totals[0] += ok
+        totals[1] += errors
+        if progress:
+            progress(checkpoint)
+
+    if workers <= 1:
+        for r in ranges:
+            complete(*load_range(indices, r.start_id, r.end_id, chunk_size))
+        return totals[0], totals[1]
+
+    # Close before forking so no child inherits an open connection
+    connections.close_all()
+    context = multiprocessing.get_context("fork")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        pending = {pool.submit(load_range, indices, r.start_id, r.end_id, chunk_size) for r in ranges}
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    complete(*future.result())
+        except BaseException:
+            for future in pending:
+                future.cancel()
+            raise
+    return totals[0], totals[1]
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, List, Tuple
+
+from django.conf import settings
+from drf_spectacular.utils import OpenApiExample, OpenApiParameter, extend_schema
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from . import response_cache
+from .circuit_breaker import get_breaker
+from .index import index_name
+from .opensearch_client import get_client
+
+MIN_PREFIX_LENGTH = 2
+DEFAULT_SIZE = 8
+MAX_SIZE = 20
+
+_EMPTY = {"titles": [], "categories": [], "locations": []}
+
+
+def _normalize_prefix(prefix: str) -> str:
+    return re.sub(r"\s+", " ", (prefix or "").strip()).lower()
+
+
+class SuggestView(APIView):
+    """
+    Prefix autocomplete for the search box.
+
+    Uses completion suggesters only (no scoring query, no aggregations), so
+    it is cheap enough to call on every keystroke. Results are cached per
+    normalized prefix.
+
+    Query Parameters:
+        - q: Typed prefix (at least 2 characters)
+        - size: Suggestions per group (default: 8, max: 20)
+    """
+    authentication_classes: list = []
+    permission_classes: list = []
+
+    @extend_schema(
+        tags=["search"],
+        summary="Autocomplete search prefix",
+        description="Suggest listing titles, categories and locations (ru/uz names) for a typed prefix.",
+        parameters=[
+            OpenApiParameter(name="q", description="Typed prefix (at least 2 characters)", required=True, type=str),
+            OpenApiParameter(name="size", description="Suggestions per group (default: 8, max: 20)", required=False, type=int),
+        ],
+        examples=[
+            OpenApiExample(
+                "Success",
+                value={"success": True, "data": {"titles": ["iPhone 15 Pro"], "categories": [{"name": "Телефоны", "slug": "phones"}], "locations": []}, "error": None, "code": 200},
+                response_only=True,
+            ),
+        ],
+    )
+    def get(self, request):
+        prefix = _normalize_prefix(request.query_params.get("q", ""))
+        try:
+            size = int(request.query_params.get("size", DEFAULT_SIZE))
+        except ValueError:
+            size = DEFAULT_SIZE
+        size = max(1, min(size, MAX_SIZE))
+        if len(prefix) < MIN_PREFIX_LENGTH:
+            return Response(dict(_EMPTY))
+
+        client = get_client()
+        if not client or get_breaker().is_open():
+            return Response(dict(_EMPTY))
+
+        key = response_cache.suggest_cache_key(prefix, size)
+        payload = response_cache.get_or_compute(
+            key,
+            lambda: self._suggest(client, prefix, size),
+            ttl=int(getattr(settings, "SEARCH_SUGGEST_CACHE_TTL", 60)),
+        )
+        return Response(payload)
+
+    def _suggest(self, client, prefix: str, size: int) -> Tuple[Dict[str, Any], bool]:
+        """Run the suggesters and return ``(payload, cacheable)``."""
+
+        def completion(field: str) -> Dict[str, Any]:
+            return {"prefix": prefix, "completion": {"field": field, "size": size, "skip_duplicates": True}}
+
+        body = {
+            # Suggest options carry their own _source; no query hits are wanted
+            "size": 0,
+            "_source": ["title", "category_path", "location_path"],
+            "suggest": {
+                "titles": completion("suggest"),
+                "categories": completion("suggest_category"),
+                "locations": completion("suggest_location"),
+            },
+        }
+        try:
+            resp = client.search(
+                index=index_name(),
+                body=body,
+                request_timeout=getattr(settings, "OPENSEARCH_SEARCH_TIMEOUT", 2),
+            )
+        except Exception:
+            return dict(_EMPTY), False
+
+        suggest = resp.get("suggest", {})
+
+        def options(name: str) -> List[Dict[str, Any]]:
+            groups = suggest.get(name) or [{}]
+            return groups[0].get("options", [])
+
+        titles: List[str] = []
+        for option in options("titles"):
+            title = option.get("_source", {}).get("title") or option.get("text")
+            if title and title not in titles:
+                titles.append(title)
+
+        def named(name: str, path_field: str) -> List[Dict[str, Any]]:
+            seen = set()
+            items: List[Dict[str, Any]] = []
+            for option in options(name):
+                path = option.get("_source", {}).get(path_field) or []
+                slug = path[-1] if path else None
+                if slug in seen:
+                    continue
+                seen.add(slug)
+                items.append({"name": option.get("text"), "slug": slug})
+            return items
+
+        return {
+            "titles": titles,
+            "categories": named("categories", "category_path"),
+            "locations": named("locations", "location_path"),
+        }, True
@@ -188,6 +188,9 @@ class Command(BaseCommand):
                     if district_count > 0:
                         self.stdout.write(self.style.SUCCESS(f'✓ Created {district_count} new districts'))
 
+                # Settle paths once after the re-parenting and deletes above
+                Location.rebuild_paths()
+
                 # Final summary
                 self.stdout.write(self.style.SUCCESS(
                     f'\n✅ Cleanup complete!'
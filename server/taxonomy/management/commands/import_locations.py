@@ -55,6 +55,9 @@ class Command(BaseCommand):
                     region_map, districts
                 )
 
+            # Safety net for paths the per-row saves could not settle
+            repaired = Location.rebuild_paths()
+
         self.stdout.write(
             self.style.SUCCESS(
                 "Locations imported "
@@ -63,6 +66,8 @@ class Command(BaseCommand):
                 f"cities created: {city_created}, cities updated: {city_updated})."
             )
         )
+        if repaired:
+            self.stdout.write(f"Tree paths repaired: {repaired}")
         self.stdout.write(f"Total locations: {Location.objects.count()}")
         self.stdout.write(f"Regions: {Location.objects.filter(kind=Location.Kind.REGION).count()}")
         self.stdout.write(f"Districts: {Location.objects.filter(kind=Location.Kind.DISTRICT).count()}")
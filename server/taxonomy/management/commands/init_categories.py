@@ -150,6 +150,8 @@ class Command(BaseCommand):
                 created += int(child_created)
                 updated += int(child_updated)
 
+        Category.rebuild_paths()
+
         self.stdout.write(
             self.style.SUCCESS(
                 f"Categories initialized (created: {created}, updated: {updated}, total: {Category.objects.count()})."
@@ -0,0 +1,68 @@
+# Generated by Django 4.2.28 on 2026-10-18 02:12
+
+from django.db import migrations, models
+
+
+def populate_paths(apps, schema_editor):
+    for model_name in ("Category", "Location"):
+        model = apps.get_model("taxonomy", model_name)
+        nodes = {pk: (parent_id, slug) for pk, parent_id, slug in model.objects.values_list("id", "parent_id", "slug")}
+        paths = {}
+
+        def resolve(pk):
+            if pk in paths:
+                return paths[pk]
+            chain, current = [], pk
+            while current is not None and current not in paths and current in nodes and current not in chain:
+                chain.append(current)
+                current = nodes[current][0]
+            ids, slugs = paths.get(current, ("/", "/"))
+            for node in reversed(chain):
+                ids, slugs = f"{ids}{node}/", f"{slugs}{nodes[node][1]}/"
+                paths[node] = (ids, slugs)
+            return paths[pk]
+
+        rows = []
+        for obj in model.objects.only("id"):
+            obj.path_ids, obj.path_slugs = resolve(obj.pk)
+            rows.append(obj)
+        model.objects.bulk_update(rows, ["path_ids", "path_slugs"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('taxonomy', '0009_alter_location_kind'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='path_ids',
+            field=models.CharField(blank=True, default='', editable=False, max_length=512),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='path_slugs',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='location',
+            name='path_ids',
+            field=models.CharField(blank=True, default='', editable=False, max_length=512),
+        ),
+        migrations.AddField(
+            model_name='location',
+            name='path_slugs',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['path_ids'], name='taxonomy_category_path_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='location',
+            index=models.Index(fields=['path_ids'], name='taxonomy_location_path_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.RunPython(populate_paths, migrations.RunPython.noop),
+    ]
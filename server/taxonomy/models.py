@@ -1,10 +1,107 @@
 from __future__ import annotations
 
+from typing import Dict, List, Optional, Tuple
+
 from django.db import models
+from django.db.models import Value
+from django.db.models.functions import Concat, Length, Substr
 from django.utils.text import slugify
 
 
-class Location(models.Model):
+class TreePathMixin(models.Model):
+    """Materialized root-to-node path for a ``parent`` tree.
+
+    ``path_ids`` is ``/1/5/12/`` and ``path_slugs`` ``/electronics/phones/``
+    (both including the node itself), so ancestors are read from the row and
+    a subtree is one indexed prefix query. Paths are kept up to date on
+    save, including the descendants of a moved or renamed node; code that
+    writes the tree with queryset updates calls ``rebuild_paths()``.
+    """
+
+    path_ids = models.CharField(max_length=512, blank=True, default="", editable=False)
+    path_slugs = models.TextField(blank=True, default="", editable=False)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def ancestor_ids(self) -> List[int]:
+        """Ids from the root down to this node, inclusive."""
+        return [int(i) for i in self.path_ids.strip("/").split("/") if i]
+
+    @property
+    def ancestor_slugs(self) -> List[str]:
+        """Slugs from the root down to this node, inclusive."""
+        return [s for s in self.path_slugs.strip("/").split("/") if s]
+
+    def ancestors(self, include_self: bool = True) -> models.QuerySet:
+        """Ancestor rows ordered root first (a parent's path is always shorter)."""
+        ids = self.ancestor_ids if include_self else self.ancestor_ids[:-1]
+        return type(self).objects.filter(id__in=ids).order_by(Length("path_ids"))
+
+    def descendants(self, include_self: bool = True) -> models.QuerySet:
+        qs = type(self).objects.filter(path_ids__startswith=self.path_ids)
+        return qs if include_self else qs.exclude(pk=self.pk)
+
+    def _parent_paths(self) -> Tuple[str, str]:
+        if self.parent_id is None:
+            return "/", "/"
+        row = type(self).objects.filter(pk=self.parent_id).values_list("path_ids", "path_slugs").first()
+        return row if row and row[0] else ("/", "/")
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and not {"parent", "parent_id", "slug"} & set(update_fields):
+            return
+        parent_ids, parent_slugs = self._parent_paths()
+        new_ids = f"{parent_ids}{self.pk}/"
+        new_slugs = f"{parent_slugs}{self.slug}/"
+        old_ids, old_slugs = type(self).objects.filter(pk=self.pk).values_list("path_ids", "path_slugs").get()
+        if (new_ids, new_slugs) == (old_ids, old_slugs):
+            self.path_ids, self.path_slugs = new_ids, new_slugs
+            return
+        manager = type(self).objects
+        manager.filter(pk=self.pk).update(path_ids=new_ids, path_slugs=new_slugs)
+        if old_ids:
+            # Re-root the subtree by swapping the old prefix for the new one
+            manager.filter(path_ids__startswith=old_ids).exclude(pk=self.pk).update(
+                path_ids=Concat(Value(new_ids), Substr("path_ids", len(old_ids) + 1)),
+                path_slugs=Concat(Value(new_slugs), Substr("path_slugs", len(old_slugs) + 1)),
+            )
+        self.path_ids, self.path_slugs = new_ids, new_slugs
+
+    @classmethod
+    def rebuild_paths(cls) -> int:
+        """Recompute every path from ``parent``/``slug``; returns the rows changed."""
+        nodes: Dict[int, Tuple[Optional[int], str]] = {
+            pk: (parent_id, slug) for pk, parent_id, slug in cls.objects.values_list("id", "parent_id", "slug")
+        }
+        paths: Dict[int, Tuple[str, str]] = {}
+
+        def resolve(pk: int) -> Tuple[str, str]:
+            chain: List[int] = []
+            current: Optional[int] = pk
+            while current is not None and current not in paths and current in nodes and current not in chain:
+                chain.append(current)
+                current = nodes[current][0]
+            ids, slugs = paths.get(current, ("/", "/")) if current is not None else ("/", "/")
+            for node in reversed(chain):
+                ids, slugs = f"{ids}{node}/", f"{slugs}{nodes[node][1]}/"
+                paths[node] = (ids, slugs)
+            return paths[pk]
+
+        changed = []
+        for obj in cls.objects.only("id", "path_ids", "path_slugs"):
+            ids, slugs = resolve(obj.pk)
+            if (obj.path_ids, obj.path_slugs) != (ids, slugs):
+                obj.path_ids, obj.path_slugs = ids, slugs
+                changed.append(obj)
+        cls.objects.bulk_update(changed, ["path_ids", "path_slugs"], batch_size=500)
+        return len(changed)
+
+
+class Location(TreePathMixin):
     class Kind(models.TextChoices):
         COUNTRY = "COUNTRY", "Country"
         REGION = "REGION", "Region"
@@ -25,6 +122,7 @@ class Location(models.Model):
     class Meta:
         indexes = [
             models.Index(fields=["parent"]),
+            models.Index(fields=["path_ids"], name="taxonomy_location_path_idx", opclasses=["varchar_pattern_ops"]),
         ]
         ordering = ["name"]
 
@@ -37,7 +135,7 @@ class Location(models.Model):
         super().save(*args, **kwargs)
 
 
-class Category(models.Model):
+class Category(TreePathMixin):
     parent = models.ForeignKey(
         "self", null=True, blank=True, related_name="children", on_delete=models.CASCADE
     )
@@ -57,6 +155,7 @@ class Category(models.Model):
         indexes = [
             models.Index(fields=["parent"]),
             models.Index(fields=["order"]),
+            models.Index(fields=["path_ids"], name="taxonomy_category_path_idx", opclasses=["varchar_pattern_ops"]),
         ]
         ordering = ["order", "name"]
 
@@ -30,10 +30,5 @@ class CategoryAttributesView(APIView):
             cat = Category.objects.get(pk=pk)
         except Category.DoesNotExist:
             return Response([], status=200)
-        ids = []
-        cur = cat
-        while cur is not None:
-            ids.append(cur.id)
-            cur = cur.parent  # type: ignore[attr-defined]
-        attrs = Attribute.objects.filter(category_id__in=ids).order_by("key")
+        attrs = Attribute.objects.filter(category_id__in=cat.ancestor_ids).order_by("key")
         return Response(AttributeSerializer(attrs, many=True, context={"request": request, "lang": lang}).data)
@@ -69,16 +69,7 @@ class ReverseGeocodeView(APIView):
             return Response({"detail": "No nearby location found"}, status=404)
 
         # Build the location path (from root to leaf)
-        path_parts = []
-        current = nearest
-        location_chain = []
-
-        while current:
-            location_chain.insert(0, current)
-            name = getattr(current, f"name_{lang}", None) or current.name
-            path_parts.insert(0, name)
-            current = current.parent
-
+        path_parts = [getattr(loc, f"name_{lang}", None) or loc.name for loc in nearest.ancestors()]
         path = " > ".join(path_parts)
 
         # Serialize the location